@@ -0,0 +1,297 @@
+"""End-to-end load test for the engine API.
+
+Drives realistic workout sessions against a running engine. Each session
+logs in, fetches the plan, then for every exercise of one plan day gets a
+recommendation and logs N sets. It finishes by loading the dashboard. The
+output is throughput and latency percentiles per route.
+
+Everything runs on one box. Postgres and Redis must both be local. The
+benchmarked routes read Redis on every request (user profiles, the exercise
+catalog version, ETags and the response cache), so --boot points the engine
+at redis://localhost:6379/0 unless REDIS_URL is set and refuses to start if
+Redis does not answer. Rate limiting is disabled and RQ is not used on these
+routes. Typical run:
+
+    redis-server --daemonize yes
+    POSTGRES_HOST=localhost python database/create_schema.py
+    POSTGRES_HOST=localhost python database/seed_data.py --load-test-users 200
+    python benchmarks/load_test.py --boot --sessions 400 --concurrency 16 --json main.json
+
+Run it again on a branch with `--json branch.json`. Then compare the two
+files with `--compare main.json branch.json`.
+
+Uses only the standard library so it runs wherever the engine does.
+"""
+import argparse
+import base64
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "database"))
+from seed_data import LOAD_TEST_EMAIL_TEMPLATE, LOAD_TEST_PASSWORD  # noqa: E402
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Recorder:
+    """Thread-safe per-route latency and error collection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+    def summary(self, wall_seconds):
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            routes[route] = {
+                "requests": len(ordered),
+                "errors": self.errors.get(route, 0),
+                "throughput_rps": round(len(ordered) / wall_seconds, 2) if wall_seconds else 0.0,
+                "mean_ms": round(1000.0 * sum(ordered) / len(ordered), 2),
+                "max_ms": round(1000.0 * ordered[-1], 2),
+                **{f"p{p}_ms": round(1000.0 * percentile(ordered, p), 2) for p in PERCENTILES},
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {
+            "wall_seconds": round(wall_seconds, 2),
+            "total_requests": total,
+            "total_errors": sum(r["errors"] for r in routes.values()),
+            "throughput_rps": round(total / wall_seconds, 2) if wall_seconds else 0.0,
+            "routes": routes,
+        }
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    return ordered[max(0, math.ceil(p / 100.0 * len(ordered)) - 1)]
+
+
+class ApiClient:
+    """One keep-alive HTTP connection per simulated user."""
+
+    def __init__(self, base_url, recorder, timeout=30):
+        parsed = urlparse(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.timeout = timeout
+        self.recorder = recorder
+        self.token = None
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def request(self, route, method, path, body=None):
+        """Issue a request, recording its latency under the `route` label."""
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.recorder.record(route, time.perf_counter() - started, ok=False)
+            return None, None
+        self.recorder.record(route, time.perf_counter() - started, ok=status < 400)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def close(self):
+        self.conn.close()
+
+
+def _user_id_from_token(token):
+    payload = token.split(".")[1]
+    payload += "=" * (-len(payload) % 4)
+    return json.loads(base64.urlsafe_b64decode(payload))["user_id"]
+
+
+def run_session(base_url, recorder, user_index, sets_per_exercise, rng):
+    """One user's workout: login, plan, recommend + log sets, dashboard."""
+    client = ApiClient(base_url, recorder)
+    try:
+        status, body = client.request("login", "POST", "/v1/auth/login", {
+            "email": LOAD_TEST_EMAIL_TEMPLATE.format(user_index),
+            "password": LOAD_TEST_PASSWORD,
+        })
+        if status != 200:
+            return
+        client.token = body["access_token"]
+        user_id = _user_id_from_token(client.token)
+
+        status, plans = client.request("plans", "GET", f"/v1/users/{user_id}/plans")
+        if status != 200 or not plans:
+            return
+        status, days = client.request("plan_days", "GET", f"/v1/plans/{plans[0]['id']}/days")
+        if status != 200 or not days:
+            return
+        day = rng.choice(days)
+        status, plan_exercises = client.request("plan_day_exercises", "GET", f"/v1/plandays/{day['id']}/exercises")
+        if status != 200 or not plan_exercises:
+            return
+
+        for plan_exercise in plan_exercises:
+            exercise_id = plan_exercise["exercise_id"]
+            _, recommendation = client.request(
+                "recommend", "GET",
+                f"/v1/users/{user_id}/exercises/{exercise_id}/recommend-set-parameters",
+            )
+            weight = float((recommendation or {}).get("recommended_weight_kg") or 60.0)
+            for _ in range(sets_per_exercise):
+                client.request("log_set", "POST", f"/v1/users/{user_id}/exercises/{exercise_id}/log-set", {
+                    "weight_kg": weight,
+                    "reps": rng.randint(5, 10),
+                    "rir": rng.randint(0, 3),
+                })
+
+        client.request("dashboard_key_metrics", "GET", f"/v1/users/{user_id}/analytics/key-metrics")
+        client.request("dashboard_1rm_evolution", "GET", f"/v1/users/{user_id}/analytics/1rm-evolution")
+        client.request("dashboard_volume_summary", "GET", f"/v1/user/{user_id}/volume-summary")
+    finally:
+        client.close()
+
+
+def check_redis(url):
+    """Raise RuntimeError unless the Redis server at `url` answers PING."""
+    parsed = urlparse(url)
+    try:
+        with socket.create_connection((parsed.hostname or "localhost", parsed.port or 6379), timeout=2) as sock:
+            sock.sendall(b"PING\r\n")
+            reply = sock.recv(64)
+    except OSError as e:
+        raise RuntimeError(f"Redis at {url} is not reachable ({e}); start redis-server or set REDIS_URL") from e
+    if not reply.startswith((b"+PONG", b"-NOAUTH")):
+        raise RuntimeError(f"Unexpected reply from Redis at {url}: {reply!r}")
+
+
+def boot_engine(port, workers):
+    """Start gunicorn on `port` with rate limiting off; returns the process."""
+    env = dict(os.environ)
+    # Same defaults as database/seed_data.py, so a seeded local database just works.
+    for name, default in (("POSTGRES_HOST", "localhost"), ("POSTGRES_DB", "gymgenius"),
+                          ("POSTGRES_USER", "user"), ("POSTGRES_PASSWORD", "password"),
+                          ("REDIS_URL", "redis://localhost:6379/0")):
+        env.setdefault(name, default)
+    env.setdefault("CACHE_REDIS_URL", env["REDIS_URL"])
+    check_redis(env["CACHE_REDIS_URL"])
+    env.setdefault("JWT_SECRET_KEY", "load-test-secret")
+    env["RATELIMIT_ENABLED"] = "false"  # Every simulated user shares one IP
+    env.setdefault("RATELIMIT_STORAGE_URL", "memory://")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+         "--config", "gunicorn.conf.py", "app:app"],
+        cwd=os.path.join(REPO_ROOT, "engine"),
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Engine exited during startup with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/v1/exercises?per_page=1")
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("Engine did not become ready within 30s")
+
+
+def print_summary(summary):
+    header = f"{'route':<28}{'reqs':>7}{'errs':>6}{'rps':>9}" + "".join(f"{'p%d ms' % p:>10}" for p in PERCENTILES) + f"{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for route, r in summary["routes"].items():
+        print(f"{route:<28}{r['requests']:>7}{r['errors']:>6}{r['throughput_rps']:>9}"
+              + "".join(f"{r[f'p{p}_ms']:>10}" for p in PERCENTILES) + f"{r['max_ms']:>10}")
+    print("-" * len(header))
+    print(f"{summary['total_requests']} requests, {summary['total_errors']} errors in {summary['wall_seconds']}s "
+          f"({summary['throughput_rps']} req/s)")
+
+
+def print_comparison(base_path, head_path):
+    with open(base_path) as fh:
+        base = json.load(fh)
+    with open(head_path) as fh:
+        head = json.load(fh)
+    print(f"{'route':<28}{'p50 base':>10}{'p50 head':>10}{'p95 base':>10}{'p95 head':>10}{'p95 delta':>11}")
+    for route in sorted(set(base["routes"]) | set(head["routes"])):
+        b, h = base["routes"].get(route), head["routes"].get(route)
+        if not b or not h:
+            print(f"{route:<28}{'(only in ' + ('head' if h else 'base') + ')':>51}")
+            continue
+        delta = (h["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100.0 if b["p95_ms"] else 0.0
+        print(f"{route:<28}{b['p50_ms']:>10}{h['p50_ms']:>10}{b['p95_ms']:>10}{h['p95_ms']:>10}{delta:>+10.1f}%")
+    print(f"throughput: {base['throughput_rps']} -> {head['throughput_rps']} req/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:5055", help="Engine URL (default: %(default)s)")
+    parser.add_argument("--boot", action="store_true", help="Start gunicorn on the --base-url port for the run")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers with --boot (default: %(default)s)")
+    parser.add_argument("--users", type=int, default=200, help="Seeded load-test users to draw from (default: %(default)s)")
+    parser.add_argument("--sessions", type=int, default=200, help="Workout sessions to run (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent sessions (default: %(default)s)")
+    parser.add_argument("--sets-per-exercise", type=int, default=3, help="log-set calls per exercise (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: %(default)s)")
+    parser.add_argument("--json", dest="json_path", help="Also write the summary as JSON to this path")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="Compare two --json outputs and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print_comparison(*args.compare)
+        return 0
+
+    engine = boot_engine(urlparse(args.base_url).port or 80, args.workers) if args.boot else None
+    recorder = Recorder()
+    try:
+        rng = random.Random(args.seed)
+        plan = [(rng.randrange(args.users), random.Random(rng.random())) for _ in range(args.sessions)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for future in [pool.submit(run_session, args.base_url, recorder, user_index, args.sets_per_exercise, session_rng)
+                           for user_index, session_rng in plan]:
+                future.result()
+        wall_seconds = time.perf_counter() - started
+    finally:
+        if engine is not None:
+            engine.terminate()
+            engine.wait(timeout=30)
+
+    summary = recorder.summary(wall_seconds)
+    summary["config"] = {k: getattr(args, k) for k in ("sessions", "concurrency", "users", "sets_per_exercise", "workers", "seed")}
+    print_summary(summary)
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(summary, fh, indent=2)
+    return 1 if summary["total_errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+from engine import json_provider
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# A 1rm-evolution sized payload: 20 exercises x 250 estimates.
+EVOLUTION = {
+    str(uuid.uuid4()): [
+        {"date": START + timedelta(days=i), "estimated_1rm": float(Decimal("100.5") + i)}
+        for i in range(250)
+    ]
+    for _ in range(20)
+}
+# A listing of RealDictCursor-style rows with UUID, Decimal and datetime values.
+ROWS = [
+    {"id": uuid.uuid4(), "workout_id": uuid.uuid4(), "set_number": i % 5 + 1,
+     "actual_weight": Decimal("82.50"), "actual_reps": 8, "actual_rir": 2,
+     "completed_at": START + timedelta(minutes=i), "notes": None}
+    for i in range(2000)
+]
+
+
+class DecimalFlaskEncoder(FlaskJSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return super().default(o)
+
+
+@pytest.mark.parametrize("payload", ["evolution", "rows"])
+def test_flask_default_encoder(benchmark, payload):
+    data = EVOLUTION if payload == "evolution" else ROWS
+    assert benchmark(json.dumps, data, cls=DecimalFlaskEncoder, separators=(",", ":"))
+
+
+@pytest.mark.parametrize("payload", ["evolution", "rows"])
+def test_json_provider_dumps(benchmark, payload):
+    data = EVOLUTION if payload == "evolution" else ROWS
+    assert benchmark(json_provider.dumps, data)
@@ -0,0 +1,48 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from engine.constants import DEFAULT_USER_RIR_BIAS
+from engine.learning_models import (
+    calculate_current_fatigue,
+    predict_reps_for_bias_update,
+    update_user_rir_bias,
+)
+
+
+def make_session_history(count, seed=42):
+    """`count` chest SessionRecords, one every 12 hours up to now."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [
+        {"session_date": now - timedelta(hours=12 * (count - i)), "stimulus": rng.uniform(0.5, 3.0)}
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("sessions", [10, 100, 1000, 10000])
+def test_calculate_current_fatigue(benchmark, sessions):
+    history = make_session_history(sessions)
+    fatigue = benchmark(calculate_current_fatigue, "chest", history)
+    assert fatigue >= 0.0
+
+
+def _replay_rir_bias(sets, base_lr=0.1, bias=DEFAULT_USER_RIR_BIAS):
+    """Mirrors user_model_updates.recalibrate_rir_bias without the database."""
+    error_ema = 0.0
+    for weight, prior_e1rm, rir, actual_reps in sets:
+        predicted = predict_reps_for_bias_update(weight, prior_e1rm, rir, bias)
+        bias, error_ema = update_user_rir_bias(bias, predicted, actual_reps, base_lr, error_ema)
+    return bias
+
+
+@pytest.mark.parametrize("set_count", [50, 500, 5000])
+def test_update_user_rir_bias_replay(benchmark, set_count):
+    rng = random.Random(7)
+    sets = [
+        (rng.uniform(60.0, 100.0), rng.uniform(110.0, 130.0), rng.randint(0, 4), rng.randint(3, 12))
+        for _ in range(set_count)
+    ]
+    bias = benchmark(_replay_rir_bias, sets)
+    assert -3.0 <= bias <= 3.0
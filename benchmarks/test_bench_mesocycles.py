@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+import pytest
+
+from engine.mesocycles import PHASE_ACCUMULATION, get_or_create_current_mesocycle
+
+
+class _StubCursor:
+    """Returns one stored mesocycle and swallows writes; cheaper than MagicMock."""
+
+    def __init__(self, row):
+        self.row = row
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return dict(self.row)
+
+
+@pytest.mark.parametrize("gap_weeks", [1, 12, 52, 260])
+def test_get_or_create_current_mesocycle_after_gap(benchmark, gap_weeks):
+    today = date(2024, 6, 3)
+    cursor = _StubCursor({
+        "id": "meso-1", "user_id": "user-1", "phase": PHASE_ACCUMULATION,
+        "start_date": today - timedelta(weeks=gap_weeks), "week_number": 1,
+    })
+    meso = benchmark(get_or_create_current_mesocycle, cursor, "user-1", today)
+    assert meso["week_number"] >= 1
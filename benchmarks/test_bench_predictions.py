@@ -0,0 +1,31 @@
+import pytest
+
+from engine.predictions import estimate_1rm_with_rir_bias, round_to_available_plates
+
+PLATE_INVENTORIES = {
+    "standard": [25.0, 20.0, 15.0, 10.0, 5.0, 2.5, 1.25],
+    "home_gym": [20.0, 10.0, 5.0, 2.5],
+    "fractional": [25.0, 20.0, 15.0, 10.0, 5.0, 2.5, 1.25, 1.0, 0.5, 0.25],
+}
+TARGETS = [23.7, 61.3, 102.4, 187.9, 251.1]
+
+
+@pytest.mark.parametrize("inventory", sorted(PLATE_INVENTORIES))
+@pytest.mark.parametrize("equipment_type", ["barbell", "dumbbell_pair", "machine"])
+def test_round_to_available_plates(benchmark, equipment_type, inventory):
+    plates = PLATE_INVENTORIES[inventory]
+
+    def run():
+        return [round_to_available_plates(t, plates, 20.0, equipment_type) for t in TARGETS]
+
+    rounded = benchmark(run)
+    assert len(rounded) == len(TARGETS)
+
+
+def test_estimate_1rm_with_rir_bias(benchmark):
+    sets = [(60.0 + i % 40, 1 + i % 12, i % 5, (i % 7 - 3) * 0.5) for i in range(1000)]
+
+    def run():
+        return [estimate_1rm_with_rir_bias(w, r, rir, bias) for w, r, rir, bias in sets]
+
+    assert all(e > 0 for e in benchmark(run))
@@ -0,0 +1,25 @@
+import random
+
+import pytest
+
+from engine.progression import detect_plateau
+from engine.changepoint import detect_plateau_segmented
+
+
+def _series(length, seed=3):
+    rng = random.Random(seed)
+    rising = [100.0 + 0.8 * i + rng.gauss(0, 0.5) for i in range(length // 2)]
+    flat = [rising[-1] + rng.gauss(0, 0.5) for _ in range(length - len(rising))]
+    return rising + flat
+
+
+@pytest.mark.parametrize("length", [10, 50, 200])
+def test_detect_plateau(benchmark, length):
+    result = benchmark(detect_plateau, _series(length))
+    assert "plateauing" in result
+
+
+@pytest.mark.parametrize("length", [10, 50, 200])
+def test_detect_plateau_segmented(benchmark, length):
+    result = benchmark(detect_plateau_segmented, _series(length))
+    assert "onset_index" in result
@@ -67,6 +67,7 @@ CREATE TABLE IF NOT EXISTS users (
     available_plates JSONB DEFAULT '{"kg": [1.25, 2.5, 5, 10, 20]}',
     rir_bias DECIMAL(3,1) DEFAULT 2.0,
     recovery_multipliers JSONB DEFAULT '{}',
+    last_processed_at TIMESTAMP WITH TIME ZONE NULL, -- Nightly pipeline watermark
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -154,12 +155,13 @@ CREATE TABLE IF NOT EXISTS workouts (
     fatigue_level INTEGER CHECK (fatigue_level BETWEEN 1 AND 10),
     sleep_hours DECIMAL(3,1),
     stress_level INTEGER CHECK (stress_level BETWEEN 1 AND 10),
+    hrv_ms NUMERIC(6,1) NULL, -- Morning HRV reading (migration 003)
     notes TEXT
 );
 
--- Workout Sets Table (Log of actual sets performed)
+-- Workout Sets Table (Log of actual sets performed), range-partitioned by month (migration 007)
 CREATE TABLE IF NOT EXISTS workout_sets (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
     workout_id UUID REFERENCES workouts(id) ON DELETE CASCADE,
     exercise_id UUID REFERENCES exercises(id) ON DELETE RESTRICT,
     set_number INTEGER NOT NULL,
@@ -171,12 +173,15 @@ CREATE TABLE IF NOT EXISTS workout_sets (
     actual_reps INTEGER,
     actual_rir INTEGER,
     rest_before_seconds INTEGER,
-    completed_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     form_rating INTEGER CHECK (form_rating BETWEEN 1 AND 5),
     notes TEXT,
     mti INTEGER, -- New column for MTI
-    UNIQUE(workout_id, exercise_id, set_number)
-);
+    user_id UUID, -- Denormalized from workouts.user_id by trigger (migration 006)
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP, -- Server insert time; nightly watermark (migration 008)
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, completed_at)
+) PARTITION BY RANGE (completed_at);
 
 -- Mesocycles Table
 CREATE TABLE IF NOT EXISTS mesocycles (
@@ -187,16 +192,17 @@ CREATE TABLE IF NOT EXISTS mesocycles (
     week_number INTEGER NOT NULL DEFAULT 1
 );
 
--- Estimated 1RM History Table
+-- Estimated 1RM History Table, range-partitioned by month (migration 007)
 CREATE TABLE IF NOT EXISTS estimated_1rm_history (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
     user_id UUID REFERENCES users(id) ON DELETE CASCADE,
     exercise_id UUID REFERENCES exercises(id) ON DELETE CASCADE,
     estimated_1rm DECIMAL(7,2) NOT NULL,
     calculation_method VARCHAR(50),
     confidence DECIMAL(3,2),
-    calculated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    calculated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, calculated_at)
+) PARTITION BY RANGE (calculated_at);
 
 -- Muscle Recovery Patterns Table
 CREATE TABLE IF NOT EXISTS muscle_recovery_patterns (
@@ -220,6 +226,35 @@ CREATE TABLE IF NOT EXISTS plateau_events (
     details TEXT NULL
 );
 
+-- Sliding-window least-squares state of each user/exercise e1RM series (see engine/e1rm_history.py)
+CREATE TABLE IF NOT EXISTS e1rm_stats (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    exercise_id UUID NOT NULL REFERENCES exercises(id) ON DELETE CASCADE,
+    n INTEGER NOT NULL DEFAULT 0,
+    next_x BIGINT NOT NULL DEFAULT 0,
+    sum_x DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sum_y DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sum_xy DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sum_xx DOUBLE PRECISION NOT NULL DEFAULT 0,
+    window_values DOUBLE PRECISION[] NOT NULL DEFAULT '{}',
+    conf_n INTEGER NOT NULL DEFAULT 0,
+    conf_mean DOUBLE PRECISION NOT NULL DEFAULT 0,
+    conf_m2 DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, exercise_id)
+);
+
+-- Rolling 30-day HRV baseline per user (see engine/readiness.py)
+CREATE TABLE IF NOT EXISTS user_hrv_baselines (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    hrv_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    hrv_count INTEGER NOT NULL DEFAULT 0,
+    day_sums DOUBLE PRECISION[] NOT NULL DEFAULT array_fill(0::double precision, ARRAY[30]),
+    day_counts INTEGER[] NOT NULL DEFAULT array_fill(0, ARRAY[30]),
+    ring_day DATE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Volume Summaries Table
 CREATE TABLE IF NOT EXISTS volume_summaries (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -230,6 +265,63 @@ CREATE TABLE IF NOT EXISTS volume_summaries (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Creates <parent>_default and <parent>_pYYYY_MM partitions for every month in
+-- [first_month, last_month]. Rows already sitting in the default partition for
+-- such a month are moved into the new partition. Returns the number of monthly
+-- partitions created; 0 if `parent` isn't partitioned (e.g. before this
+-- migration has run).
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent TEXT, first_month DATE, last_month DATE)
+RETURNS INTEGER AS $$
+DECLARE
+  month_start DATE := date_trunc('month', first_month)::date;
+  lower_bound TEXT;
+  upper_bound TEXT;
+  partition_name TEXT;
+  default_name TEXT := parent || '_default';
+  key_column TEXT;
+  has_default_rows BOOLEAN;
+  created INTEGER := 0;
+BEGIN
+  SELECT a.attname INTO key_column
+  FROM pg_partitioned_table pt
+  JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+  WHERE pt.partrelid = to_regclass(parent);
+  IF key_column IS NULL THEN
+    RETURN 0;
+  END IF;
+  EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', default_name, parent);
+
+  WHILE month_start <= last_month LOOP
+    partition_name := parent || '_p' || to_char(month_start, 'YYYY_MM');
+    lower_bound := month_start::text || ' 00:00:00+00';
+    upper_bound := (month_start + INTERVAL '1 month')::date::text || ' 00:00:00+00';
+    IF to_regclass(partition_name) IS NULL THEN
+      EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                     default_name, key_column, lower_bound, key_column, upper_bound)
+        INTO has_default_rows;
+
+      IF has_default_rows THEN
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent, default_name);
+      END IF;
+      EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                     partition_name, parent, lower_bound, upper_bound);
+      IF has_default_rows THEN
+        EXECUTE format('WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+                       'INSERT INTO %I SELECT * FROM moved',
+                       default_name, key_column, lower_bound, key_column, upper_bound, parent);
+        EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I DEFAULT', parent, default_name);
+      END IF;
+      created := created + 1;
+    END IF;
+    month_start := (month_start + INTERVAL '1 month')::date;
+  END LOOP;
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_monthly_partitions('workout_sets', (CURRENT_DATE - INTERVAL '1 month')::date, (CURRENT_DATE + INTERVAL '3 months')::date);
+SELECT ensure_monthly_partitions('estimated_1rm_history', (CURRENT_DATE - INTERVAL '1 month')::date, (CURRENT_DATE + INTERVAL '3 months')::date);
+
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_exercises_created_by ON exercises(created_by);
 -- idx_exercises_name is implicitly created by UNIQUE constraint on name
@@ -241,7 +333,12 @@ CREATE INDEX IF NOT EXISTS idx_plan_metrics_plan_id ON plan_metrics(plan_id);
 CREATE INDEX IF NOT EXISTS idx_workouts_user_id_started_at ON workouts(user_id, started_at DESC);
 CREATE INDEX IF NOT EXISTS idx_workout_sets_workout_id ON workout_sets(workout_id);
 CREATE INDEX IF NOT EXISTS idx_workout_sets_exercise_id_completed_at ON workout_sets(exercise_id, completed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_workout_sets_user_exercise_completed_at ON workout_sets(user_id, exercise_id, completed_at DESC) INCLUDE (actual_weight, actual_reps, actual_rir, mti);
+CREATE INDEX IF NOT EXISTS idx_workout_sets_user_completed_at ON workout_sets(user_id, completed_at DESC) INCLUDE (exercise_id, actual_weight, actual_reps, actual_rir, mti);
+CREATE INDEX IF NOT EXISTS idx_workout_sets_completed_at_brin ON workout_sets USING brin (completed_at);
+CREATE INDEX IF NOT EXISTS idx_workout_sets_user_created_at ON workout_sets(user_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_1rm_history_user_exercise_date ON estimated_1rm_history(user_id, exercise_id, calculated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_1rm_history_calculated_at_brin ON estimated_1rm_history USING brin (calculated_at);
 CREATE INDEX IF NOT EXISTS idx_muscle_recovery_user_muscle_group ON muscle_recovery_patterns(user_id, muscle_group);
 CREATE INDEX IF NOT EXISTS idx_plateau_events_user_exercise ON plateau_events(user_id, exercise_id);
 CREATE INDEX IF NOT EXISTS idx_exercises_main_target_muscle_group ON exercises(main_target_muscle_group); -- Index for the new column
@@ -274,6 +371,36 @@ CREATE TRIGGER set_timestamp_plan_metrics
 BEFORE UPDATE ON plan_metrics
 FOR EACH ROW
 EXECUTE FUNCTION trigger_set_timestamp();
+
+-- Keep workout_sets.user_id equal to its workout's owner
+CREATE OR REPLACE FUNCTION workout_sets_set_user_id()
+RETURNS TRIGGER AS $$
+BEGIN
+  SELECT w.user_id INTO NEW.user_id FROM workouts w WHERE w.id = NEW.workout_id;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_user_id_workout_sets ON workout_sets;
+CREATE TRIGGER set_user_id_workout_sets
+BEFORE INSERT OR UPDATE OF workout_id ON workout_sets
+FOR EACH ROW
+EXECUTE FUNCTION workout_sets_set_user_id();
+
+CREATE OR REPLACE FUNCTION workouts_propagate_user_id()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE workout_sets SET user_id = NEW.user_id WHERE workout_id = NEW.id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS propagate_user_id_workouts ON workouts;
+CREATE TRIGGER propagate_user_id_workouts
+AFTER UPDATE OF user_id ON workouts
+FOR EACH ROW
+WHEN (OLD.user_id IS DISTINCT FROM NEW.user_id)
+EXECUTE FUNCTION workouts_propagate_user_id();
 """
 
 def create_schema():
@@ -285,8 +412,17 @@ def create_schema():
         # Use conn_params to report which database and host we connected to
         print(f"Successfully connected to database '{conn_params.get('dbname')}' on host '{conn_params.get('host')}'.")
         with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('users') IS NULL;")
+            fresh_install = cur.fetchone()[0]
             cur.execute(SQL_COMMANDS)
             print("Schema creation commands executed.")
+        if fresh_install:
+            # SQL_COMMANDS already mirrors every migration file.
+            from migrate import baseline
+            baseline(conn)
+            print("Recorded all migrations as applied.")
+        else:
+            print("Existing schema: apply pending migrations with `python database/migrate.py`.")
         conn.commit()
         print("Schema created successfully (or already existed).")
     except psycopg2.OperationalError as e:
@@ -0,0 +1,270 @@
+"""
+Generates a production-scale synthetic dataset for benchmarks, index tuning and
+migration rehearsals.
+
+Creates N users, each with a training plan and up to --years of history: workouts,
+workout_sets, estimated_1rm_history and mesocycles. Progress follows a saturating
+strength curve, with a three-phase mesocycle and missed weeks with detraining.
+About half of the users log a morning HRV reading with each workout.
+Rows are generated in memory per batch of users and written with COPY, so a
+run costs roughly one network round trip per table per batch.
+
+e1rm_stats and user_hrv_baselines are rebuilt for all synthetic users at the
+end (seed_data.rebuild_derived_state). volume_summaries and plan_metrics are
+left to the engine, which computes them on first read.
+
+--seed makes the generated values repeatable, but timestamps are relative to
+the time of the run, so the output differs between runs.
+
+Usage:
+    python database/seed_data.py                       # exercise catalog first
+    python database/generate_synthetic_data.py --users 10000 --years 3
+    python database/generate_synthetic_data.py --users 500 --years 1 --reset
+"""
+import argparse
+import csv
+import io
+import math
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+
+from seed_data import connect_db, rebuild_derived_state
+
+SYNTHETIC_EMAIL_TEMPLATE = "synthetic+{:07d}@example.com"
+SYNTHETIC_EMAIL_PATTERN = "synthetic+%@example.com"
+SYNTHETIC_PASSWORD = "synthetic-password"
+
+# Share of users with an HRV wearable; the others never log hrv_ms.
+HRV_USER_PROBABILITY = 0.5
+
+# Mirrors engine/mesocycles.py (PHASE_DURATIONS / PHASE_ORDER).
+MESOCYCLE_PHASES = (("accumulation", 3), ("intensification", 3), ("deload", 1))
+CYCLE_WEEKS = sum(weeks for _, weeks in MESOCYCLE_PHASES)
+
+# Per phase: (reps low, reps high, rir low, rir high, set multiplier, load multiplier)
+PHASE_PRESCRIPTION = {
+    "accumulation": (8, 12, 2, 3, 1.0, 1.0),
+    "intensification": (4, 8, 1, 2, 1.0, 1.0),
+    "deload": (6, 10, 3, 4, 0.5, 0.85),
+}
+MISSED_WEEK_PROBABILITY = 0.08
+DETRAINING_WEEKS_PER_MISSED_WEEK = 0.5  # A missed week undoes half a week of progress
+
+TABLE_COLUMNS = {
+    "users": ("id", "email", "password_hash", "name", "sex", "goal_slider", "experience_level", "rir_bias", "created_at"),
+    "workout_plans": ("id", "user_id", "name", "days_per_week", "plan_length_weeks", "goal_focus", "created_at"),
+    "plan_days": ("id", "plan_id", "day_number", "name"),
+    "plan_exercises": ("id", "plan_day_id", "exercise_id", "order_index", "sets", "rep_range_low", "rep_range_high", "target_rir", "rest_seconds"),
+    "mesocycles": ("id", "user_id", "phase", "start_date", "week_number"),
+    "workouts": ("id", "user_id", "plan_day_id", "started_at", "completed_at", "session_rpe", "fatigue_level", "sleep_hours", "stress_level", "hrv_ms"),
+    "workout_sets": ("id", "workout_id", "exercise_id", "set_number", "actual_weight", "actual_reps", "actual_rir", "rest_before_seconds", "completed_at", "mti"),
+    "estimated_1rm_history": ("id", "user_id", "exercise_id", "estimated_1rm", "calculation_method", "confidence", "calculated_at"),
+}
+# Foreign keys require this order.
+TABLE_ORDER = ("users", "workout_plans", "plan_days", "plan_exercises", "mesocycles", "workouts", "workout_sets", "estimated_1rm_history")
+
+
+class BatchWriter:
+    """Buffers rows per table as CSV and flushes them with COPY."""
+
+    def __init__(self):
+        self.buffers = {table: io.StringIO() for table in TABLE_ORDER}
+        self.writers = {table: csv.writer(buf) for table, buf in self.buffers.items()}
+        self.counts = dict.fromkeys(TABLE_ORDER, 0)
+
+    def add(self, table, row):
+        self.writers[table].writerow(row)
+        self.counts[table] += 1
+
+    def flush(self, cur):
+        for table in TABLE_ORDER:
+            buf = self.buffers[table]
+            if buf.tell() == 0:
+                continue
+            buf.seek(0)
+            cur.copy_expert(
+                f"COPY {table} ({', '.join(TABLE_COLUMNS[table])}) FROM STDIN WITH (FORMAT csv)", buf
+            )
+            self.buffers[table] = io.StringIO()
+            self.writers[table] = csv.writer(self.buffers[table])
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _mti(weight, reps, rir):
+    """Same formula as predictions.calculate_mti."""
+    return int(round(weight * max(0, reps - max(0, rir - 4))))
+
+
+def _phase_for_week(week_in_cycle):
+    offset = 0
+    for phase, weeks in MESOCYCLE_PHASES:
+        if week_in_cycle < offset + weeks:
+            return phase, week_in_cycle - offset + 1, offset
+        offset += weeks
+    raise ValueError(week_in_cycle)
+
+
+def generate_user(writer, rng, index, exercise_ids, password_hash, now, history_weeks):
+    """Writes one user with a plan and their full history into `writer`."""
+    user_id = _uuid(rng)
+    weeks = rng.randint(max(1, history_weeks * 3 // 4), history_weeks)  # Not everyone joined on day one
+    joined_at = now - timedelta(weeks=weeks, hours=rng.randint(0, 167))
+    writer.add("users", (
+        user_id, SYNTHETIC_EMAIL_TEMPLATE.format(index), password_hash, f"Synthetic {index}",
+        rng.choice(("male", "female")), round(rng.uniform(0.1, 0.9), 2),
+        rng.choice(("beginner", "intermediate", "intermediate", "advanced")),
+        round(rng.uniform(0.0, 2.5), 1), joined_at.isoformat(),
+    ))
+
+    days_per_week = rng.choice((2, 3, 3, 4, 4, 5))
+    plan_id = _uuid(rng)
+    writer.add("workout_plans", (plan_id, user_id, "Synthetic Plan", days_per_week, weeks, round(rng.uniform(0.1, 0.9), 2), joined_at.isoformat()))
+
+    plan_days = []
+    for day_number in range(1, days_per_week + 1):
+        day_id = _uuid(rng)
+        writer.add("plan_days", (day_id, plan_id, day_number, f"Day {day_number}"))
+        day_exercises = rng.sample(exercise_ids, min(len(exercise_ids), rng.randint(4, 6)))
+        for order_index, exercise_id in enumerate(day_exercises):
+            writer.add("plan_exercises", (_uuid(rng), day_id, exercise_id, order_index, 3, 6, 12, 2, rng.choice((90, 120, 180))))
+        plan_days.append((day_id, day_exercises))
+
+    # Saturating strength curve per exercise: e1rm = base * (1 + gain * (1 - exp(-t / tau)))
+    curves = {
+        exercise_id: (rng.uniform(30.0, 180.0), rng.uniform(0.15, 0.6), rng.uniform(20.0, 80.0))
+        for _, day_exercises in plan_days for exercise_id in day_exercises
+    }
+    hrv_baseline = rng.uniform(45.0, 85.0) if rng.random() < HRV_USER_PROBABILITY else None
+    training_weeks = 0.0
+    meso_row = None
+    for week in range(weeks):
+        week_start = joined_at + timedelta(weeks=week)
+        cycle_index, week_in_cycle = divmod(week, CYCLE_WEEKS)
+        if week_in_cycle == 0 and meso_row:
+            writer.add("mesocycles", meso_row)
+            meso_row = None
+        phase, week_in_phase, phase_offset = _phase_for_week(week_in_cycle)
+        # The app keeps one row per cycle and advances it in place (see mesocycles.py).
+        phase_start = joined_at.date() + timedelta(weeks=cycle_index * CYCLE_WEEKS + phase_offset)
+        meso_row = (meso_row[0] if meso_row else _uuid(rng), user_id, phase, phase_start.isoformat(), week_in_phase)
+
+        if rng.random() < MISSED_WEEK_PROBABILITY:
+            training_weeks = max(0.0, training_weeks - DETRAINING_WEEKS_PER_MISSED_WEEK)
+            continue
+        training_weeks += 1.0
+        reps_low, reps_high, rir_low, rir_high, set_multiplier, load_multiplier = PHASE_PRESCRIPTION[phase]
+
+        for day_offset, (day_id, day_exercises) in zip(sorted(rng.sample(range(7), days_per_week)), plan_days):
+            started_at = week_start + timedelta(days=day_offset, hours=rng.randint(-2, 2))
+            if started_at >= now:
+                continue
+            workout_id = _uuid(rng)
+            set_time = started_at
+            for exercise_id in day_exercises:
+                base, gain, tau = curves[exercise_id]
+                true_e1rm = base * (1.0 + gain * (1.0 - math.exp(-training_weeks / tau)))
+                for set_number in range(1, max(1, round(3 * set_multiplier)) + 1):
+                    reps = rng.randint(reps_low, reps_high)
+                    rir = rng.randint(rir_low, rir_high)
+                    weight = max(2.5, round(true_e1rm * load_multiplier / (1 + (reps + rir) / 30.0) / 2.5) * 2.5)
+                    rest = rng.choice((90, 120, 150, 180))
+                    set_time += timedelta(seconds=rest + 40)
+                    writer.add("workout_sets", (
+                        _uuid(rng), workout_id, exercise_id, set_number, weight, reps, rir, rest,
+                        set_time.isoformat(), _mti(weight, reps, rir),
+                    ))
+                    estimate = weight * (1 + (reps + rir) / 30.0) * rng.uniform(0.97, 1.03)
+                    writer.add("estimated_1rm_history", (
+                        _uuid(rng), user_id, exercise_id, round(estimate, 2), "epley_rir", 0.8, set_time.isoformat(),
+                    ))
+            writer.add("workouts", (
+                workout_id, user_id, day_id, started_at.isoformat(), (set_time + timedelta(minutes=5)).isoformat(),
+                rng.randint(5, 9), rng.randint(1, 8), round(rng.uniform(5.0, 9.0), 1), rng.randint(1, 8),
+                round(rng.gauss(hrv_baseline, 6.0), 1) if hrv_baseline else None,
+            ))
+    if meso_row:
+        writer.add("mesocycles", meso_row)
+
+
+def generate(user_count, years, batch_users=200, seed=0, reset=False):
+    import bcrypt  # Part of engine/requirements.txt
+
+    rng = random.Random(seed)
+    password_hash = bcrypt.hashpw(SYNTHETIC_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    now = datetime.now(timezone.utc)
+    history_weeks = max(1, int(round(years * 52)))
+
+    conn = None
+    try:
+        conn = connect_db()
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM exercises ORDER BY name;")
+            exercise_ids = [str(row[0]) for row in cur.fetchall()]
+            if len(exercise_ids) < 6:
+                print("The exercise catalog is empty or too small; run database/seed_data.py first.")
+                sys.exit(1)
+            if reset:
+                cur.execute("DELETE FROM users WHERE email LIKE %s;", (SYNTHETIC_EMAIL_PATTERN,))
+                print(f"Removed {cur.rowcount} previous synthetic users.")
+                conn.commit()
+            # Monthly partitions for the whole history (migration 007), so the
+            # backdated rows don't all pile up in the default partition.
+            cur.execute("SELECT to_regproc('ensure_monthly_partitions') IS NOT NULL;")
+            if cur.fetchone()[0]:
+                first_month = (now - timedelta(weeks=history_weeks + 1)).date()
+                for table in ("workout_sets", "estimated_1rm_history"):
+                    cur.execute("SELECT ensure_monthly_partitions(%s, %s, %s);", (table, first_month, now.date()))
+                conn.commit()
+
+            started = time.perf_counter()
+            totals = dict.fromkeys(TABLE_ORDER, 0)
+            for batch_start in range(0, user_count, batch_users):
+                writer = BatchWriter()
+                for index in range(batch_start, min(user_count, batch_start + batch_users)):
+                    generate_user(writer, rng, index, exercise_ids, password_hash, now, history_weeks)
+                writer.flush(cur)
+                conn.commit()
+                for table, count in writer.counts.items():
+                    totals[table] += count
+                done = min(user_count, batch_start + batch_users)
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{user_count} users, {totals['workout_sets']} sets ({sum(totals.values()) / elapsed:,.0f} rows/s)")
+
+            rebuilt = rebuild_derived_state(cur, SYNTHETIC_EMAIL_PATTERN)
+            conn.commit()
+            print("Rebuilt " + ", ".join(f"{count:,} {table}" for table, count in rebuilt.items()) + ".")
+
+            cur.execute("ANALYZE;")
+            conn.commit()
+
+        elapsed = time.perf_counter() - started
+        print(f"Generated in {elapsed:.1f}s:")
+        for table in TABLE_ORDER:
+            print(f"  {table:<24}{totals[table]:>12,}")
+    except psycopg2.Error as e:
+        print(f"Error generating synthetic data: {e}")
+        if conn:
+            conn.rollback()
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a large synthetic GymGenius dataset with COPY.")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users to create (default: 1000).")
+    parser.add_argument("--years", type=float, default=2.0, help="Maximum history depth per user in years (default: 2).")
+    parser.add_argument("--batch-users", type=int, default=200, help="Users generated per COPY batch (default: 200).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated values (default: 0).")
+    parser.add_argument("--reset", action="store_true", help="Delete previously generated synthetic users first.")
+    args = parser.parse_args()
+    generate(args.users, args.years, batch_users=args.batch_users, seed=args.seed, reset=args.reset)
@@ -0,0 +1,424 @@
+"""
+Applies the versioned SQL files in database/migrations/ and records them in
+schema_migrations.
+
+Each NNN_name.sql file is applied once, in version order. By default a file
+runs in a single transaction together with its schema_migrations row. Files
+that must not block writes on large live tables can opt out with directives,
+which are SQL comments at the start of a line:
+
+    -- migrate:no-transaction
+        Anywhere in the file. Statements run one by one in autocommit mode,
+        which allows CREATE INDEX CONCURRENTLY. Every statement must be safe to
+        re-run (IF NOT EXISTS, or a backfill that only touches unfinished rows),
+        because a failure part-way leaves the earlier statements applied.
+
+    -- migrate:batch size=5000
+        Before a statement in a no-transaction file. The statement is executed
+        repeatedly, with %(batch_size)s bound to the size, and committed after
+        each batch until it affects no rows. It must therefore only select rows
+        still needing the change, e.g.
+        `... WHERE id IN (SELECT id FROM t WHERE col IS NULL LIMIT %(batch_size)s)`.
+        Literal percent signs in such a statement are written %%.
+
+    -- migrate:foreach
+        Before a query that returns one SQL statement per row (like psql's
+        \gexec). Each returned statement is run on its own, in order, with the
+        same handling as a statement in the file. In a no-transaction file this
+        builds an index on every partition of a table CONCURRENTLY, which a DO
+        block cannot do. The generated statements must be safe to re-run.
+
+DDL waits at most MIGRATION_LOCK_TIMEOUT for its locks and is then retried, so
+a migration queued behind a long transaction never stalls set logging behind
+it. A no-transaction file retries the statement; a transactional file retries
+the whole file. CREATE INDEX statements report pg_stat_progress_create_index every
+MIGRATION_PROGRESS_INTERVAL seconds, and batched backfills report rows per
+batch. An invalid index left behind by a failed CONCURRENTLY build is dropped
+before the build is retried.
+
+Usage:
+    python database/migrate.py              # apply pending migrations
+    python database/migrate.py --status     # list applied and pending versions
+    python database/migrate.py --target 006 # apply up to and including 006
+    python database/migrate.py --baseline   # record files as applied without running them
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+
+import psycopg2
+import psycopg2.errors
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+MIGRATION_LOCK_RETRIES = int(os.getenv("MIGRATION_LOCK_RETRIES", "10"))
+MIGRATION_PROGRESS_INTERVAL = float(os.getenv("MIGRATION_PROGRESS_INTERVAL", "10"))
+# Arbitrary constant; only one runner may hold it at a time.
+ADVISORY_LOCK_KEY = 72_011_043
+
+_FILENAME = re.compile(r"^(\d+)_([A-Za-z0-9_]+)\.sql$")
+_DIRECTIVE = re.compile(r"^--\s*migrate:([a-z-]+)(.*)$")
+_DOLLAR_TAG = re.compile(r"\$[A-Za-z_]*\$")
+_CREATE_INDEX = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+(CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(\w+)",
+    re.IGNORECASE,
+)
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    execution_ms INTEGER
+);
+"""
+
+
+class Migration:
+    def __init__(self, version, name, path, sql):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.sql = sql
+        self.checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        self.statements = split_statements(sql)
+        self.transactional = not any("no-transaction" in directives for _, directives in self.statements)
+
+    def __repr__(self):
+        return f"Migration({self.version}_{self.name})"
+
+
+def discover(migrations_dir=MIGRATIONS_DIR):
+    """All migration files, sorted by version. Duplicate versions are an error."""
+    migrations = {}
+    for filename in sorted(os.listdir(migrations_dir)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version, name = match.groups()
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {filename}")
+        path = os.path.join(migrations_dir, filename)
+        with open(path, encoding="utf-8") as fh:
+            migrations[version] = Migration(version, name, path, fh.read())
+    return [migrations[v] for v in sorted(migrations, key=int)]
+
+
+def split_statements(sql):
+    """Split a SQL script into (statement, directives) pairs.
+
+    Semicolons inside quotes, dollar-quoted bodies and comments don't end a
+    statement. `directives` maps each `-- migrate:<name> key=value` comment
+    seen since the previous statement to its parsed options.
+    """
+    statements = []
+    directives = {}
+    current = []
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = n if end == -1 else end
+            match = _DIRECTIVE.match(sql[i:end].strip())
+            if match:
+                options = dict(
+                    option.split("=", 1) for option in match.group(2).split() if "=" in option
+                )
+                directives[match.group(1)] = options
+            i = end
+            continue
+        if sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if ch in ("'", '"'):
+            end = i + 1
+            while end < n:
+                if sql[end] == ch:
+                    if end + 1 < n and sql[end + 1] == ch:  # Escaped quote
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+            continue
+        if ch == "$":
+            tag = _DOLLAR_TAG.match(sql, i)
+            if tag:
+                end = sql.find(tag.group(0), tag.end())
+                end = n if end == -1 else end + len(tag.group(0))
+                current.append(sql[i:end])
+                i = end
+                continue
+        if ch == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append((statement, directives))
+            current, directives = [], {}
+            i += 1
+            continue
+        current.append(ch)
+        i += 1
+    statement = "".join(current).strip()
+    if statement:
+        statements.append((statement, directives))
+    elif directives and statements:
+        # Trailing file-level directives (e.g. no-transaction at the end).
+        statements[-1][1].update(directives)
+    return statements
+
+
+def connect():
+    from create_schema import conn_params  # Same DATABASE_URL / POSTGRES_* handling
+    return psycopg2.connect(**conn_params)
+
+
+def applied_versions(cur):
+    cur.execute("SELECT version, checksum FROM schema_migrations;")
+    return dict(cur.fetchall())
+
+
+def pending(migrations, applied, target=None):
+    """Migrations not yet applied, up to and including `target` if given."""
+    return [
+        m for m in migrations
+        if m.version not in applied and (target is None or int(m.version) <= int(target))
+    ]
+
+
+def record(cur, migration, execution_ms=None):
+    cur.execute(
+        "INSERT INTO schema_migrations (version, name, checksum, execution_ms) VALUES (%s, %s, %s, %s) "
+        "ON CONFLICT (version) DO NOTHING;",
+        (migration.version, migration.name, migration.checksum, execution_ms),
+    )
+
+
+def baseline(conn, target=None, migrations_dir=MIGRATIONS_DIR):
+    """Record migrations (up to `target`) as applied, without running them.
+
+    For schemas built by create_schema.py, which mirrors every migration, or
+    migrations already applied by hand. Leaves the transaction open for the
+    caller to commit.
+    """
+    with conn.cursor() as cur:
+        cur.execute(CREATE_MIGRATIONS_TABLE)
+        for migration in pending(discover(migrations_dir), {}, target):
+            record(cur, migration)
+
+
+class IndexProgressReporter(threading.Thread):
+    """Prints pg_stat_progress_create_index for one backend until stopped."""
+
+    def __init__(self, backend_pid, index_name, interval=MIGRATION_PROGRESS_INTERVAL):
+        super().__init__(daemon=True)
+        self.backend_pid = backend_pid
+        self.index_name = index_name
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            conn = connect()
+        except psycopg2.Error:
+            return
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                while not self._stopped.wait(self.interval):
+                    cur.execute(
+                        "SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total "
+                        "FROM pg_stat_progress_create_index WHERE pid = %s;",
+                        (self.backend_pid,),
+                    )
+                    row = cur.fetchone()
+                    if row:
+                        phase, blocks_done, blocks_total, tuples_done, tuples_total = row
+                        print(f"    {self.index_name}: {phase}, "
+                              f"blocks {blocks_done}/{blocks_total}, tuples {tuples_done}/{tuples_total}", flush=True)
+        except psycopg2.Error:
+            pass
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stopped.set()
+
+
+def _drop_invalid_index(cur, index_name):
+    """Drop `index_name` if a failed CONCURRENTLY build left it invalid."""
+    cur.execute(
+        "SELECT NOT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(%s);",
+        (index_name,),
+    )
+    row = cur.fetchone()
+    if row and row[0]:
+        print(f"    dropping invalid index {index_name} from an earlier failed build", flush=True)
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}";')
+
+
+def _lock_retry_delay(attempt):
+    print(f"    lock not granted within {MIGRATION_LOCK_TIMEOUT}, retrying ({attempt})", flush=True)
+    time.sleep(min(2 ** attempt, 30))
+
+
+def _execute_with_lock_retry(cur, statement, params=None):
+    # Inside a transaction the failed statement aborts it; apply() retries the file.
+    if not cur.connection.autocommit:
+        cur.execute(statement, params)
+        return
+    for attempt in range(1, MIGRATION_LOCK_RETRIES + 1):
+        try:
+            cur.execute(statement, params)
+            return
+        except psycopg2.errors.LockNotAvailable:
+            if attempt == MIGRATION_LOCK_RETRIES:
+                raise
+            _lock_retry_delay(attempt)
+
+
+def _run_batched(cur, statement, batch_size):
+    total, batches, started = 0, 0, time.perf_counter()
+    while True:
+        _execute_with_lock_retry(cur, statement, {"batch_size": batch_size})
+        if cur.rowcount <= 0:
+            break
+        total += cur.rowcount
+        batches += 1
+        elapsed = time.perf_counter() - started
+        print(f"    batch {batches}: {total:,} rows ({total / elapsed:,.0f} rows/s)", flush=True)
+    return total
+
+
+def _run_statement(conn, cur, statement, directives):
+    index = _CREATE_INDEX.match(statement)
+    if "foreach" in directives:
+        _execute_with_lock_retry(cur, statement)
+        for (generated,) in cur.fetchall():
+            print(f"    {generated.splitlines()[0][:100]}", flush=True)
+            _run_statement(conn, cur, generated, {})
+        return
+    if "batch" in directives:
+        _run_batched(cur, statement, int(directives["batch"].get("size", 1000)))
+        return
+    reporter = None
+    if index:
+        if index.group(1) and conn.autocommit:
+            _drop_invalid_index(cur, index.group(2))
+        reporter = IndexProgressReporter(conn.get_backend_pid(), index.group(2))
+        reporter.start()
+    try:
+        _execute_with_lock_retry(cur, statement)
+    finally:
+        if reporter:
+            reporter.stop()
+
+
+def apply(conn, migration):
+    """Apply one migration and record it. Returns the elapsed milliseconds."""
+    started = time.perf_counter()
+    mode = "transaction" if migration.transactional else "no-transaction"
+    print(f"Applying {migration.version}_{migration.name} ({mode}, {len(migration.statements)} statements)", flush=True)
+    if migration.transactional:
+        if any("batch" in directives for _, directives in migration.statements):
+            raise ValueError(f"{migration.path}: migrate:batch requires migrate:no-transaction")
+        conn.autocommit = False
+        for attempt in range(1, MIGRATION_LOCK_RETRIES + 1):
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SET LOCAL lock_timeout = %s;", (MIGRATION_LOCK_TIMEOUT,))
+                    for statement, directives in migration.statements:
+                        _run_statement(conn, cur, statement, directives)
+                    execution_ms = int((time.perf_counter() - started) * 1000)
+                    record(cur, migration, execution_ms)
+                conn.commit()
+                break
+            except psycopg2.errors.LockNotAvailable:
+                conn.rollback()
+                if attempt == MIGRATION_LOCK_RETRIES:
+                    raise
+                _lock_retry_delay(attempt)
+            except Exception:
+                conn.rollback()
+                raise
+    else:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SET lock_timeout = %s;", (MIGRATION_LOCK_TIMEOUT,))
+            for number, (statement, directives) in enumerate(migration.statements, start=1):
+                print(f"  [{number}/{len(migration.statements)}] {statement.splitlines()[0][:80]}", flush=True)
+                _run_statement(conn, cur, statement, directives)
+            execution_ms = int((time.perf_counter() - started) * 1000)
+            record(cur, migration, execution_ms)
+        conn.autocommit = False
+    print(f"Applied {migration.version}_{migration.name} in {execution_ms / 1000.0:.1f}s", flush=True)
+    return execution_ms
+
+
+def migrate(target=None, status_only=False):
+    migrations = discover()
+    conn = connect()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(CREATE_MIGRATIONS_TABLE)
+            cur.execute("SELECT pg_try_advisory_lock(%s);", (ADVISORY_LOCK_KEY,))
+            if not cur.fetchone()[0]:
+                print("Another migration run holds the lock; exiting.")
+                return 1
+            applied = applied_versions(cur)
+        conn.autocommit = False
+
+        for migration in migrations:
+            if migration.version in applied and applied[migration.version] != migration.checksum:
+                print(f"Warning: {migration.version}_{migration.name} changed after it was applied.")
+        todo = pending(migrations, applied, target)
+        if status_only:
+            for migration in migrations:
+                state = "applied" if migration.version in applied else "pending"
+                print(f"{migration.version}_{migration.name:<40}{state}")
+            return 0
+        if not todo:
+            print("Database is up to date.")
+            return 0
+        for migration in todo:
+            apply(conn, migration)
+        return 0
+    finally:
+        conn.close()  # Also releases the advisory lock
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database/migrations/*.sql in version order.")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations and exit.")
+    parser.add_argument("--target", help="Apply pending migrations up to and including this version.")
+    parser.add_argument("--baseline", action="store_true",
+                        help="Record migrations (up to --target) as applied without running them, "
+                             "for schemas built by create_schema.py or migrated by hand.")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.baseline:
+            conn = connect()
+            try:
+                baseline(conn, target=args.target)
+                conn.commit()
+            finally:
+                conn.close()
+            print(f"Recorded migrations up to {args.target or 'the latest'} as applied.")
+            return 0
+        return migrate(target=args.target, status_only=args.status)
+    except psycopg2.Error as e:
+        print(f"Migration failed: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
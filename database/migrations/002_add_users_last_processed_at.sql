@@ -0,0 +1,4 @@
+-- Watermark for the nightly pipeline: users are only reprocessed when they
+-- have workout_sets completed after this timestamp (or on a forced run).
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS last_processed_at TIMESTAMP WITH TIME ZONE NULL;
@@ -0,0 +1,48 @@
+-- Rolling 30-day HRV baseline per user, maintained by update_workout_summary
+-- and read by readiness.get_personal_hrv_baseline.
+-- Ring slot for a day d is (d - DATE '2000-01-01') % 30 (0-based; arrays are 1-based).
+ALTER TABLE workouts
+    ADD COLUMN IF NOT EXISTS hrv_ms NUMERIC(6,1) NULL;
+
+CREATE TABLE IF NOT EXISTS user_hrv_baselines (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    hrv_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    hrv_count INTEGER NOT NULL DEFAULT 0,
+    day_sums DOUBLE PRECISION[] NOT NULL DEFAULT array_fill(0::double precision, ARRAY[30]),
+    day_counts INTEGER[] NOT NULL DEFAULT array_fill(0, ARRAY[30]),
+    ring_day DATE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Backfill from the last 30 UTC days of workouts.
+WITH daily AS (
+    SELECT user_id,
+           (completed_at AT TIME ZONE 'UTC')::date AS day,
+           SUM(hrv_ms)::double precision AS day_sum,
+           COUNT(*)::integer AS day_count
+    FROM workouts
+    WHERE hrv_ms IS NOT NULL
+      AND completed_at IS NOT NULL
+      AND (completed_at AT TIME ZONE 'UTC')::date > (NOW() AT TIME ZONE 'UTC')::date - 30
+      AND (completed_at AT TIME ZONE 'UTC')::date <= (NOW() AT TIME ZONE 'UTC')::date
+    GROUP BY user_id, (completed_at AT TIME ZONE 'UTC')::date
+),
+grid AS (
+    SELECT u.user_id, s.slot,
+           COALESCE(d.day_sum, 0) AS day_sum,
+           COALESCE(d.day_count, 0) AS day_count
+    FROM (SELECT DISTINCT user_id FROM daily) u
+    CROSS JOIN generate_series(0, 29) AS s(slot)
+    LEFT JOIN daily d
+      ON d.user_id = u.user_id AND (d.day - DATE '2000-01-01') % 30 = s.slot
+)
+INSERT INTO user_hrv_baselines (user_id, hrv_sum, hrv_count, day_sums, day_counts, ring_day)
+SELECT user_id,
+       SUM(day_sum),
+       SUM(day_count),
+       array_agg(day_sum ORDER BY slot),
+       array_agg(day_count ORDER BY slot),
+       (NOW() AT TIME ZONE 'UTC')::date
+FROM grid
+GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
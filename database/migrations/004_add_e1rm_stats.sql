@@ -0,0 +1,37 @@
+-- Sliding-window least-squares state per user/exercise e1RM series, kept up
+-- to date by engine/e1rm_history.record_e1rm. Window size is 15 estimates.
+CREATE TABLE IF NOT EXISTS e1rm_stats (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    exercise_id UUID NOT NULL REFERENCES exercises(id) ON DELETE CASCADE,
+    n INTEGER NOT NULL DEFAULT 0,
+    next_x BIGINT NOT NULL DEFAULT 0,
+    sum_x DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sum_y DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sum_xy DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sum_xx DOUBLE PRECISION NOT NULL DEFAULT 0,
+    window_values DOUBLE PRECISION[] NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, exercise_id)
+);
+
+-- Backfill from the latest 15 estimates of every pair; x runs 0..n-1 oldest first.
+WITH ranked AS (
+    SELECT user_id, exercise_id, estimated_1rm::double precision AS y,
+           ROW_NUMBER() OVER (PARTITION BY user_id, exercise_id ORDER BY calculated_at DESC, id DESC) AS rn
+    FROM estimated_1rm_history
+    WHERE user_id IS NOT NULL AND exercise_id IS NOT NULL AND estimated_1rm IS NOT NULL
+),
+windowed AS (
+    SELECT user_id, exercise_id, y,
+           (COUNT(*) OVER (PARTITION BY user_id, exercise_id) - rn)::double precision AS x
+    FROM ranked
+    WHERE rn <= 15
+)
+INSERT INTO e1rm_stats (user_id, exercise_id, n, next_x, sum_x, sum_y, sum_xy, sum_xx, window_values)
+SELECT user_id, exercise_id,
+       COUNT(*), COUNT(*),
+       SUM(x), SUM(y), SUM(x * y), SUM(x * x),
+       array_agg(y ORDER BY x)
+FROM windowed
+GROUP BY user_id, exercise_id
+ON CONFLICT (user_id, exercise_id) DO NOTHING;
@@ -0,0 +1,20 @@
+-- Windowed Welford state for the e1RM confidence score (engine/e1rm_history.py),
+-- over the last 10 estimates of each pair.
+ALTER TABLE e1rm_stats
+    ADD COLUMN IF NOT EXISTS conf_n INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS conf_mean DOUBLE PRECISION NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS conf_m2 DOUBLE PRECISION NOT NULL DEFAULT 0;
+
+-- Backfill from the newest 10 entries of the existing trend window.
+UPDATE e1rm_stats s
+SET conf_n = c.cnt, conf_mean = c.mean, conf_m2 = c.m2
+FROM (
+    SELECT user_id, exercise_id,
+           COUNT(*) AS cnt,
+           AVG(v) AS mean,
+           COALESCE(VAR_SAMP(v) * (COUNT(*) - 1), 0) AS m2
+    FROM e1rm_stats,
+         LATERAL unnest(window_values[GREATEST(cardinality(window_values) - 9, 1):]) AS v
+    GROUP BY user_id, exercise_id
+) c
+WHERE s.user_id = c.user_id AND s.exercise_id = c.exercise_id;
@@ -0,0 +1,64 @@
+-- Denormalized owner on workout_sets, so per-user set queries read one table
+-- instead of joining workouts just to filter on user_id. Derived from
+-- workouts.user_id and maintained by triggers. No FK is needed because rows
+-- already cascade through workout_id.
+--
+-- Applied online by database/migrate.py: statements run outside a transaction,
+-- the backfill commits in batches and the indexes are built concurrently, so
+-- set logging is never blocked for longer than a metadata-only lock.
+-- migrate:no-transaction
+ALTER TABLE workout_sets ADD COLUMN IF NOT EXISTS user_id UUID;
+
+CREATE OR REPLACE FUNCTION workout_sets_set_user_id()
+RETURNS TRIGGER AS $$
+BEGIN
+  SELECT w.user_id INTO NEW.user_id FROM workouts w WHERE w.id = NEW.workout_id;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_user_id_workout_sets ON workout_sets;
+CREATE TRIGGER set_user_id_workout_sets
+BEFORE INSERT OR UPDATE OF workout_id ON workout_sets
+FOR EACH ROW
+EXECUTE FUNCTION workout_sets_set_user_id();
+
+CREATE OR REPLACE FUNCTION workouts_propagate_user_id()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE workout_sets SET user_id = NEW.user_id WHERE workout_id = NEW.id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS propagate_user_id_workouts ON workouts;
+CREATE TRIGGER propagate_user_id_workouts
+AFTER UPDATE OF user_id ON workouts
+FOR EACH ROW
+WHEN (OLD.user_id IS DISTINCT FROM NEW.user_id)
+EXECUTE FUNCTION workouts_propagate_user_id();
+
+-- Backfill after the triggers exist, so sets inserted meanwhile are covered.
+-- migrate:batch size=5000
+UPDATE workout_sets ws
+SET user_id = w.user_id
+FROM workouts w
+WHERE w.id = ws.workout_id
+  AND ws.id IN (
+    SELECT s.id FROM workout_sets s
+    JOIN workouts sw ON sw.id = s.workout_id
+    WHERE s.user_id IS NULL AND sw.user_id IS NOT NULL
+    LIMIT %(batch_size)s
+  );
+
+-- Covering indexes: per-exercise history (mti-trends, mti-history, previous
+-- performance) and per-user time ranges (volume, heatmap, fatigue, export)
+-- become index-only scans.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workout_sets_user_exercise_completed_at
+    ON workout_sets (user_id, exercise_id, completed_at DESC)
+    INCLUDE (actual_weight, actual_reps, actual_rir, mti);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workout_sets_user_completed_at
+    ON workout_sets (user_id, completed_at DESC)
+    INCLUDE (exercise_id, actual_weight, actual_reps, actual_rir, mti);
+
+ANALYZE workout_sets;
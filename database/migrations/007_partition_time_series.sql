@@ -0,0 +1,165 @@
+-- Monthly range partitioning for the two append-mostly time series,
+-- workout_sets (by completed_at) and estimated_1rm_history (by calculated_at).
+-- Hot-path indexes then stay the size of a month, queries with a time bound
+-- prune old partitions, and archiving a month becomes DETACH PARTITION.
+--
+-- The tables are rebuilt and copied in one transaction, so run this in a
+-- maintenance window. Needs PostgreSQL 13+ (BEFORE ROW triggers on partitioned
+-- tables). Partitions for future months are created nightly by
+-- engine/partitions.py, and rows outside every partition land in <table>_default.
+--
+-- Partitioned tables can't enforce uniqueness without the partition key, so
+-- workout_sets drops UNIQUE (workout_id, exercise_id, set_number); set numbers
+-- are still assigned by the API as MAX(set_number) + 1.
+
+-- Creates <parent>_default and <parent>_pYYYY_MM partitions for every month in
+-- [first_month, last_month]. Rows already sitting in the default partition for
+-- such a month are moved into the new partition. Returns the number of monthly
+-- partitions created; 0 if `parent` isn't partitioned (e.g. before this
+-- migration has run).
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent TEXT, first_month DATE, last_month DATE)
+RETURNS INTEGER AS $$
+DECLARE
+  month_start DATE := date_trunc('month', first_month)::date;
+  lower_bound TEXT;
+  upper_bound TEXT;
+  partition_name TEXT;
+  default_name TEXT := parent || '_default';
+  key_column TEXT;
+  has_default_rows BOOLEAN;
+  created INTEGER := 0;
+BEGIN
+  SELECT a.attname INTO key_column
+  FROM pg_partitioned_table pt
+  JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+  WHERE pt.partrelid = to_regclass(parent);
+  IF key_column IS NULL THEN
+    RETURN 0;
+  END IF;
+  EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', default_name, parent);
+
+  WHILE month_start <= last_month LOOP
+    partition_name := parent || '_p' || to_char(month_start, 'YYYY_MM');
+    lower_bound := month_start::text || ' 00:00:00+00';
+    upper_bound := (month_start + INTERVAL '1 month')::date::text || ' 00:00:00+00';
+    IF to_regclass(partition_name) IS NULL THEN
+      EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                     default_name, key_column, lower_bound, key_column, upper_bound)
+        INTO has_default_rows;
+
+      IF has_default_rows THEN
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent, default_name);
+      END IF;
+      EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                     partition_name, parent, lower_bound, upper_bound);
+      IF has_default_rows THEN
+        EXECUTE format('WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+                       'INSERT INTO %I SELECT * FROM moved',
+                       default_name, key_column, lower_bound, key_column, upper_bound, parent);
+        EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I DEFAULT', parent, default_name);
+      END IF;
+      created := created + 1;
+    END IF;
+    month_start := (month_start + INTERVAL '1 month')::date;
+  END LOOP;
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Frees index and constraint names on a table that is about to be replaced.
+CREATE OR REPLACE FUNCTION _rename_indexes_with_suffix(tbl TEXT, suffix TEXT)
+RETURNS VOID AS $$
+DECLARE
+  r RECORD;
+BEGIN
+  FOR r IN
+    SELECT c.conname AS name FROM pg_constraint c
+    WHERE c.conrelid = to_regclass(tbl) AND c.contype IN ('p', 'u')
+  LOOP
+    EXECUTE format('ALTER TABLE %I RENAME CONSTRAINT %I TO %I', tbl, r.name, left(r.name, 50) || suffix);
+  END LOOP;
+  FOR r IN
+    SELECT i.indexrelid::regclass::text AS name FROM pg_index i
+    WHERE i.indrelid = to_regclass(tbl)
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+  LOOP
+    EXECUTE format('ALTER INDEX %I RENAME TO %I', r.name, left(r.name, 50) || suffix);
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- workout_sets ------------------------------------------------------------
+
+ALTER TABLE workout_sets RENAME TO workout_sets_unpartitioned;
+SELECT _rename_indexes_with_suffix('workout_sets_unpartitioned', '_old');
+
+-- The partition key must be NOT NULL; both API insert paths always set it.
+UPDATE workout_sets_unpartitioned ws
+SET completed_at = COALESCE(w.completed_at, w.started_at, CURRENT_TIMESTAMP)
+FROM workouts w
+WHERE ws.completed_at IS NULL AND w.id = ws.workout_id;
+UPDATE workout_sets_unpartitioned SET completed_at = CURRENT_TIMESTAMP WHERE completed_at IS NULL;
+
+CREATE TABLE workout_sets (LIKE workout_sets_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (completed_at);
+ALTER TABLE workout_sets
+    ALTER COLUMN completed_at SET DEFAULT CURRENT_TIMESTAMP,
+    ALTER COLUMN completed_at SET NOT NULL,
+    ADD PRIMARY KEY (id, completed_at),
+    ADD FOREIGN KEY (workout_id) REFERENCES workouts(id) ON DELETE CASCADE,
+    ADD FOREIGN KEY (exercise_id) REFERENCES exercises(id) ON DELETE RESTRICT;
+SELECT ensure_monthly_partitions(
+    'workout_sets',
+    COALESCE((SELECT MIN(completed_at) FROM workout_sets_unpartitioned), CURRENT_TIMESTAMP)::date,
+    (CURRENT_TIMESTAMP + INTERVAL '3 months')::date
+);
+
+INSERT INTO workout_sets SELECT * FROM workout_sets_unpartitioned;
+DROP TABLE workout_sets_unpartitioned;
+
+CREATE INDEX IF NOT EXISTS idx_workout_sets_workout_id ON workout_sets(workout_id);
+CREATE INDEX IF NOT EXISTS idx_workout_sets_exercise_id_completed_at ON workout_sets(exercise_id, completed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_workout_sets_user_exercise_completed_at
+    ON workout_sets (user_id, exercise_id, completed_at DESC)
+    INCLUDE (actual_weight, actual_reps, actual_rir, mti);
+CREATE INDEX IF NOT EXISTS idx_workout_sets_user_completed_at
+    ON workout_sets (user_id, completed_at DESC)
+    INCLUDE (exercise_id, actual_weight, actual_reps, actual_rir, mti);
+CREATE INDEX IF NOT EXISTS idx_workout_sets_completed_at_brin ON workout_sets USING brin (completed_at);
+
+-- Recreated after the copy so it doesn't fire per copied row (user_id is already backfilled).
+DROP TRIGGER IF EXISTS set_user_id_workout_sets ON workout_sets;
+CREATE TRIGGER set_user_id_workout_sets
+BEFORE INSERT OR UPDATE OF workout_id ON workout_sets
+FOR EACH ROW
+EXECUTE FUNCTION workout_sets_set_user_id();
+
+-- estimated_1rm_history ---------------------------------------------------
+
+ALTER TABLE estimated_1rm_history RENAME TO estimated_1rm_history_unpartitioned;
+SELECT _rename_indexes_with_suffix('estimated_1rm_history_unpartitioned', '_old');
+UPDATE estimated_1rm_history_unpartitioned SET calculated_at = CURRENT_TIMESTAMP WHERE calculated_at IS NULL;
+
+CREATE TABLE estimated_1rm_history (LIKE estimated_1rm_history_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (calculated_at);
+ALTER TABLE estimated_1rm_history
+    ALTER COLUMN calculated_at SET NOT NULL,
+    ADD PRIMARY KEY (id, calculated_at),
+    ADD FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    ADD FOREIGN KEY (exercise_id) REFERENCES exercises(id) ON DELETE CASCADE;
+SELECT ensure_monthly_partitions(
+    'estimated_1rm_history',
+    COALESCE((SELECT MIN(calculated_at) FROM estimated_1rm_history_unpartitioned), CURRENT_TIMESTAMP)::date,
+    (CURRENT_TIMESTAMP + INTERVAL '3 months')::date
+);
+
+INSERT INTO estimated_1rm_history SELECT * FROM estimated_1rm_history_unpartitioned;
+DROP TABLE estimated_1rm_history_unpartitioned;
+
+CREATE INDEX IF NOT EXISTS idx_1rm_history_user_exercise_date ON estimated_1rm_history(user_id, exercise_id, calculated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_1rm_history_calculated_at_brin ON estimated_1rm_history USING brin (calculated_at);
+
+DROP FUNCTION _rename_indexes_with_suffix(TEXT, TEXT);
+
+ANALYZE workout_sets;
+ANALYZE estimated_1rm_history;
@@ -0,0 +1,39 @@
+-- Server-side insert and edit times of each set. The API already writes both.
+-- The nightly pipeline selects users by created_at
+-- (user_model_updates.select_users_to_process) rather than completed_at, which
+-- is client-supplied and can be backdated for sets synced after offline logging.
+-- Existing rows keep NULL and are not re-selected.
+--
+-- Applied online by database/migrate.py. Adding nullable columns is
+-- metadata-only. The index is created on the partitioned parent only, built
+-- CONCURRENTLY on each partition and then attached, so set logging is never
+-- blocked by the build. Partitions created later get the index automatically.
+-- migrate:no-transaction
+ALTER TABLE workout_sets
+    ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE,
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE workout_sets
+    ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP,
+    ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_workout_sets_user_created_at ON ONLY workout_sets (user_id, created_at);
+
+-- migrate:foreach
+SELECT format('CREATE INDEX CONCURRENTLY IF NOT EXISTS %I ON %I (user_id, created_at)',
+              c.relname || '_user_created_at_idx', c.relname)
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'workout_sets'::regclass
+ORDER BY c.relname;
+
+-- migrate:foreach
+SELECT format('ALTER INDEX idx_workout_sets_user_created_at ATTACH PARTITION %I',
+              c.relname || '_user_created_at_idx')
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'workout_sets'::regclass
+  AND NOT EXISTS (
+      SELECT 1 FROM pg_inherits attached
+      WHERE attached.inhrelid = to_regclass(c.relname || '_user_created_at_idx')
+  )
+ORDER BY c.relname;
@@ -1,8 +1,12 @@
 import psycopg2
 from psycopg2 import sql
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
+import argparse
 import os
+import random
 import sys
+import uuid
+from datetime import datetime, timedelta, timezone
 
 # Database connection details from environment variables
 DB_NAME = os.getenv("POSTGRES_DB", "gymgenius")
@@ -11,6 +15,101 @@ DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "password")
 DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
 DB_PORT = os.getenv("POSTGRES_PORT", "5432")
 
+# Load-test accounts (see benchmarks/load_test.py). All share one password.
+LOAD_TEST_EMAIL_TEMPLATE = "loadtest+{:05d}@example.com"
+LOAD_TEST_EMAIL_PATTERN = "loadtest+%@example.com"
+LOAD_TEST_PASSWORD = "loadtest-password"
+LOAD_TEST_DAYS_PER_WEEK = 3
+LOAD_TEST_EXERCISES_PER_DAY = 4
+LOAD_TEST_SETS_PER_EXERCISE = 3
+
+# engine/, for exercise_catalog.bump_catalog_version.
+ENGINE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "engine")
+
+# e1rm_stats window sizes; mirror engine/constants.py (PLATEAU_CHECK_WINDOW / CONFIDENCE_WINDOW).
+E1RM_TREND_WINDOW = 15
+E1RM_CONFIDENCE_WINDOW = 10
+
+# Rebuilds e1rm_stats from estimated_1rm_history, like the backfills in
+# migrations 004 and 005, for the users whose email matches the pattern.
+REBUILD_E1RM_STATS_SQL = """
+WITH ranked AS (
+    SELECT h.user_id, h.exercise_id, h.estimated_1rm::double precision AS y, h.calculated_at,
+           ROW_NUMBER() OVER (PARTITION BY h.user_id, h.exercise_id ORDER BY h.calculated_at DESC, h.id DESC) AS rn
+    FROM estimated_1rm_history h
+    JOIN users u ON u.id = h.user_id
+    WHERE u.email LIKE %(email_pattern)s AND h.exercise_id IS NOT NULL
+),
+windowed AS (
+    SELECT user_id, exercise_id, y, rn, calculated_at,
+           (COUNT(*) OVER (PARTITION BY user_id, exercise_id) - rn)::double precision AS x
+    FROM ranked
+    WHERE rn <= %(trend_window)s
+)
+INSERT INTO e1rm_stats (
+    user_id, exercise_id, n, next_x, sum_x, sum_y, sum_xy, sum_xx, window_values,
+    conf_n, conf_mean, conf_m2, updated_at
+)
+SELECT user_id, exercise_id,
+       COUNT(*), COUNT(*),
+       SUM(x), SUM(y), SUM(x * y), SUM(x * x),
+       array_agg(y ORDER BY x),
+       COUNT(*) FILTER (WHERE rn <= %(confidence_window)s),
+       AVG(y) FILTER (WHERE rn <= %(confidence_window)s),
+       COALESCE(VAR_SAMP(y) FILTER (WHERE rn <= %(confidence_window)s)
+                * (COUNT(*) FILTER (WHERE rn <= %(confidence_window)s) - 1), 0),
+       MAX(calculated_at)
+FROM windowed
+GROUP BY user_id, exercise_id
+ON CONFLICT (user_id, exercise_id) DO UPDATE SET
+    n = EXCLUDED.n, next_x = EXCLUDED.next_x,
+    sum_x = EXCLUDED.sum_x, sum_y = EXCLUDED.sum_y, sum_xy = EXCLUDED.sum_xy, sum_xx = EXCLUDED.sum_xx,
+    window_values = EXCLUDED.window_values,
+    conf_n = EXCLUDED.conf_n, conf_mean = EXCLUDED.conf_mean, conf_m2 = EXCLUDED.conf_m2,
+    updated_at = EXCLUDED.updated_at;
+"""
+
+# Rebuilds user_hrv_baselines from the last 30 UTC days of workouts, like the
+# backfill in migration 003, for the users whose email matches the pattern.
+REBUILD_HRV_BASELINES_SQL = """
+WITH daily AS (
+    SELECT w.user_id,
+           (w.completed_at AT TIME ZONE 'UTC')::date AS day,
+           SUM(w.hrv_ms)::double precision AS day_sum,
+           COUNT(*)::integer AS day_count
+    FROM workouts w
+    JOIN users u ON u.id = w.user_id
+    WHERE u.email LIKE %(email_pattern)s
+      AND w.hrv_ms IS NOT NULL
+      AND w.completed_at IS NOT NULL
+      AND (w.completed_at AT TIME ZONE 'UTC')::date > (NOW() AT TIME ZONE 'UTC')::date - 30
+      AND (w.completed_at AT TIME ZONE 'UTC')::date <= (NOW() AT TIME ZONE 'UTC')::date
+    GROUP BY w.user_id, (w.completed_at AT TIME ZONE 'UTC')::date
+),
+grid AS (
+    SELECT u.user_id, s.slot,
+           COALESCE(d.day_sum, 0) AS day_sum,
+           COALESCE(d.day_count, 0) AS day_count
+    FROM (SELECT DISTINCT user_id FROM daily) u
+    CROSS JOIN generate_series(0, 29) AS s(slot)
+    LEFT JOIN daily d
+      ON d.user_id = u.user_id AND (d.day - DATE '2000-01-01') %% 30 = s.slot
+)
+INSERT INTO user_hrv_baselines (user_id, hrv_sum, hrv_count, day_sums, day_counts, ring_day)
+SELECT user_id,
+       SUM(day_sum),
+       SUM(day_count),
+       array_agg(day_sum ORDER BY slot),
+       array_agg(day_count ORDER BY slot),
+       (NOW() AT TIME ZONE 'UTC')::date
+FROM grid
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    hrv_sum = EXCLUDED.hrv_sum, hrv_count = EXCLUDED.hrv_count,
+    day_sums = EXCLUDED.day_sums, day_counts = EXCLUDED.day_counts,
+    ring_day = EXCLUDED.ring_day, updated_at = CURRENT_TIMESTAMP;
+"""
+
 # Exercise data to be seeded
 EXERCISES_DATA = [
     {
@@ -698,18 +797,45 @@ def get_main_target_muscle(primary_muscles_dict):
             main_muscle = muscle
     return main_muscle
 
+def connect_db():
+    return psycopg2.connect(
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT
+    )
+
+def rebuild_derived_state(cur, email_pattern):
+    """
+    Rebuilds e1rm_stats and user_hrv_baselines for the users whose email matches
+    `email_pattern`. Bulk-loaded history bypasses the API, which otherwise keeps
+    both up to date as sets and workouts are logged. Returns the rows written
+    per table.
+    """
+    params = {
+        "email_pattern": email_pattern,
+        "trend_window": E1RM_TREND_WINDOW,
+        "confidence_window": E1RM_CONFIDENCE_WINDOW,
+    }
+    rebuilt = {}
+    for table, statement in (("e1rm_stats", REBUILD_E1RM_STATS_SQL), ("user_hrv_baselines", REBUILD_HRV_BASELINES_SQL)):
+        cur.execute(statement, params)
+        rebuilt[table] = cur.rowcount
+    return rebuilt
+
+def bump_exercise_catalog_version():
+    """Tell running engines to reload their in-process exercise catalog."""
+    sys.path.insert(0, ENGINE_DIR)
+    from exercise_catalog import bump_catalog_version  # Needs redis, part of engine/requirements.txt
+    bump_catalog_version()
+
 def seed_exercises():
     """Connects to the PostgreSQL database and seeds the exercises table."""
     conn = None
     inserted_count = 0
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
+        conn = connect_db()
         print(f"Successfully connected to database '{DB_NAME}' on host '{DB_HOST}' for seeding.")
 
         # Prepare data by adding main_target_muscle_group
@@ -778,6 +904,7 @@ def seed_exercises():
         conn.commit()
         if inserted_count > 0:
             print(f"Successfully processed (inserted or updated) {inserted_count} exercises in the 'exercises' table.")
+            bump_exercise_catalog_version()
         else:
             # This case might be hit if all exercises existed and were identical, or if rowcount behavior is subtle.
             print("No exercises were newly inserted or updated. They might already exist and match the seed data.")
@@ -797,7 +924,122 @@ def seed_exercises():
             conn.close()
             print("Database connection closed after seeding.")
 
+def seed_load_test_users(user_count, history_weeks=8, seed=0):
+    """
+    Creates `user_count` load-test users, each with a plan and `history_weeks`
+    of logged workouts and e1RM history (with its e1rm_stats), so the API paths
+    exercised by benchmarks/load_test.py hit realistic data. Existing load-test users are
+    deleted first (cascading to their plans and logs), so re-running resets them.
+    Requires the exercises to be seeded.
+    """
+    import bcrypt  # Only needed for load-test seeding; part of engine/requirements.txt
+
+    rng = random.Random(seed)
+    password_hash = bcrypt.hashpw(LOAD_TEST_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    now = datetime.now(timezone.utc)
+
+    conn = None
+    try:
+        conn = connect_db()
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM exercises WHERE is_public ORDER BY name;")
+            exercise_ids = [row[0] for row in cur.fetchall()]
+            needed = LOAD_TEST_DAYS_PER_WEEK * LOAD_TEST_EXERCISES_PER_DAY
+            if len(exercise_ids) < needed:
+                print(f"Need at least {needed} public exercises for load-test plans; seed exercises first.")
+                sys.exit(1)
+
+            cur.execute("DELETE FROM users WHERE email LIKE %s;", (LOAD_TEST_EMAIL_PATTERN,))
+            print(f"Removed {cur.rowcount} previous load-test users.")
+
+            for i in range(user_count):
+                user_id = str(uuid.uuid4())
+                plan_id = str(uuid.uuid4())
+                cur.execute(
+                    "INSERT INTO users (id, email, password_hash, name, goal_slider, rir_bias) VALUES (%s, %s, %s, %s, %s, %s);",
+                    (user_id, LOAD_TEST_EMAIL_TEMPLATE.format(i), password_hash, f"Load Test {i}",
+                     round(rng.uniform(0.2, 0.8), 2), round(rng.uniform(0.0, 2.0), 1))
+                )
+                cur.execute(
+                    "INSERT INTO workout_plans (id, user_id, name, days_per_week, plan_length_weeks) VALUES (%s, %s, %s, %s, %s);",
+                    (plan_id, user_id, "Load Test Plan", LOAD_TEST_DAYS_PER_WEEK, history_weeks)
+                )
+
+                day_rows, plan_exercise_rows, day_exercises = [], [], {}
+                chosen = rng.sample(exercise_ids, needed)
+                for day_number in range(1, LOAD_TEST_DAYS_PER_WEEK + 1):
+                    day_id = str(uuid.uuid4())
+                    day_rows.append((day_id, plan_id, day_number, f"Day {day_number}"))
+                    day_exercises[day_id] = chosen[(day_number - 1) * LOAD_TEST_EXERCISES_PER_DAY:day_number * LOAD_TEST_EXERCISES_PER_DAY]
+                    for order_index, exercise_id in enumerate(day_exercises[day_id]):
+                        plan_exercise_rows.append((day_id, exercise_id, order_index, LOAD_TEST_SETS_PER_EXERCISE, 6, 10, 2, 120))
+                execute_values(cur, "INSERT INTO plan_days (id, plan_id, day_number, name) VALUES %s;", day_rows)
+                execute_values(
+                    cur,
+                    "INSERT INTO plan_exercises (plan_day_id, exercise_id, order_index, sets, rep_range_low, rep_range_high, target_rir, rest_seconds) VALUES %s;",
+                    plan_exercise_rows
+                )
+
+                # History: one workout per plan day per week, oldest first, with slow linear progress.
+                base_e1rm = {exercise_id: rng.uniform(40.0, 160.0) for exercise_id in chosen}
+                workout_rows, set_rows, e1rm_rows = [], [], []
+                for week in range(history_weeks):
+                    for day_index, (day_id, exercises) in enumerate(day_exercises.items()):
+                        started_at = now - timedelta(weeks=history_weeks - week) + timedelta(days=2 * day_index)
+                        workout_id = str(uuid.uuid4())
+                        workout_rows.append((workout_id, user_id, day_id, started_at, started_at + timedelta(hours=1), rng.randint(6, 9)))
+                        for exercise_id in exercises:
+                            e1rm = base_e1rm[exercise_id] * (1.0 + 0.01 * week) + rng.gauss(0, 1.0)
+                            for set_number in range(1, LOAD_TEST_SETS_PER_EXERCISE + 1):
+                                reps = rng.randint(6, 10)
+                                rir = rng.randint(0, 3)
+                                weight = round(e1rm / (1 + (reps + rir) / 30.0) / 2.5) * 2.5
+                                set_rows.append((workout_id, exercise_id, set_number, weight, reps, rir,
+                                                 started_at + timedelta(minutes=5 * set_number)))
+                            e1rm_rows.append((user_id, exercise_id, round(e1rm, 2), 'epley_rir', started_at))
+                execute_values(
+                    cur,
+                    "INSERT INTO workouts (id, user_id, plan_day_id, started_at, completed_at, session_rpe) VALUES %s;",
+                    workout_rows
+                )
+                execute_values(
+                    cur,
+                    "INSERT INTO workout_sets (workout_id, exercise_id, set_number, actual_weight, actual_reps, actual_rir, completed_at) VALUES %s;",
+                    set_rows, page_size=1000
+                )
+                execute_values(
+                    cur,
+                    "INSERT INTO estimated_1rm_history (user_id, exercise_id, estimated_1rm, calculation_method, calculated_at) VALUES %s;",
+                    e1rm_rows, page_size=1000
+                )
+                if (i + 1) % 100 == 0:
+                    conn.commit()
+                    print(f"Seeded {i + 1}/{user_count} load-test users...")
+
+            rebuild_derived_state(cur, LOAD_TEST_EMAIL_PATTERN)
+        conn.commit()
+        print(f"Seeded {user_count} load-test users ({LOAD_TEST_EMAIL_TEMPLATE.format(0)} ...) "
+              f"with {history_weeks} weeks of history each. Password: {LOAD_TEST_PASSWORD}")
+    except psycopg2.Error as e:
+        print(f"Error seeding load-test users: {e}")
+        if conn:
+            conn.rollback()
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed GymGenius reference data and, optionally, load-test users.")
+    parser.add_argument("--load-test-users", type=int, default=0,
+                        help="Also create this many load-test users with plans and workout history.")
+    parser.add_argument("--history-weeks", type=int, default=8,
+                        help="Weeks of logged workouts per load-test user (default: 8).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for generated load-test data.")
+    args = parser.parse_args()
+
     print("Attempting to seed exercises data with main_target_muscle_group...")
     seed_exercises()
+    if args.load_test_users > 0:
+        seed_load_test_users(args.load_test_users, history_weeks=args.history_weeks, seed=args.seed)
     print("Seeding script finished.")
@@ -6,16 +6,33 @@ import os
 from urllib.parse import urlparse
 from datetime import timedelta, datetime, timezone
 import logging
+import time
 import jwt
 from functools import wraps
 import atexit
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from sql_instrumentation import connection_kwargs, init_app as init_sql_instrumentation
+from metrics import (
+    init_app as init_metrics,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_CHECKOUT_ERRORS,
+    DB_POOL_IN_USE,
+    DB_POOL_MAX,
+    JWT_BLOCKLIST_CHECKS,
+)
+from profiling import init_app as init_profiling
+from exercise_catalog import init_app as init_exercise_catalog, exercise_name
+from json_provider import init_app as init_json_provider
+from rows import register_row_types
+from prepared_statements import prepare_statements, statements_prepared
 
 app = Flask(__name__)
 
 # --- Rate Limiter Configuration ---
 RATELIMIT_STORAGE_URL = os.getenv("RATELIMIT_STORAGE_URL", "redis://localhost:6379/1")
+# Off only for local load tests (benchmarks/load_test.py), where every client shares one IP.
+app.config['RATELIMIT_ENABLED'] = os.getenv("RATELIMIT_ENABLED", "true").lower() != "false"
 limiter = Limiter(
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
@@ -55,6 +72,21 @@ def get_db_connection_params():
         'port': os.getenv("POSTGRES_PORT", "5432")
     }
 
+class ConnectionPool(pool.SimpleConnectionPool):
+    """SimpleConnectionPool that sets up each new connection for the API."""
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        register_row_types(conn)  # NUMERIC as float (rows.py)
+        return conn
+
+    def getconn(self, key=None):
+        conn = super().getconn(key)
+        if not statements_prepared(conn):
+            prepare_statements(conn)  # First checkout (prepared_statements.py)
+        return conn
+
+
 def init_db_pool():
     """Initializes the database connection pool."""
     global db_pool
@@ -66,11 +98,13 @@ def init_db_pool():
                  return
 
             app.logger.info(f"Initializing database connection pool for host '{params.get('host')}' db '{params.get('dbname')}'")
-            db_pool = pool.SimpleConnectionPool(
+            db_pool = ConnectionPool(
                 MIN_DB_CONNECTIONS,
                 MAX_DB_CONNECTIONS,
-                **params
+                **params,
+                **connection_kwargs()  # Per-request query timing (sql_instrumentation.py)
             )
+            DB_POOL_MAX.set(MAX_DB_CONNECTIONS)
             app.logger.info("Database connection pool initialized successfully.")
         except psycopg2.OperationalError as e:
             app.logger.error(f"Failed to initialize database pool: {e}")
@@ -97,6 +131,10 @@ app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=7)
 logging.basicConfig(level=logging.INFO)
 logger = app.logger
 
+init_json_provider(app)
+init_sql_instrumentation(app)
+init_metrics(app, limiter)
+
 
 # --- Database Connection Helper ---
 def get_db_connection():
@@ -108,11 +146,16 @@ def get_db_connection():
         if db_pool is None:
              logger.critical("Failed to re-initialize database pool. Cannot get connection.")
              raise Exception("Database pool not available.")
+    started = time.perf_counter()
     try:
-        return db_pool.getconn()
+        conn = db_pool.getconn()
     except psycopg2.pool.PoolError as e:
+        DB_POOL_CHECKOUT_ERRORS.inc()
         logger.error(f"Failed to get connection from pool: {e}")
         raise
+    DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+    DB_POOL_IN_USE.inc()
+    return conn
 
 def release_db_connection(conn):
     """Releases a connection back to the database pool."""
@@ -120,6 +163,7 @@ def release_db_connection(conn):
     if db_pool and conn:
         try:
             db_pool.putconn(conn)
+            DB_POOL_IN_USE.dec()
         except psycopg2.pool.PoolError as e:
             logger.error(f"Error releasing connection back to pool: {e}")
         except Exception as e:
@@ -140,13 +184,17 @@ def check_if_revoked(jwt_payload):
             cur.execute("SELECT EXISTS (SELECT 1 FROM jwt_blocklist WHERE jti = %s);", (jti,))
             result = cur.fetchone()
             if result and result['exists']:
+                JWT_BLOCKLIST_CHECKS.labels(result="revoked").inc()
                 logger.info(f"Token with JTI {jti} found in blocklist (revoked).")
                 return True
+            JWT_BLOCKLIST_CHECKS.labels(result="valid").inc()
             return False
     except psycopg2.Error as e:
+        JWT_BLOCKLIST_CHECKS.labels(result="error").inc()
         logger.error(f"Database error during JTI blocklist check for {jti}: {e}")
         return True
     except Exception as e:
+        JWT_BLOCKLIST_CHECKS.labels(result="error").inc()
         logger.error(f"Unexpected error during JTI blocklist check for {jti}: {e}", exc_info=True)
         return True
     finally:
@@ -248,15 +296,16 @@ def show_shared_workout(slug):
             cur.execute(
                 """
                 SELECT ws.set_number, ws.actual_weight, ws.actual_reps, ws.actual_rir,
-                       ws.notes, ws.mti, e.name as exercise_name
+                       ws.notes, ws.mti, ws.exercise_id
                 FROM workout_sets ws
-                JOIN exercises e ON ws.exercise_id = e.id
                 WHERE ws.workout_id = %s
                 ORDER BY ws.set_number ASC;
                 """,
                 (workout_id,)
             )
             sets_list = cur.fetchall()
+            for set_row in sets_list:
+                set_row['exercise_name'] = exercise_name(set_row['exercise_id'])
 
             workout_data_for_template = {
                 'started_at': workout_details['started_at'],
@@ -290,4 +339,9 @@ app.register_blueprint(workouts_bp)
 app.register_blueprint(plans_bp)
 app.register_blueprint(analytics_bp)
 app.register_blueprint(share_bp)
-app.register_blueprint(export_bp)
\ No newline at end of file
+app.register_blueprint(export_bp)
+
+# Wraps the views registered above, so it must stay after the blueprints.
+init_profiling(app)
+
+init_exercise_catalog(app, get_db_connection, release_db_connection)
\ No newline at end of file
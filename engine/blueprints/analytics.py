@@ -1,23 +1,37 @@
-from flask import Blueprint, request, jsonify, g # Added g
-from constants import SEX_MULTIPLIERS, PLATEAU_EVENT_NOTIFICATION_COOLDOWN_WEEKS # Import SEX_MULTIPLIERS
+from flask import Blueprint, current_app, request, g # Added g
+from json_provider import jsonify
+from constants import (  # Import SEX_MULTIPLIERS
+    SEX_MULTIPLIERS,
+    PLATEAU_MIN_HISTORY,
+    FATIGUE_HISTORY_DAYS,
+    PLATEAU_ANALYSIS_HISTORY_DAYS,
+)
 from app import get_db_connection, release_db_connection, jwt_required, logger
-from datetime import timezone, timedelta # Added timedelta
+from sql_instrumentation import get_sql_stats
+from metrics import timed_computation
+from profiling import get_profiles, internal_key_matches
+from user_profiles import load_user_profile, bump_profile_version
+from etags import conditional_get
+from response_cache import cached_response
+from rows import SessionLoad, E1rmPoint, MuscleVolume, WeeklyMuscleVolume, fetch_records
+from prepared_statements import execute_prepared, fetch_prepared_records
 # Corrected imports for progression and learning_models
 from engine.progression import (
-    detect_plateau,
+    classify_plateau,
     generate_deload_protocol,
     PlateauStatus,
     adjust_next_set,
 )
-from engine.mesocycles import get_or_create_current_mesocycle, PHASE_INTENSIFICATION, PHASE_DELOAD
+from engine.mesocycles import get_current_mesocycle, PHASE_INTENSIFICATION, PHASE_DELOAD
 from engine.learning_models import (
     update_user_rir_bias, # Make sure datetime is imported if not already
     calculate_current_fatigue,
     DEFAULT_RECOVERY_TAU_MAP,
-    SessionRecord,
 )
 
-from engine.predictions import extended_epley_1rm, round_to_available_plates, calculate_confidence_score, estimate_1rm_with_rir_bias
+from engine.e1rm_history import get_e1rm_stats, e1rm_stats_slope, confidence_from_stats, get_confidence_scores
+from engine.changepoint import detect_plateau_segmented
+from engine.predictions import extended_epley_1rm, round_to_available_plates, estimate_1rm_with_rir_bias
 import psycopg2
 import psycopg2.extras
 from datetime import datetime, date, timezone # Added date import, ensured timezone
@@ -37,6 +51,10 @@ FALLBACK_DEFAULT_1RM = 30.0 # Generic fallback if no specific default is found
 
 analytics_bp = Blueprint('analytics', __name__)
 
+# Hot in-process computations, timed in gymgenius_computation_duration_seconds
+round_to_available_plates = timed_computation("plate_rounding")(round_to_available_plates)
+calculate_current_fatigue = timed_computation("fatigue")(calculate_current_fatigue)
+
 @analytics_bp.route('/v1/predict/1rm/epley', methods=['POST'])
 @limiter.limit("60 per hour")
 def predict_1rm_epley():
@@ -109,6 +127,7 @@ def rir_bias_update_route(user_id):
                 (new_rir_bias, user_id_str)
             )
             conn.commit()
+            bump_profile_version(user_id_str)
 
             return jsonify(user_id=user_id_str, new_rir_bias=new_rir_bias), 200
 
@@ -161,12 +180,7 @@ def get_plateau_notifications(user_id):
             cur.execute(query, (user_id_str,))
             notifications = cur.fetchall()
 
-            # Convert datetime objects to ISO format strings for JSON compatibility
-            for notification in notifications:
-                if isinstance(notification.get('detected_at'), datetime): # Check if detected_at is a datetime object
-                    notification['detected_at'] = notification['detected_at'].isoformat()
-
-            return jsonify(notifications), 200
+            return jsonify(notifications), 200  # detected_at is serialized as ISO 8601
 
     except psycopg2.Error as e:
         logger.error(f"Database error fetching plateau notifications for user {user_id_str}: {e}", exc_info=True)
@@ -239,8 +253,7 @@ def fatigue_status_route(user_id):
     try:
         conn = get_db_connection()
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT recovery_multipliers FROM users WHERE id = %s;", (user_id_str,))
-            user_data_db = cur.fetchone() # Renamed
+            user_data_db = load_user_profile(cur, user_id_str)
             if not user_data_db:
                 return jsonify(error="User not found"), 404
 
@@ -250,40 +263,17 @@ def fatigue_status_route(user_id):
             if isinstance(recovery_multipliers_data, dict):
                 user_recovery_multiplier = float(recovery_multipliers_data.get(muscle_group, 1.0))
 
-            session_history_query = """
-                SELECT
-                    ws.completed_at AS session_date,
-                    (ws.actual_weight * ws.actual_reps) AS stimulus
-                FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
-                JOIN exercises e ON ws.exercise_id = e.id
-                WHERE w.user_id = %s
-                  AND e.main_target_muscle_group = %s
-                  AND ws.completed_at IS NOT NULL
-                  AND ws.actual_weight IS NOT NULL
-                  AND ws.actual_reps IS NOT NULL
-                ORDER BY ws.completed_at DESC
-                LIMIT 50;
-            """
             try:
-                cur.execute(session_history_query, (user_id_str, muscle_group))
-                raw_session_history = cur.fetchall()
+                session_history = fetch_prepared_records(
+                    conn, SessionLoad, "recent_session_tonnage", (user_id_str, muscle_group, FATIGUE_HISTORY_DAYS)
+                )
             except psycopg2.Error as db_err:
                 logger.error(f"Database error fetching session history: {db_err}")
                 return jsonify(error=f"Error fetching session history for {muscle_group}. Check server logs and schema."), 500
 
-            session_history_formatted: list[SessionRecord] = []
-            for record in raw_session_history:
-                if isinstance(record['session_date'], datetime) and \
-                   (isinstance(record['stimulus'], float) or isinstance(record['stimulus'], int)):
-                    session_history_formatted.append({
-                        'session_date': record['session_date'],
-                        'stimulus': float(record['stimulus'])
-                    })
-
             current_fatigue = calculate_current_fatigue(
                 muscle_group,
-                session_history_formatted,
+                session_history,
                 DEFAULT_RECOVERY_TAU_MAP,
                 user_recovery_multiplier
             )
@@ -293,7 +283,7 @@ def fatigue_status_route(user_id):
                 muscle_group=muscle_group,
                 current_fatigue=current_fatigue,
                 user_recovery_multiplier_applied=user_recovery_multiplier,
-                session_records_found=len(session_history_formatted)
+                session_records_found=len(session_history)
             ), 200
 
     except psycopg2.Error as e:
@@ -322,9 +312,8 @@ def recommend_set_parameters_route(user_id, exercise_id):
     try:
         conn = get_db_connection()
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            # Fetch 'sex' and 'equipment_type' along with other user data
-            cur.execute("SELECT goal_slider, rir_bias, recovery_multipliers, experience_level, equipment_settings, sex, equipment_type FROM users WHERE id = %s;", (user_id_str,))
-            user_data_db = cur.fetchone()
+            # Cached profile: goal_slider, rir_bias, recovery_multipliers, sex, equipment_type, ...
+            user_data_db = load_user_profile(cur, user_id_str)
             if not user_data_db:
                 return jsonify(error="User not found"), 404
 
@@ -352,7 +341,7 @@ def recommend_set_parameters_route(user_id, exercise_id):
             else:
                 user_barbell_weight = None
 
-            cur.execute("SELECT name, main_target_muscle_group FROM exercises WHERE id = %s;", (exercise_id_str,))
+            execute_prepared(cur, "exercise_muscle_group", (exercise_id_str,))
             exercise_data_db = cur.fetchone() # Renamed
             if not exercise_data_db:
                 return jsonify(error="Exercise not found"), 404
@@ -362,13 +351,7 @@ def recommend_set_parameters_route(user_id, exercise_id):
                  return jsonify(error=f"Exercise '{exercise_name}' is missing 'main_target_muscle_group'."), 500
 
             # Fetch 1RM history, including source data for potential recalculation
-            cur.execute(
-                "SELECT estimated_1rm, source_weight, source_reps, source_rir "
-                "FROM estimated_1rm_history "
-                "WHERE user_id = %s AND exercise_id = %s "
-                "ORDER BY calculated_at DESC LIMIT 1;",
-                (user_id_str, exercise_id_str)
-            )
+            execute_prepared(cur, "latest_e1rm_source", (user_id_str, exercise_id_str))
             e1rm_data = cur.fetchone()
 
             estimated_1rm = None
@@ -446,21 +429,15 @@ def recommend_set_parameters_route(user_id, exercise_id):
 
             # Plateau Detection & Deload Logic
             plateau_analysis_details = {'plateau_detected': False, 'deload_applied': False}
-            MIN_HISTORY_FOR_PLATEAU_CHECK = 5 # Need at least this many records to check for a plateau
-            PLATEAU_CHECK_WINDOW = 15 # Look at the last N records for plateau
 
-            cur.execute(
-                "SELECT estimated_1rm FROM estimated_1rm_history "
-                "WHERE user_id = %s AND exercise_id = %s "
-                "ORDER BY calculated_at ASC LIMIT %s;", # Oldest first for detect_plateau
-                (user_id_str, exercise_id_str, PLATEAU_CHECK_WINDOW)
-            )
-            e1rm_history_for_plateau = cur.fetchall()
+            # Trend over the last PLATEAU_CHECK_WINDOW estimates, maintained by record_e1rm
+            e1rm_trend_stats = get_e1rm_stats(cur, user_id_str, exercise_id_str)
 
-            if len(e1rm_history_for_plateau) >= MIN_HISTORY_FOR_PLATEAU_CHECK:
-                e1rm_values = [float(r['estimated_1rm']) for r in e1rm_history_for_plateau]
+            if e1rm_trend_stats and e1rm_trend_stats['n'] >= PLATEAU_MIN_HISTORY:
                 # Using min_duration=3 for plateau detection as per requirement
-                plateau_status = detect_plateau(e1rm_values, min_duration=3)
+                plateau_status = classify_plateau(
+                    e1rm_stats_slope(e1rm_trend_stats), e1rm_trend_stats['n'], min_duration=3
+                )
 
                 plateau_analysis_details.update({
                     'plateau_detected': plateau_status['plateauing'],
@@ -480,57 +457,7 @@ def recommend_set_parameters_route(user_id, exercise_id):
                         plateau_analysis_details['original_e1rm'] = original_e1rm_before_deload
                         plateau_analysis_details['deloaded_e1rm'] = estimated_1rm
                         e1rm_source += "_plateau_deload"
-
-                        # --- BEGIN: Insert plateau event if deload was applied ---
-                        if plateau_analysis_details.get('deload_applied'):
-                            try:
-                                # Check for recent, unacknowledged plateau events for this user/exercise
-                                cutoff_date = datetime.now(timezone.utc) - timedelta(weeks=PLATEAU_EVENT_NOTIFICATION_COOLDOWN_WEEKS)
-
-                                cur.execute(
-                                    """
-                                    SELECT id FROM plateau_events
-                                    WHERE user_id = %s AND exercise_id = %s
-                                      AND acknowledged_at IS NULL
-                                      AND detected_at >= %s
-                                    ORDER BY detected_at DESC LIMIT 1;
-                                    """,
-                                    (user_id_str, exercise_id_str, cutoff_date)
-                                )
-                                existing_event = cur.fetchone()
-
-                                if not existing_event:
-                                    plateau_duration_value = plateau_status.get('duration') # This is likely in sessions
-                                    details_message = (
-                                        f"Plateau detected on {exercise_name}. Applied 10% e1RM reduction. "
-                                        f"Plateau confirmed over {plateau_duration_value} prior data points/sessions."
-                                    )
-
-                                    cur.execute(
-                                        """
-                                        INSERT INTO plateau_events (
-                                            user_id, exercise_id, detected_at,
-                                            plateau_duration_days, protocol_applied, details, acknowledged_at
-                                        )
-                                        VALUES (%s, %s, %s, %s, %s, %s, NULL);
-                                        """,
-                                        (
-                                            user_id_str,
-                                            exercise_id_str,
-                                            datetime.now(timezone.utc), # Let DB handle default if possible, else use this
-                                            plateau_duration_value, # Storing session count here
-                                            "auto_deload_10_percent",
-                                            details_message
-                                        )
-                                    )
-                                    logger.info(f"Inserted new plateau event for user {user_id_str}, exercise {exercise_id_str} due to auto-deload.")
-                                    # conn.commit() should happen outside this specific block, at the end of the main try block normally
-                            except psycopg2.Error as db_err:
-                                logger.error(f"Database error during plateau event logging for user {user_id_str}, exercise {exercise_id_str}: {db_err}")
-                                # Do not re-raise or rollback here, let the main handler do it.
-                            except Exception as e_plat_event:
-                                logger.error(f"Unexpected error during plateau event logging for user {user_id_str}, exercise {exercise_id_str}: {e_plat_event}", exc_info=True)
-                        # --- END: Insert plateau event ---
+                        # plateau_events are recorded by the nightly scan (engine/plateau_scanner.py)
                     else: # estimated_1rm is None, cannot apply deload
                         plateau_analysis_details['deload_applied'] = False
                         plateau_analysis_details['reason_no_deload'] = "e1RM was None initially"
@@ -538,8 +465,9 @@ def recommend_set_parameters_route(user_id, exercise_id):
                 plateau_analysis_details['reason_no_plateau_check'] = "Insufficient history"
 
             # Mesocycle Phase Adjustment (applied to e1RM after plateau, before goal % and fatigue)
+            # Pure read: transitions are persisted by the nightly advance_mesocycles job.
             today = date.today()
-            meso_details_dict = get_or_create_current_mesocycle(cur, user_id_str, today)
+            meso_details_dict = get_current_mesocycle(cur, user_id_str, today)
             current_phase = meso_details_dict['phase']
             current_meso_week = meso_details_dict['week_number']
 
@@ -568,29 +496,13 @@ def recommend_set_parameters_route(user_id, exercise_id):
             if isinstance(recovery_multipliers_data, dict): # Check if dict
                 user_recovery_multiplier = float(recovery_multipliers_data.get(main_target_muscle_group, 1.0))
 
-            session_history_query = """
-                SELECT ws.completed_at AS session_date, (ws.actual_weight * ws.actual_reps) AS stimulus
-                FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
-                JOIN exercises e ON ws.exercise_id = e.id
-                WHERE w.user_id = %s AND e.main_target_muscle_group = %s
-                  AND ws.completed_at IS NOT NULL AND ws.actual_weight IS NOT NULL AND ws.actual_reps IS NOT NULL
-                ORDER BY ws.completed_at DESC LIMIT 50;
-            """
-            cur.execute(session_history_query, (user_id_str, main_target_muscle_group))
-            raw_session_history = cur.fetchall()
-            session_history_formatted: list[SessionRecord] = []
-            for record in raw_session_history:
-                 if isinstance(record['session_date'], datetime) and \
-                   (isinstance(record['stimulus'], (float, int))): # Check type stimulus
-                    session_history_formatted.append({
-                        'session_date': record['session_date'],
-                        'stimulus': float(record['stimulus'])
-                    })
+            session_history = fetch_prepared_records(
+                conn, SessionLoad, "recent_session_tonnage", (user_id_str, main_target_muscle_group, FATIGUE_HISTORY_DAYS)
+            )
 
             current_fatigue = calculate_current_fatigue(
                 main_target_muscle_group,
-                session_history_formatted,
+                session_history,
                 DEFAULT_RECOVERY_TAU_MAP,
                 user_recovery_multiplier
             )
@@ -705,7 +617,8 @@ def recommend_set_parameters_route(user_id, exercise_id):
                 f"Final Recommendation: {final_rounded_weight:.1f}kg for {rep_low}-{rep_high} reps @ RIR ~{target_rir_to_display} (your perception)."
             )
 
-            confidence_score = calculate_confidence_score(user_id_str, exercise_id_str, cur)
+            # Maintained alongside the trend state; no extra query
+            confidence_score = confidence_from_stats(e1rm_trend_stats)
 
             if confidence_score is not None:
                 explanation += f" Recommendation confidence: {confidence_score*100:.0f}%. "
@@ -781,12 +694,43 @@ def trigger_training_pipeline_route():
     except Exception as e:
         logger.error(f"Failed to enqueue training pipeline: {e}", exc_info=True)
         return jsonify(error="Failed to enqueue training pipeline"), 500
+
+
+@analytics_bp.route('/v1/system/sql-stats', methods=['GET'])
+@limiter.limit("60 per hour")
+def sql_stats_route():
+    """Per-endpoint query counts, DB time and N+1 suspects for this worker process."""
+    if not internal_key_matches(request.headers.get('X-API-KEY')):
+        logger.warning("Unauthorized attempt to read SQL stats.")
+        return jsonify(error="Unauthorized"), 401
+
+    top = request.args.get('top', default=10, type=int)
+    return jsonify(get_sql_stats(top=max(1, min(top, 50)))), 200
+
+@analytics_bp.route('/v1/system/profiles/<string:endpoint>', methods=['GET'])
+@limiter.limit("60 per hour")
+def profiles_route(endpoint):
+    """Stored request profiles (top frames) for one endpoint, newest first."""
+    if not internal_key_matches(request.headers.get('X-API-KEY')):
+        logger.warning("Unauthorized attempt to read request profiles.")
+        return jsonify(error="Unauthorized"), 401
+    if endpoint not in current_app.view_functions:
+        return jsonify(error="Unknown endpoint"), 404
+
+    limit = request.args.get('limit', default=5, type=int)
+    try:
+        profiles = get_profiles(endpoint, limit=max(1, min(limit, 20)))
+    except Exception as e:
+        logger.error(f"Error reading profiles for {endpoint}: {e}", exc_info=True)
+        return jsonify(error="Could not read stored profiles"), 503
+    return jsonify(endpoint=endpoint, profiles=profiles), 200
+
 @analytics_bp.route('/v1/users/<uuid:user_id>/exercises/<uuid:exercise_id>/plateau-analysis', methods=['GET'])
 @jwt_required
 @limiter.limit("60 per hour")
+@cached_response("training", "profile", "exercises", daily=True)
 def get_plateau_analysis(user_id, exercise_id):
     from flask import g
-    # from engine.learning_models import calculate_current_fatigue, DEFAULT_RECOVERY_TAU_MAP, SessionRecord -> Already imported
 
     # Authorization
     if str(user_id) != g.current_user_id:
@@ -812,17 +756,19 @@ def get_plateau_analysis(user_id, exercise_id):
             main_target_muscle_group = exercise_data['main_target_muscle_group']
 
             # 2. Fetch Historical Performance Data (e1RM)
-            cur.execute(
+            e1rm_history_records = fetch_records(
+                conn, E1rmPoint,
                 """
                 SELECT estimated_1rm, calculated_at FROM estimated_1rm_history
                 WHERE user_id = %s AND exercise_id = %s
+                  AND calculated_at >= NOW() - %s * INTERVAL '1 day'
                 ORDER BY calculated_at ASC;
                 """,
-                (str(user_id), str(exercise_id))
+                (str(user_id), str(exercise_id), PLATEAU_ANALYSIS_HISTORY_DAYS)
             )
-            e1rm_history_records = cur.fetchall()
 
-            historical_e1rms = [float(record['estimated_1rm']) for record in e1rm_history_records]
+            historical_e1rms = [record.estimated_1rm for record in e1rm_history_records]
+            e1rm_timestamps = [record.calculated_at for record in e1rm_history_records]
             MIN_DATA_POINTS_FOR_PLATEAU = 7 # Configurable minimum for meaningful analysis
 
             if len(historical_e1rms) < MIN_DATA_POINTS_FOR_PLATEAU:
@@ -840,8 +786,7 @@ def get_plateau_analysis(user_id, exercise_id):
                 }), 200 # Or 202 Accepted if we want to signify it's not a full analysis
 
             # 3. Fetch User Fatigue Score (adapting from fatigue_status_route)
-            cur.execute("SELECT recovery_multipliers FROM users WHERE id = %s;", (str(user_id),))
-            user_data_db = cur.fetchone() # User should exist if JWT valid and user_id matches
+            user_data_db = load_user_profile(cur, user_id)  # User should exist if JWT valid and user_id matches
             if not user_data_db: # Should ideally not happen due to JWT check
                 logger.error(f"User data not found for user {user_id} despite passing JWT check.")
                 return jsonify(error="User data inconsistency."), 500
@@ -851,29 +796,13 @@ def get_plateau_analysis(user_id, exercise_id):
             if isinstance(recovery_multipliers_data, dict):
                 user_recovery_multiplier = float(recovery_multipliers_data.get(main_target_muscle_group, 1.0))
 
-            session_history_query = """
-                SELECT ws.completed_at AS session_date, (ws.actual_weight * ws.actual_reps) AS stimulus
-                FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
-                JOIN exercises e ON ws.exercise_id = e.id
-                WHERE w.user_id = %s AND e.main_target_muscle_group = %s
-                  AND ws.completed_at IS NOT NULL AND ws.actual_weight IS NOT NULL AND ws.actual_reps IS NOT NULL
-                ORDER BY ws.completed_at DESC LIMIT 50;
-            """
-            cur.execute(session_history_query, (str(user_id), main_target_muscle_group))
-            raw_session_history = cur.fetchall()
-            session_history_formatted: list[SessionRecord] = []
-            for record in raw_session_history:
-                 if isinstance(record['session_date'], datetime) and \
-                   (isinstance(record['stimulus'], (float, int))):
-                    session_history_formatted.append({
-                        'session_date': record['session_date'],
-                        'stimulus': float(record['stimulus'])
-                    })
+            session_history = fetch_prepared_records(
+                conn, SessionLoad, "recent_session_tonnage", (str(user_id), main_target_muscle_group, FATIGUE_HISTORY_DAYS)
+            )
 
             current_fatigue_score = calculate_current_fatigue(
                 main_target_muscle_group,
-                session_history_formatted,
+                session_history,
                 DEFAULT_RECOVERY_TAU_MAP, # Make sure this is available in scope
                 user_recovery_multiplier
             )
@@ -883,8 +812,10 @@ def get_plateau_analysis(user_id, exercise_id):
             # 4. Plateau Detection Logic
             # Using MIN_DATA_POINTS_FOR_PLATEAU as min_duration, or a slightly smaller number if appropriate
             plateau_min_duration = max(3, MIN_DATA_POINTS_FOR_PLATEAU - 2) # e.g. 5 if MIN_DATA_POINTS_FOR_PLATEAU is 7
-            plateau_result = detect_plateau(
+            # Segmented over the full history so late stagnation is caught and its onset reported
+            plateau_result = detect_plateau_segmented(
                 values=historical_e1rms,
+                timestamps=e1rm_timestamps if all(e1rm_timestamps) else None,
                 min_duration=plateau_min_duration
             )
 
@@ -952,6 +883,7 @@ def get_plateau_analysis(user_id, exercise_id):
 @analytics_bp.route('/v1/users/<uuid:user_id>/exercises/<uuid:exercise_id>/analytics/mti-trends', methods=['GET'])
 @jwt_required
 @limiter.limit("60 per hour")
+@conditional_get("training")
 def get_mti_trends(user_id, exercise_id):
     from flask import g
     if str(user_id) != g.current_user_id:
@@ -961,7 +893,7 @@ def get_mti_trends(user_id, exercise_id):
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        with conn.cursor() as cur:  # Tuple rows, fed straight into the response
             # Optional: Check if exercise exists, though the query will just return empty if not.
             # cur.execute("SELECT id FROM exercises WHERE id = %s;", (str(exercise_id),))
             # if not cur.fetchone():
@@ -972,8 +904,7 @@ def get_mti_trends(user_id, exercise_id):
                 """
                 SELECT ws.completed_at, ws.mti
                 FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
-                WHERE w.user_id = %s AND ws.exercise_id = %s AND ws.mti IS NOT NULL
+                WHERE ws.user_id = %s AND ws.exercise_id = %s AND ws.mti IS NOT NULL
                 ORDER BY ws.completed_at ASC;
                 """,
                 (str(user_id), str(exercise_id))
@@ -986,10 +917,10 @@ def get_mti_trends(user_id, exercise_id):
 
             mti_trends_data = [
                 {
-                    "date": rec["completed_at"].isoformat(), # Ensure ISO format for dates
-                    "mti_score": int(rec["mti"]) # MTI is already stored as INTEGER
+                    "date": completed_at, # Serialized as ISO 8601
+                    "mti_score": int(mti) # MTI is already stored as INTEGER
                 }
-                for rec in records
+                for completed_at, mti in records
             ]
 
             return jsonify(mti_trends_data), 200
@@ -1006,6 +937,7 @@ def get_mti_trends(user_id, exercise_id):
 @analytics_bp.route('/v1/users/<uuid:user_id>/analytics/1rm-evolution', methods=['GET'])
 @jwt_required
 @limiter.limit("60 per hour")
+@conditional_get("training")
 def get_1rm_evolution(user_id):
     from flask import g
     if str(user_id) != g.current_user_id:
@@ -1017,7 +949,7 @@ def get_1rm_evolution(user_id):
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        with conn.cursor() as cur:  # Tuple rows, fed straight into the response
             cur.execute(
                 """
                 SELECT exercise_id, estimated_1rm, calculated_at
@@ -1029,13 +961,12 @@ def get_1rm_evolution(user_id):
             )
             records = cur.fetchall()
 
-        evolution: dict[str, list[dict[str, float | str]]] = {}
-        for rec in records:
-            ex_id = str(rec["exercise_id"])
-            evolution.setdefault(ex_id, []).append(
+        evolution: dict[str, list[dict[str, float | datetime]]] = {}
+        for exercise_id, estimated_1rm, calculated_at in records:
+            evolution.setdefault(str(exercise_id), []).append(
                 {
-                    "date": rec["calculated_at"].isoformat(),
-                    "estimated_1rm": float(rec["estimated_1rm"]),
+                    "date": calculated_at,
+                    "estimated_1rm": float(estimated_1rm),
                 }
             )
 
@@ -1054,6 +985,7 @@ def get_1rm_evolution(user_id):
 @analytics_bp.route('/v1/users/<uuid:user_id>/analytics/volume-heatmap', methods=['GET'])
 @jwt_required
 @limiter.limit("60 per hour")
+@conditional_get("training", "exercises")
 def get_volume_heatmap(user_id):
     from flask import g
     if str(user_id) != g.current_user_id:
@@ -1065,16 +997,15 @@ def get_volume_heatmap(user_id):
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        with conn.cursor() as cur:  # Tuple rows, fed straight into the response
             cur.execute(
                 """
                 SELECT date_trunc('week', ws.completed_at) AS week,
                        e.main_target_muscle_group AS muscle_group,
                        SUM(ws.actual_weight * ws.actual_reps) AS volume
                 FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
                 JOIN exercises e ON ws.exercise_id = e.id
-                WHERE w.user_id = %s AND ws.completed_at IS NOT NULL
+                WHERE ws.user_id = %s AND ws.completed_at IS NOT NULL
                 GROUP BY week, muscle_group
                 ORDER BY week ASC;
                 """,
@@ -1084,11 +1015,11 @@ def get_volume_heatmap(user_id):
 
         heatmap = [
             {
-                "week": row["week"].date().isoformat(),
-                "muscle_group": row["muscle_group"],
-                "volume": float(row["volume"] or 0),
+                "week": week.date(),
+                "muscle_group": muscle_group,
+                "volume": float(volume or 0),
             }
-            for row in rows
+            for week, muscle_group, volume in rows
         ]
 
         return jsonify(heatmap), 200
@@ -1106,6 +1037,7 @@ def get_volume_heatmap(user_id):
 @analytics_bp.route('/v1/users/<uuid:user_id>/analytics/key-metrics', methods=['GET'])
 @jwt_required
 @limiter.limit("60 per hour")
+@conditional_get("training", "exercises")
 def get_key_metrics(user_id):
     from flask import g
     if str(user_id) != g.current_user_id:
@@ -1125,8 +1057,7 @@ def get_key_metrics(user_id):
                 """
                 SELECT COALESCE(SUM(ws.actual_weight * ws.actual_reps), 0) AS volume
                 FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
-                WHERE w.user_id = %s
+                WHERE ws.user_id = %s
                   AND ws.actual_weight IS NOT NULL
                   AND ws.actual_reps IS NOT NULL;
                 """,
@@ -1146,9 +1077,8 @@ def get_key_metrics(user_id):
                 """
                 SELECT e.name AS exercise_name, COUNT(ws.exercise_id) AS frequency
                 FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
                 JOIN exercises e ON ws.exercise_id = e.id
-                WHERE w.user_id = %s
+                WHERE ws.user_id = %s
                 GROUP BY e.name
                 ORDER BY frequency DESC
                 LIMIT 1;
@@ -1163,6 +1093,9 @@ def get_key_metrics(user_id):
                     "frequency": int(most_frequent_exercise_row["frequency"]),
                 }
 
+            # Per-exercise e1RM confidence from e1rm_stats, one query for all exercises
+            e1rm_confidence = get_confidence_scores(cur, str(user_id))
+
         return (
             jsonify(
                 {
@@ -1170,6 +1103,7 @@ def get_key_metrics(user_id):
                     "total_volume": total_volume,
                     "avg_session_rpe": round(avg_rpe, 2) if avg_rpe else 0, # Ensure rounding for avg
                     "most_frequent_exercise": most_frequent_exercise,
+                    "e1rm_confidence": e1rm_confidence,
                 }
             ),
             200,
@@ -1188,6 +1122,8 @@ def get_key_metrics(user_id):
 @analytics_bp.route('/v1/user/<uuid:user_id>/volume-summary', methods=['GET'])
 @jwt_required
 @limiter.limit("60 per hour")
+@conditional_get("training", "exercises")
+@cached_response("training", "exercises")
 def get_volume_summary(user_id):
     from flask import g
     if str(user_id) != g.current_user_id:
@@ -1207,64 +1143,51 @@ def get_volume_summary(user_id):
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            if week_start:
-                cur.execute(
-                    "SELECT muscle_group, total_volume FROM volume_summaries WHERE user_id = %s AND week = %s;",
-                    (str(user_id), week_start),
-                )
-                rows = cur.fetchall()
-                if not rows:
-                    cur.execute(
-                        """
-                        SELECT e.main_target_muscle_group, SUM(ws.actual_weight * ws.actual_reps) AS volume
-                        FROM workout_sets ws
-                        JOIN workouts w ON ws.workout_id = w.id
-                        JOIN exercises e ON ws.exercise_id = e.id
-                        WHERE w.user_id = %s
-                          AND ws.completed_at >= %s
-                          AND ws.completed_at < %s + INTERVAL '7 days'
-                          AND ws.actual_weight IS NOT NULL
-                          AND ws.actual_reps IS NOT NULL
-                        GROUP BY e.main_target_muscle_group;
-                        """,
-                        (str(user_id), week_start, week_start),
-                    )
-                    rows = cur.fetchall()
-                summary = [
-                    {
-                        "muscle_group": r.get("muscle_group") or r.get("main_target_muscle_group"),
-                        "volume": float(r["total_volume"] if "total_volume" in r else r["volume"] or 0),
-                    }
-                    for r in rows
-                ]
-                return jsonify({"week": iso_week, "data": summary}), 200
-            else:
-                cur.execute(
+        if week_start:
+            rows = fetch_records(
+                conn, MuscleVolume,
+                "SELECT muscle_group, total_volume AS volume FROM volume_summaries WHERE user_id = %s AND week = %s;",
+                (str(user_id), week_start),
+            )
+            if not rows:
+                rows = fetch_records(
+                    conn, MuscleVolume,
                     """
-                    SELECT date_trunc('week', ws.completed_at) AS week,
-                           e.main_target_muscle_group AS muscle_group,
-                           SUM(ws.actual_weight * ws.actual_reps) AS volume
+                    SELECT e.main_target_muscle_group AS muscle_group, SUM(ws.actual_weight * ws.actual_reps) AS volume
                     FROM workout_sets ws
-                    JOIN workouts w ON ws.workout_id = w.id
                     JOIN exercises e ON ws.exercise_id = e.id
-                    WHERE w.user_id = %s AND ws.completed_at IS NOT NULL
-                    GROUP BY week, muscle_group
-                    ORDER BY week DESC
-                    LIMIT 50;
+                    WHERE ws.user_id = %s
+                      AND ws.completed_at >= %s
+                      AND ws.completed_at < %s + INTERVAL '7 days'
+                      AND ws.actual_weight IS NOT NULL
+                      AND ws.actual_reps IS NOT NULL
+                    GROUP BY e.main_target_muscle_group;
                     """,
-                    (str(user_id),),
+                    (str(user_id), week_start, week_start),
                 )
-                rows = cur.fetchall()
-                summary = [
-                    {
-                        "week": r["week"].date().isoformat(),
-                        "muscle_group": r["muscle_group"],
-                        "volume": float(r["volume"] or 0),
-                    }
-                    for r in rows
-                ]
-                return jsonify(summary), 200
+            summary = [{"muscle_group": r.muscle_group, "volume": r.volume or 0.0} for r in rows]
+            return jsonify({"week": iso_week, "data": summary}), 200
+        else:
+            rows = fetch_records(
+                conn, WeeklyMuscleVolume,
+                """
+                SELECT date_trunc('week', ws.completed_at) AS week,
+                       e.main_target_muscle_group AS muscle_group,
+                       SUM(ws.actual_weight * ws.actual_reps) AS volume
+                FROM workout_sets ws
+                JOIN exercises e ON ws.exercise_id = e.id
+                WHERE ws.user_id = %s AND ws.completed_at IS NOT NULL
+                GROUP BY week, muscle_group
+                ORDER BY week DESC
+                LIMIT 50;
+                """,
+                (str(user_id),),
+            )
+            summary = [
+                {"week": r.week.date(), "muscle_group": r.muscle_group, "volume": r.volume or 0.0}
+                for r in rows
+            ]
+            return jsonify(summary), 200
     except psycopg2.Error as e:
         logger.error(f"Database error during volume summary fetch for user {user_id}: {e}")
         return jsonify(error="Database error during analytics fetch."), 500
@@ -1276,6 +1199,7 @@ def get_volume_summary(user_id):
 @analytics_bp.route('/v1/user/<uuid:user_id>/mti-history', methods=['GET'])
 @jwt_required
 @limiter.limit("60 per hour")
+@conditional_get("training", daily=True)
 def get_mti_history(user_id):
     from flask import g
     if str(user_id) != g.current_user_id:
@@ -1296,13 +1220,12 @@ def get_mti_history(user_id):
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        with conn.cursor() as cur:  # Tuple rows, fed straight into the response
             cur.execute(
                 """
                 SELECT ws.completed_at, ws.mti
                 FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
-                WHERE w.user_id = %s
+                WHERE ws.user_id = %s
                   AND ws.exercise_id = %s
                   AND ws.mti IS NOT NULL
                   AND ws.completed_at >= NOW() - INTERVAL '%s days'
@@ -1312,8 +1235,8 @@ def get_mti_history(user_id):
             )
             rows = cur.fetchall()
             history = [
-                {"date": r["completed_at"].date().isoformat(), "mti": int(r["mti"])}
-                for r in rows
+                {"date": completed_at.date(), "mti": int(mti)}
+                for completed_at, mti in rows
             ]
         return jsonify(history), 200
     except psycopg2.Error as e:
@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify, current_app, g, abort
+from flask import Blueprint, request, current_app, g, abort
+from json_provider import jsonify
 from app import get_db_connection, release_db_connection, logger, limiter, jwt_required
 import psycopg2
 import psycopg2.extras
@@ -6,6 +7,7 @@ import uuid
 import bcrypt
 import jwt
 from datetime import datetime, timezone
+from user_profiles import bump_profile_version
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -382,6 +384,7 @@ def update_user_profile(user_id):
                 del updated_profile['password_hash']
 
             conn.commit()
+            bump_profile_version(user_id)
             logger.info(f"User profile updated successfully for user: {user_id}")
             return jsonify(updated_profile), 200
 
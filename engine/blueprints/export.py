@@ -64,8 +64,7 @@ def export_user_data(uid):
                 """
                 SELECT ws.*
                 FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
-                WHERE w.user_id = %s
+                WHERE ws.user_id = %s
                 ORDER BY ws.completed_at ASC;
                 """, (user_id,)
             )
@@ -73,7 +72,7 @@ def export_user_data(uid):
             set_fieldnames = [desc[0] for desc in cur.description] if sets_data else [
                 "id", "workout_id", "exercise_id", "set_number", "actual_weight",
                 "actual_reps", "actual_rir", "form_rating", "mti", "rest_before_seconds",
-                "completed_at", "notes", "created_at", "updated_at" # Add all expected fields
+                "completed_at", "notes", "created_at", "updated_at", "user_id" # Add all expected fields
             ]
 
 
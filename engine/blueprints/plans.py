@@ -1,11 +1,21 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
+from json_provider import jsonify
 from app import get_db_connection, release_db_connection, jwt_required, logger
+from exercise_catalog import get_exercise, exercise_name
+from etags import conditional_get, bump_data_version
 import psycopg2
 import psycopg2.extras
 import uuid
 
 plans_bp = Blueprint('plans', __name__)
 
+
+def _with_exercise_names(plan_exercises):
+    """Add 'exercise_name' to plan_exercises rows from the exercise catalog."""
+    for plan_exercise in plan_exercises:
+        plan_exercise['exercise_name'] = exercise_name(plan_exercise.get('exercise_id'))
+    return plan_exercises
+
 def _calculate_and_store_plan_metrics(cur, plan_id, days_payload):
     """
     Helper function to calculate total volume and muscle group frequency
@@ -25,12 +35,7 @@ def _calculate_and_store_plan_metrics(cur, plan_id, days_payload):
             if not exercise_id:
                 continue
 
-            # Fetch main_target_muscle_group for the exercise
-            cur.execute(
-                "SELECT main_target_muscle_group FROM exercises WHERE id = %s;",
-                (exercise_id,)
-            )
-            ex_details = cur.fetchone()
+            ex_details = get_exercise(exercise_id)
             mg = ex_details.get('main_target_muscle_group') if ex_details else None
 
             total_volume += sets
@@ -126,11 +131,7 @@ def create_workout_plan(user_id):
                     sets = int(ex.get('sets', 0))
                     if not exercise_id:
                         continue
-                    cur.execute(
-                        "SELECT main_target_muscle_group FROM exercises WHERE id = %s;",
-                        (exercise_id,),
-                    )
-                    ex_details = cur.fetchone()
+                    ex_details = get_exercise(exercise_id)
                     mg = ex_details.get('main_target_muscle_group') if ex_details else None
                     cur.execute(
                         "INSERT INTO plan_exercises (id, plan_day_id, exercise_id, order_index, sets) VALUES (%s, %s, %s, %s, %s);",
@@ -144,6 +145,7 @@ def create_workout_plan(user_id):
             total_volume, freq_counts = _calculate_and_store_plan_metrics(cur, plan_id, days_payload)
 
             conn.commit() # Commit all changes including metrics
+            bump_data_version(g.current_user_id, "plans")
             new_plan['total_volume'] = total_volume # Add to response
             new_plan['muscle_group_frequency'] = freq_counts # Add to response
             logger.info(
@@ -167,6 +169,7 @@ def create_workout_plan(user_id):
 
 @plans_bp.route('/v1/users/<uuid:user_id>/plans', methods=['GET'])
 @jwt_required
+@conditional_get("plans")
 def get_workout_plans_for_user(user_id):
     from flask import g
     if str(user_id) != g.current_user_id:
@@ -197,6 +200,7 @@ def get_workout_plans_for_user(user_id):
 
 @plans_bp.route('/v1/plans/<uuid:plan_id>', methods=['GET'])
 @jwt_required
+@conditional_get("plans", "exercises")
 def get_workout_plan_details(plan_id):
     from flask import g
     conn = None
@@ -226,15 +230,14 @@ def get_workout_plan_details(plan_id):
             for day in plan_days:
                 cur.execute(
                     """
-                    SELECT pe.*, e.name as exercise_name
+                    SELECT pe.*
                     FROM plan_exercises pe
-                    JOIN exercises e ON pe.exercise_id = e.id
                     WHERE pe.plan_day_id = %s
                     ORDER BY pe.order_index ASC;
                     """,
                     (str(day['id']),)
                 )
-                day['exercises'] = cur.fetchall()
+                day['exercises'] = _with_exercise_names(cur.fetchall())
 
             plan['days'] = plan_days
             return jsonify(plan), 200
@@ -376,6 +379,7 @@ def update_workout_plan(plan_id):
                     updated_plan['muscle_group_frequency'] = freq_counts
 
             conn.commit() # Commit all changes (plan fields, structure, metrics)
+            bump_data_version(g.current_user_id, "plans")
 
             if not updated_plan: # Should only happen if plan_id was invalid from start and no updates made
                 return jsonify(error="Workout plan not found or no updates made"), 404
@@ -392,10 +396,10 @@ def update_workout_plan(plan_id):
                 plan_days_list = cur.fetchall()
                 for day_item in plan_days_list:
                     cur.execute(
-                        "SELECT pe.*, e.name as exercise_name FROM plan_exercises pe JOIN exercises e ON pe.exercise_id = e.id WHERE pe.plan_day_id = %s ORDER BY pe.order_index ASC;",
+                        "SELECT pe.* FROM plan_exercises pe WHERE pe.plan_day_id = %s ORDER BY pe.order_index ASC;",
                         (str(day_item['id']),)
                     )
-                    day_item['exercises'] = cur.fetchall()
+                    day_item['exercises'] = _with_exercise_names(cur.fetchall())
                 updated_plan_base['days'] = plan_days_list
 
                 # Re-fetch metrics to ensure they are part of the response if only structure changed initially
@@ -447,6 +451,7 @@ def delete_workout_plan(plan_id):
             # Delete the plan. Associated plan_days and plan_exercises should be deleted by CASCADE.
             cur.execute("DELETE FROM workout_plans WHERE id = %s;", (str(plan_id),))
             conn.commit()
+            bump_data_version(g.current_user_id, "plans")
 
             # Check if deletion was successful
             if cur.rowcount == 0:
@@ -526,6 +531,7 @@ def create_plan_day(plan_id):
             )
             new_plan_day = cur.fetchone()
             conn.commit()
+            bump_data_version(g.current_user_id, "plans")
             logger.info(f"Plan day {plan_day_id} (Day {day_number}) created for plan {plan_id} by user {g.current_user_id}")
             return jsonify(new_plan_day), 201
 
@@ -545,6 +551,7 @@ def create_plan_day(plan_id):
 
 @plans_bp.route('/v1/plans/<uuid:plan_id>/days', methods=['GET'])
 @jwt_required
+@conditional_get("plans")
 def get_plan_days(plan_id):
     from flask import g
     conn = None
@@ -650,6 +657,7 @@ def update_plan_day(day_id):
             cur.execute(query, tuple(update_values))
             updated_plan_day = cur.fetchone()
             conn.commit()
+            bump_data_version(g.current_user_id, "plans")
 
             logger.info(f"Plan day {day_id} updated successfully by user {g.current_user_id}")
             return jsonify(updated_plan_day), 200
@@ -697,6 +705,7 @@ def delete_plan_day(day_id):
             # Delete the plan day. Associated plan_exercises should be deleted by CASCADE.
             cur.execute("DELETE FROM plan_days WHERE id = %s;", (str(day_id),))
             conn.commit()
+            bump_data_version(g.current_user_id, "plans")
 
             if cur.rowcount == 0:
                 # Should be caught by the initial check, but as a safeguard
@@ -790,9 +799,8 @@ def create_plan_exercise(day_id):
                 logger.warning(f"Forbidden attempt to add exercise to day {day_id} by user {g.current_user_id}")
                 return jsonify(error="Forbidden. You do not own the parent plan of this day."), 403
 
-            # Check if exercise_id exists in exercises table
-            cur.execute("SELECT id FROM exercises WHERE id = %s;", (exercise_id,))
-            if not cur.fetchone():
+            # Check if exercise_id exists in the exercise catalog
+            if get_exercise(exercise_id) is None:
                 return jsonify(error=f"Exercise with id {exercise_id} not found."), 404 # Or 400 Bad Request
 
             # Check for order_index conflict within the same plan_day
@@ -826,6 +834,7 @@ def create_plan_exercise(day_id):
             )
             new_plan_exercise = cur.fetchone()
             conn.commit()
+            bump_data_version(g.current_user_id, "plans")
             logger.info(f"Plan exercise {plan_exercise_id} created for day {day_id} by user {g.current_user_id}")
             return jsonify(new_plan_exercise), 201
 
@@ -845,6 +854,7 @@ def create_plan_exercise(day_id):
 
 @plans_bp.route('/v1/plandays/<uuid:day_id>/exercises', methods=['GET'])
 @jwt_required
+@conditional_get("plans", "exercises")
 def get_plan_exercises_for_day(day_id):
     from flask import g
     conn = None
@@ -869,18 +879,17 @@ def get_plan_exercises_for_day(day_id):
                 logger.warning(f"Forbidden attempt to get exercises for day {day_id} by user {g.current_user_id}")
                 return jsonify(error="Forbidden. You do not own the parent plan of this day."), 403
 
-            # Fetch all plan exercises for this day, joining with exercises table for names
+            # Fetch all plan exercises for this day; names come from the exercise catalog
             cur.execute(
                 """
-                SELECT pe.*, e.name as exercise_name
+                SELECT pe.*
                 FROM plan_exercises pe
-                JOIN exercises e ON pe.exercise_id = e.id
                 WHERE pe.plan_day_id = %s
                 ORDER BY pe.order_index ASC;
                 """,
                 (str(day_id),)
             )
-            plan_exercises_list = cur.fetchall()
+            plan_exercises_list = _with_exercise_names(cur.fetchall())
 
             return jsonify(plan_exercises_list), 200
 
@@ -950,8 +959,7 @@ def update_plan_exercise(plan_exercise_id):
                         if field_type is uuid.UUID:
                             typed_value = str(uuid.UUID(value)) # Validate and convert to string for query
                             # Check if new exercise_id exists
-                            cur.execute("SELECT id FROM exercises WHERE id = %s;", (typed_value,))
-                            if not cur.fetchone():
+                            if get_exercise(typed_value) is None:
                                 return jsonify(error=f"New exercise_id {typed_value} not found."), 400
                         elif field_type is int:
                             typed_value = int(value)
@@ -988,13 +996,10 @@ def update_plan_exercise(plan_exercise_id):
             cur.execute(query, tuple(update_values))
             updated_plan_exercise = cur.fetchone()
             conn.commit()
+            bump_data_version(g.current_user_id, "plans")
 
             logger.info(f"Plan exercise {plan_exercise_id} updated successfully by user {g.current_user_id}")
-            # Join with exercises table to get exercise_name for the response
-            cur.execute("SELECT name FROM exercises WHERE id = %s;", (updated_plan_exercise['exercise_id'],))
-            exercise_details = cur.fetchone()
-            if exercise_details:
-                 updated_plan_exercise['exercise_name'] = exercise_details['name']
+            _with_exercise_names([updated_plan_exercise])
 
             return jsonify(updated_plan_exercise), 200
 
@@ -1043,6 +1048,7 @@ def delete_plan_exercise(plan_exercise_id):
             # Delete the plan exercise
             cur.execute("DELETE FROM plan_exercises WHERE id = %s;", (str(plan_exercise_id),))
             conn.commit()
+            bump_data_version(g.current_user_id, "plans")
 
             if cur.rowcount == 0:
                 # Should be caught by the initial check, but as a safeguard
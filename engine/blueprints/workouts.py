@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify, g, abort
+from flask import Blueprint, request, g, abort
+from json_provider import jsonify
 from app import get_db_connection, release_db_connection, jwt_required, logger # Assuming limiter is also in app if needed by new endpoint
 import psycopg2
 import psycopg2.extras
@@ -8,11 +9,22 @@ from datetime import datetime, timezone, date, timedelta # Added timedelta
 from predictions import calculate_mti, estimate_1rm_with_rir_bias, round_to_available_plates
 # Removed: calculate_confidence_score, generate_possible_side_weights, generate_possible_single_weights, extended_epley_1rm as they are not directly used by this new endpoint, but round_to_available_plates is.
 # estimate_1rm_with_rir_bias is used by get_previous_performance, so keep.
-from learning_models import update_user_rir_bias, calculate_training_params, calculate_current_fatigue
-from readiness import calculate_readiness_multiplier
+from learning_models import update_user_rir_bias, calculate_training_params, calculate_current_fatigue, predict_reps_for_bias_update
+from readiness import calculate_readiness_multiplier, update_hrv_baseline
+from e1rm_history import record_e1rm, get_confidence_score
+from metrics import timed_computation
+from exercise_catalog import get_exercise, list_public_exercises
+from user_profiles import load_user_profile, bump_profile_version
+from etags import conditional_get, bump_data_version
+from rows import SessionLoad, PerformedSet, fetch_records
+from prepared_statements import execute_prepared, fetch_prepared_records
 
 workouts_bp = Blueprint('workouts', __name__)
 
+# Hot in-process computations, timed in gymgenius_computation_duration_seconds
+round_to_available_plates = timed_computation("plate_rounding")(round_to_available_plates)
+calculate_current_fatigue = timed_computation("fatigue")(calculate_current_fatigue)
+
 
 # Constants for Fatigue Adjustment
 MAX_REASONABLE_FATIGUE_SCORE = 500.0  # Example value, needs tuning
@@ -34,15 +46,8 @@ def recommend_set_parameters_for_exercise(user_id, exercise_id):
     try:
         conn = get_db_connection()
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            # 1. Fetch User Data
-            cur.execute(
-                """
-                SELECT goal_slider, rir_bias, available_plates,
-                       COALESCE((available_plates->>'barbell_weight_kg')::numeric, 20.0) as barbell_weight_kg
-                FROM users WHERE id = %s;
-                """, (str(user_id),)
-            )
-            user_data = cur.fetchone()
+            # 1. User Data (cached profile)
+            user_data = load_user_profile(cur, user_id)
             if not user_data:
                 return jsonify(error="User not found."), 404
 
@@ -50,24 +55,19 @@ def recommend_set_parameters_for_exercise(user_id, exercise_id):
             user_rir_bias = float(user_data['rir_bias'])
             user_available_plates_data = user_data.get('available_plates')
             user_available_plates_kg = user_available_plates_data.get('plates_kg') if isinstance(user_available_plates_data, dict) else []
-            user_barbell_weight_kg = float(user_data.get('barbell_weight_kg', 20.0))
-
-            # 2. Fetch Exercise Data
-            cur.execute(
-                "SELECT id, name, equipment_type, main_target_muscle_group FROM exercises WHERE id = %s;",
-                (str(exercise_id),)
+            user_barbell_weight_kg = float(
+                (user_available_plates_data.get('barbell_weight_kg') if isinstance(user_available_plates_data, dict) else None) or 20.0
             )
-            exercise_data = cur.fetchone()
+
+            # 2. Exercise Data (in-process catalog)
+            exercise_data = get_exercise(exercise_id)
             if not exercise_data:
                 return jsonify(error="Exercise not found."), 404
-            exercise_equipment_type = exercise_data['equipment_type']
+            exercise_equipment_type = exercise_data.get('equipment_type')
             main_target_muscle_group = exercise_data['main_target_muscle_group']
 
             # 3. Fetch Current Estimated 1RM
-            cur.execute(
-                "SELECT estimated_1rm FROM estimated_1rm_history WHERE user_id = %s AND exercise_id = %s ORDER BY calculated_at DESC LIMIT 1;",
-                (str(user_id), str(exercise_id))
-            )
+            execute_prepared(cur, "latest_e1rm", (str(user_id), str(exercise_id)))
             e1rm_record = cur.fetchone()
             current_e1rm = float(e1rm_record['estimated_1rm']) if e1rm_record and e1rm_record['estimated_1rm'] is not None else 0.0
 
@@ -108,29 +108,10 @@ def recommend_set_parameters_for_exercise(user_id, exercise_id):
             current_fatigue_value = 0.0
             if main_target_muscle_group: # Only calculate fatigue if a main muscle group is defined
                 # Fetch session history for fatigue calculation
-                cur.execute(
-                    """
-                    SELECT
-                        w.completed_at as session_date,
-                        SUM(ws.mti) as stimulus
-                    FROM workout_sets ws
-                    JOIN workouts w ON ws.workout_id = w.id
-                    JOIN exercises e ON ws.exercise_id = e.id
-                    WHERE w.user_id = %s
-                      AND e.main_target_muscle_group = %s
-                      AND w.completed_at IS NOT NULL
-                      AND w.completed_at >= (NOW() AT TIME ZONE 'UTC') - INTERVAL '21 days'
-                    GROUP BY w.id, w.completed_at
-                    ORDER BY w.completed_at ASC;
-                    """,
-                    (str(user_id), main_target_muscle_group)
+                session_history_for_fatigue = fetch_prepared_records(
+                    conn, SessionLoad, "recent_session_mti", (str(user_id), main_target_muscle_group)
                 )
-                session_history_for_fatigue_raw = cur.fetchall()
-
-                session_history_for_fatigue = [
-                    {'session_date': row['session_date'], 'stimulus': float(row['stimulus'])}
-                    for row in session_history_for_fatigue_raw if row['stimulus'] is not None
-                ]
+                session_history_for_fatigue = [row for row in session_history_for_fatigue if row.stimulus is not None]
 
                 if session_history_for_fatigue:
                     current_fatigue_value = calculate_current_fatigue(
@@ -152,10 +133,7 @@ def recommend_set_parameters_for_exercise(user_id, exercise_id):
 
 
             # 8. Apply Readiness Adjustment
-            cur.execute(
-                "SELECT sleep_hours, stress_level, hrv_ms FROM workouts WHERE user_id = %s AND completed_at IS NOT NULL ORDER BY completed_at DESC LIMIT 1;",
-                (str(user_id),)
-            )
+            execute_prepared(cur, "latest_readiness", (str(user_id),))
             latest_workout_readiness_data = cur.fetchone()
 
             readiness_mult = 1.0
@@ -192,8 +170,8 @@ def recommend_set_parameters_for_exercise(user_id, exercise_id):
             )
             explanation_parts.append(f"Suggested: {final_weight:.2f}kg.")
 
-            # from ..predictions import calculate_confidence_score # Delayed import
-            # confidence = calculate_confidence_score(str(user_id), str(exercise_id), cur)
+            # Windowed e1RM consistency, maintained by record_e1rm
+            confidence = get_confidence_score(cur, str(user_id), str(exercise_id))
 
 
             logger.info(
@@ -211,7 +189,7 @@ def recommend_set_parameters_for_exercise(user_id, exercise_id):
                 "target_rir": base_params['target_rir'],
                 "explanation": " ".join(explanation_parts),
                 "readiness_score_percent": round(readiness_total_score * 100) if readiness_total_score is not None else None,
-                # "confidence_score": confidence
+                "confidence_score": confidence,
             }), 200
 
     except psycopg2.Error as e:
@@ -243,35 +221,15 @@ def list_exercises():
         per_page = 100  # Max per_page limit
     offset = (page - 1) * per_page
 
-    conn = None
     try:
-        conn = get_db_connection()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            # Get total count for pagination metadata
-            cur.execute("SELECT COUNT(*) FROM exercises WHERE is_public = TRUE;")
-            total_exercises = cur.fetchone()['count']
-
-            # Fetch paginated exercises
-            cur.execute(
-                """
-                SELECT id, name, category, equipment, difficulty,
-                       primary_muscles, secondary_muscles, main_target_muscle_group, is_public
-                FROM exercises
-                WHERE is_public = TRUE
-                ORDER BY name
-                LIMIT %s OFFSET %s;
-                """,
-                (per_page, offset)
-            )
-            exercises_list = cur.fetchall()
-
-            return jsonify({
-                "page": page,
-                "per_page": per_page,
-                "total_exercises": total_exercises,
-                "total_pages": math.ceil(total_exercises / per_page),
-                "data": exercises_list
-            }), 200
+        total_exercises, exercises_list = list_public_exercises(offset, per_page)
+        return jsonify({
+            "page": page,
+            "per_page": per_page,
+            "total_exercises": total_exercises,
+            "total_pages": math.ceil(total_exercises / per_page),
+            "data": exercises_list
+        }), 200
 
     except psycopg2.Error as e:
         logger.error(f"Database error listing exercises: {e}")
@@ -279,9 +237,6 @@ def list_exercises():
     except Exception as e:
         logger.error(f"Unexpected error listing exercises: {e}", exc_info=True)
         return jsonify(error="An unexpected error occurred"), 500
-    finally:
-        if conn:
-            release_db_connection(conn)
 
 
 @workouts_bp.route('/v1/sets/<uuid:set_id>', methods=['DELETE'])
@@ -289,7 +244,7 @@ def list_exercises():
 def delete_workout_set(set_id):
     user_id = g.current_user_id
 
-    sql_query = "DELETE FROM workout_sets WHERE id = %s AND workout_id IN (SELECT id FROM workouts WHERE user_id = %s);"
+    sql_query = "DELETE FROM workout_sets WHERE id = %s AND user_id = %s;"
 
     conn = None
     try:
@@ -308,6 +263,7 @@ def delete_workout_set(set_id):
                     abort(404, description="Set not found or not authorized to delete.") # Or 403
 
             conn.commit()
+            bump_data_version(g.current_user_id, "training")
             logger.info(f"Set {set_id} deleted successfully by user {user_id}.")
 
             # Placeholder for recalculation/cleanup logic:
@@ -375,7 +331,7 @@ def edit_workout_set(set_id):
 
     set_clauses = [f"{field} = %s" for field in updates.keys()]
     sql_query = f"UPDATE workout_sets SET {', '.join(set_clauses)}, updated_at = NOW() " \
-                f"WHERE id = %s AND workout_id IN (SELECT id FROM workouts WHERE user_id = %s);"
+                f"WHERE id = %s AND user_id = %s;"
 
     update_values = list(updates.values())
     update_values.extend([str(set_id), user_id])
@@ -402,6 +358,7 @@ def edit_workout_set(set_id):
 
 
             conn.commit()
+            bump_data_version(g.current_user_id, "training")
             logger.info(f"Set {set_id} updated successfully by user {user_id}. Fields updated: {', '.join(updates.keys())}")
 
             # Placeholder for recalculation logic:
@@ -445,41 +402,37 @@ def get_previous_performance(exercise_id):
         conn = get_db_connection()
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
             # Get user's current RIR bias for e1RM calculations
-            cur.execute("SELECT rir_bias FROM users WHERE id = %s;", (user_id,))
-            user_record = cur.fetchone()
+            user_record = load_user_profile(cur, user_id)
             if not user_record:
                 logger.warning(f"User {user_id} not found when fetching RIR bias for previous performance.")
                 return jsonify(error="User not found."), 404 # Should not happen if JWT is valid
             user_rir_bias = float(user_record['rir_bias'])
 
             # Fetch the last two workout sets for this user and exercise
-            # We join with workouts to ensure we only get sets from workouts belonging to the user
-            cur.execute(
+            sets = fetch_records(
+                conn, PerformedSet,
                 """
                 SELECT ws.actual_weight, ws.actual_reps, ws.actual_rir, ws.completed_at, ws.mti, ws.notes
                 FROM workout_sets ws
-                JOIN workouts w ON ws.workout_id = w.id
-                WHERE w.user_id = %s AND ws.exercise_id = %s
+                WHERE ws.user_id = %s AND ws.exercise_id = %s
                 ORDER BY ws.completed_at DESC
                 LIMIT 2;
                 """,
                 (user_id, str(exercise_id))
             )
-            sets = cur.fetchall()
 
             if not sets:
                 return jsonify(message="No previous performance recorded for this exercise."), 404
 
             # The primary "previous_set" is the most recent one
             previous_set_data = sets[0]
-            # Convert decimal fields to float for JSON serialization if they aren't already
             previous_set_to_return = {
-                "weight_kg": float(previous_set_data['actual_weight']) if previous_set_data['actual_weight'] is not None else None,
-                "reps": previous_set_data['actual_reps'],
-                "rir": previous_set_data['actual_rir'],
-                "mti": previous_set_data['mti'],
-                "notes": previous_set_data['notes'],
-                "completed_at": previous_set_data['completed_at'].isoformat() if previous_set_data['completed_at'] else None
+                "weight_kg": previous_set_data.actual_weight,
+                "reps": previous_set_data.actual_reps,
+                "rir": previous_set_data.actual_rir,
+                "mti": previous_set_data.mti,
+                "notes": previous_set_data.notes,
+                "completed_at": previous_set_data.completed_at
             }
 
             response_data = {
@@ -495,15 +448,15 @@ def get_previous_performance(exercise_id):
                 # Calculate e1RM for both sets using the user's current RIR bias
                 # estimate_1rm_with_rir_bias(weight: float, reps: int, rir: int, user_rir_bias: float)
                 e1rm_current = estimate_1rm_with_rir_bias(
-                    float(previous_set_data['actual_weight']),
-                    previous_set_data['actual_reps'],
-                    previous_set_data['actual_rir'],
+                    previous_set_data.actual_weight,
+                    previous_set_data.actual_reps,
+                    previous_set_data.actual_rir,
                     user_rir_bias
                 )
                 e1rm_older = estimate_1rm_with_rir_bias(
-                    float(older_set_data['actual_weight']),
-                    older_set_data['actual_reps'],
-                    older_set_data['actual_rir'],
+                    older_set_data.actual_weight,
+                    older_set_data.actual_reps,
+                    older_set_data.actual_rir,
                     user_rir_bias
                 )
 
@@ -526,9 +479,9 @@ def get_previous_performance(exercise_id):
             else:
                  # Only one set exists, calculate its e1RM to display
                  e1rm_current = estimate_1rm_with_rir_bias(
-                    float(previous_set_data['actual_weight']),
-                    previous_set_data['actual_reps'],
-                    previous_set_data['actual_rir'],
+                    previous_set_data.actual_weight,
+                    previous_set_data.actual_reps,
+                    previous_set_data.actual_rir,
                     user_rir_bias
                 )
                  response_data['progression_metric_string'] = f"First recorded set. e1RM: {e1rm_current:.1f}kg."
@@ -549,19 +502,12 @@ def get_previous_performance(exercise_id):
 
 @workouts_bp.route('/v1/exercises/<uuid:exercise_id>', methods=['GET'])
 def get_exercise_details(exercise_id):
-    conn = None
     try:
-        conn = get_db_connection()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(
-                "SELECT * FROM exercises WHERE id = %s AND (is_public = TRUE OR TRUE);", # Assuming admin could see non-public, for now allow all by ID
-                (str(exercise_id),)
-            )
-            exercise = cur.fetchone()
-            if not exercise:
-                return jsonify(error="Exercise not found or not public"), 404
+        exercise = get_exercise(exercise_id)  # Any exercise by ID, public or not (as before)
+        if not exercise:
+            return jsonify(error="Exercise not found or not public"), 404
 
-            return jsonify(exercise), 200
+        return jsonify(exercise), 200
 
     except psycopg2.Error as e:
         logger.error(f"Database error fetching exercise {exercise_id}: {e}")
@@ -569,9 +515,6 @@ def get_exercise_details(exercise_id):
     except Exception as e:
         logger.error(f"Unexpected error fetching exercise {exercise_id}: {e}", exc_info=True)
         return jsonify(error="An unexpected error occurred"), 500
-    finally:
-        if conn:
-            release_db_connection(conn)
 
 # --- Basic CRUD APIs for Workout Logging (P1-BE-011) ---
 @workouts_bp.route('/v1/users/<uuid:user_id>/workouts', methods=['POST'])
@@ -619,6 +562,7 @@ def create_workout(user_id):
             )
             new_workout = cur.fetchone()
             conn.commit()
+            bump_data_version(g.current_user_id, "training")
             logger.info(f"Workout created successfully (ID: {workout_id}) for user: {user_id}")
             return jsonify(new_workout), 201
 
@@ -638,6 +582,7 @@ def create_workout(user_id):
 
 @workouts_bp.route('/v1/users/<uuid:user_id>/workouts', methods=['GET'])
 @jwt_required
+@conditional_get("training")
 def get_workouts_for_user(user_id):
     from flask import g
     if str(user_id) != g.current_user_id:
@@ -692,6 +637,7 @@ def get_workouts_for_user(user_id):
 
 @workouts_bp.route('/v1/workouts/<uuid:workout_id>', methods=['GET'])
 @jwt_required
+@conditional_get("training", "exercises")
 def get_single_workout(workout_id):
     from flask import g
     conn = None
@@ -744,8 +690,9 @@ def log_set_to_workout(workout_id):
     try:
         conn = get_db_connection()
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            # Verify workout belongs to the authenticated user
-            cur.execute("SELECT user_id FROM workouts WHERE id = %s;", (str(workout_id),))
+            # Verify workout belongs to the authenticated user. The row lock
+            # serializes concurrent adds to this workout for the set_number check below.
+            cur.execute("SELECT user_id FROM workouts WHERE id = %s FOR UPDATE;", (str(workout_id),))
             workout_owner = cur.fetchone()
             if not workout_owner:
                 return jsonify(error="Workout not found"), 404
@@ -778,6 +725,14 @@ def log_set_to_workout(workout_id):
             except (ValueError, TypeError) as ve:
                 return jsonify(error=f"Invalid data type for one or more fields: {ve}"), 400
 
+            # workout_sets no longer has a unique constraint on the set number
+            # (it cannot span partitions), so duplicates are rejected here
+            cur.execute(
+                "SELECT id FROM workout_sets WHERE workout_id = %s AND exercise_id = %s AND set_number = %s;",
+                (str(workout_id), exercise_id, set_number)
+            )
+            if cur.fetchone():
+                return jsonify(error=f"Set {set_number} of this exercise is already logged in this workout."), 409 # Conflict
 
             completed_at_dt = datetime.now(timezone.utc)
             if completed_at_str:
@@ -805,6 +760,7 @@ def log_set_to_workout(workout_id):
             )
             new_set = cur.fetchone()
             conn.commit()
+            bump_data_version(g.current_user_id, "training")
             logger.info(f"Set {set_id} logged to workout {workout_id} successfully.")
             return jsonify(new_set), 201
 
@@ -894,8 +850,13 @@ def update_workout_summary(workout_id):
         conn = get_db_connection()
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
             # First, verify ownership and existence (already part of WHERE clause but good for early 404)
-            cur.execute("SELECT id FROM workouts WHERE id = %s AND user_id = %s;", (str(workout_id), user_id_from_token))
-            if not cur.fetchone():
+            # Also lock and read the HRV inputs so the rolling baseline can be adjusted.
+            cur.execute(
+                "SELECT id, hrv_ms, completed_at FROM workouts WHERE id = %s AND user_id = %s FOR UPDATE;",
+                (str(workout_id), user_id_from_token)
+            )
+            previous_workout = cur.fetchone()
+            if not previous_workout:
                 logger.warning(f"Update workout failed: Workout {workout_id} not found or not owned by user {user_id_from_token}.")
                 abort(404, description="Workout not found or you do not have permission to update it.")
 
@@ -914,7 +875,14 @@ def update_workout_summary(workout_id):
 
 
             updated_workout_data = cur.fetchone()
+            if "hrv_ms" in update_payload or "completed_at" in update_payload:
+                update_hrv_baseline(
+                    cur, user_id_from_token,
+                    previous_workout['hrv_ms'], previous_workout['completed_at'],
+                    updated_workout_data['hrv_ms'], updated_workout_data['completed_at']
+                )
             conn.commit()
+            bump_data_version(g.current_user_id, "training")
             logger.info(f"Workout {workout_id} summary updated successfully by user {user_id_from_token}.")
             return jsonify(updated_workout_data), 200
 
@@ -991,10 +959,7 @@ def log_set_for_user_exercise(user_id, exercise_id):
             # All operations should be atomic for this endpoint
 
             # 1. Fetch User's Current RIR Bias, LR, and Error EMA
-            cur.execute(
-                "SELECT rir_bias, rir_bias_lr, rir_bias_error_ema FROM users WHERE id = %s FOR UPDATE;",
-                (str(user_id),)
-            ) # Lock user row
+            execute_prepared(cur, "lock_user_rir_bias", (str(user_id),)) # Lock user row
             user_data = cur.fetchone()
             if not user_data:
                 logger.error(f"User not found for ID: {user_id} during set logging.")
@@ -1006,34 +971,15 @@ def log_set_for_user_exercise(user_id, exercise_id):
             current_rir_bias_error_ema = float(user_data['rir_bias_error_ema'])
 
             # 2. Fetch Latest Estimated 1RM (Pre-Set)
-            cur.execute(
-                """
-                SELECT estimated_1rm FROM estimated_1rm_history
-                WHERE user_id = %s AND exercise_id = %s
-                ORDER BY calculated_at DESC LIMIT 1;
-                """,
-                (str(user_id), str(exercise_id))
-            )
+            execute_prepared(cur, "latest_e1rm", (str(user_id), str(exercise_id)))
             latest_1rm_record = cur.fetchone()
             latest_estimated_1rm = float(latest_1rm_record['estimated_1rm']) if latest_1rm_record else 0.0
 
             # 3. Calculate `predicted_reps` for RIR Bias Update
-            predicted_reps_for_bias_update = 0
-            if latest_estimated_1rm > 0.001 and weight_kg < latest_estimated_1rm : # Check latest_1rm is not zero and weight is less
-                # Formula: R_pred = ( (1 - w/prev_1RM) / 0.0333 ) - max(0, actual_rir - current_rir_bias)
-                term_one_numerator = 1.0 - (weight_kg / latest_estimated_1rm)
-                # Ensure term_one_numerator is positive, otherwise predicted reps would be negative from this part
-                if term_one_numerator > 0:
-                    reps_component_from_1rm = term_one_numerator / 0.0333
-                    # actual_rir from input is used here as per plan
-                    adjusted_rir_for_pred = max(0, rir - current_rir_bias)
-                    predicted_reps_for_bias_update = round(reps_component_from_1rm - adjusted_rir_for_pred)
-                else: # weight_kg is too close to or above latest_estimated_1rm for this formula part
-                    predicted_reps_for_bias_update = 0
-                predicted_reps_for_bias_update = max(0, predicted_reps_for_bias_update) # Ensure non-negative
-            elif weight_kg >= latest_estimated_1rm and latest_estimated_1rm > 0.001 : # If lifting at or more than prev 1RM
-                 predicted_reps_for_bias_update = 0 # Predict 0-1 reps
-            # If no latest_estimated_1rm, predicted_reps_for_bias_update remains 0, leading to minimal RIR bias change if actual_reps also 0.
+            # Shared with the nightly RIR bias recalibration so both paths agree.
+            predicted_reps_for_bias_update = predict_reps_for_bias_update(
+                weight_kg, latest_estimated_1rm, rir, current_rir_bias
+            )
 
             # 4. Update RIR Bias and Error EMA
             new_rir_bias, new_rir_error_ema = update_user_rir_bias(
@@ -1043,10 +989,7 @@ def log_set_for_user_exercise(user_id, exercise_id):
                 current_rir_bias_lr,
                 current_rir_bias_error_ema
             )
-            cur.execute(
-                "UPDATE users SET rir_bias = %s, rir_bias_error_ema = %s, updated_at = NOW() WHERE id = %s;",
-                (new_rir_bias, new_rir_error_ema, str(user_id))
-            )
+            execute_prepared(cur, "update_user_rir_bias", (new_rir_bias, new_rir_error_ema, str(user_id)))
             logger.info(
                 f"RIR bias for user {user_id} updated from {current_rir_bias:.3f} to {new_rir_bias:.3f}. "
                 f"Error EMA from {current_rir_bias_error_ema:.3f} to {new_rir_error_ema:.3f}. "
@@ -1057,13 +1000,10 @@ def log_set_for_user_exercise(user_id, exercise_id):
             # Use the *newly updated* rir_bias for this calculation
             new_estimated_1rm = estimate_1rm_with_rir_bias(weight_kg, reps, rir, new_rir_bias)
             e1rm_id = str(uuid.uuid4())
-            cur.execute(
-                """
-                INSERT INTO estimated_1rm_history
-                (id, user_id, exercise_id, estimated_1rm, calculation_method, calculated_at)
-                VALUES (%s, %s, %s, %s, %s, %s);
-                """,
-                (e1rm_id, str(user_id), str(exercise_id), new_estimated_1rm, "epley_rir_biased", completed_at_dt) # Use completed_at_dt
+            # Also folds the estimate into the user/exercise trend state (e1rm_stats)
+            record_e1rm(
+                cur, str(user_id), str(exercise_id), new_estimated_1rm,
+                "epley_rir_biased", completed_at_dt, e1rm_id # Use completed_at_dt
             )
             logger.info(f"New 1RM estimate {new_estimated_1rm}kg for user {user_id}, exercise {exercise_id} stored.")
 
@@ -1074,14 +1014,7 @@ def log_set_for_user_exercise(user_id, exercise_id):
             # 7a. Implicit Workout Creation: Find or create a workout for today (UTC date of completed_at_dt)
             workout_date_utc = completed_at_dt.date() # Get date part in UTC
 
-            cur.execute(
-                """
-                SELECT id FROM workouts
-                WHERE user_id = %s AND DATE(started_at AT TIME ZONE 'UTC') = %s
-                ORDER BY started_at DESC LIMIT 1;
-                """,
-                (str(user_id), workout_date_utc)
-            )
+            execute_prepared(cur, "todays_workout", (str(user_id), workout_date_utc))
             todays_workout = cur.fetchone()
             workout_id_for_set: str
 
@@ -1090,22 +1023,13 @@ def log_set_for_user_exercise(user_id, exercise_id):
             else:
                 workout_id_for_set = str(uuid.uuid4())
                 # Use completed_at_dt for started_at of auto-created workout for consistency
-                cur.execute(
-                    """
-                    INSERT INTO workouts (id, user_id, started_at, notes, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, NOW(), NOW());
-                    """,
+                execute_prepared(
+                    cur, "insert_auto_workout",
                     (workout_id_for_set, str(user_id), completed_at_dt, "Auto-created workout for ad-hoc set.")
                 )
 
             # 7b. Determine `set_number`
-            cur.execute(
-                """
-                SELECT COALESCE(MAX(set_number), 0) as max_set_num FROM workout_sets
-                WHERE workout_id = %s AND exercise_id = %s;
-                """,
-                (workout_id_for_set, str(exercise_id))
-            )
+            execute_prepared(cur, "max_set_number", (workout_id_for_set, str(exercise_id)))
             max_set_record = cur.fetchone()
             current_set_number = int(max_set_record['max_set_num']) + 1
 
@@ -1127,6 +1051,8 @@ def log_set_for_user_exercise(user_id, exercise_id):
             new_set_log = cur.fetchone()
 
             conn.commit()
+            bump_data_version(g.current_user_id, "training")
+            bump_profile_version(user_id)  # rir_bias changed
             logger.info(
                 f"Set {set_id} (workout: {workout_id_for_set}) logged for user {user_id}, ex {exercise_id}. "
                 f"MTI: {mti_score:.2f}, New 1RM: {new_estimated_1rm:.2f}, "
@@ -0,0 +1,26 @@
+"""Shared Redis client for engine-side caches and diagnostics.
+
+Kept separate from the RQ connection in tasks.py so API processes don't import
+the job code. All helpers use short socket timeouts. A slow or missing Redis
+should degrade a cache, not a request.
+"""
+import os
+
+from redis import Redis
+
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", os.getenv("REDIS_URL", "redis://redis:6379/0"))
+CACHE_SOCKET_TIMEOUT_SECONDS = float(os.getenv("CACHE_SOCKET_TIMEOUT_SECONDS", "0.5"))
+
+_client = None
+
+
+def get_redis():
+    """Process-wide Redis client, created on first use."""
+    global _client
+    if _client is None:
+        _client = Redis.from_url(
+            CACHE_REDIS_URL,
+            socket_timeout=CACHE_SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=CACHE_SOCKET_TIMEOUT_SECONDS,
+        )
+    return _client
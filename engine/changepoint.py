@@ -0,0 +1,161 @@
+"""Change-point segmentation of e1RM series for plateau detection.
+
+`detect_plateau` fits one slope to the whole window, so a lifter who progressed
+and then stalled still looks like they are progressing. Here the series is
+split into piecewise-linear segments with PELT (Killick et al., 2012), and only
+the most recent segment is classified. The plateau's onset is where that run of
+flat or declining segments starts.
+
+Every segment's least-squares cost comes from prefix sums in O(1). With
+PELT's pruning, a full history segments in expected O(n) time, so the nightly
+scanner can run this over every pair.
+"""
+from __future__ import annotations
+
+import math
+from statistics import median
+from typing import Any, Dict, List, Optional, Sequence
+
+from .progression import classify_plateau, calculate_trend_slope
+
+# Shortest segment a change point may create.
+CHANGEPOINT_MIN_SEGMENT = 3
+# BIC-style penalty per change point: factor * sigma^2 * ln(n).
+CHANGEPOINT_PENALTY_FACTOR = 3.0
+# Lower bound on the noise estimate, as a fraction of the series' median value,
+# so noise-free series are not split at every bend.
+CHANGEPOINT_NOISE_FLOOR = 0.0025
+
+
+class _PrefixSums:
+    """Cumulative Σx, Σy, Σx², Σxy, Σy² of a series, x being the point index."""
+
+    def __init__(self, values: Sequence[float]):
+        # Centering y keeps Σy² well conditioned for values around 100 kg.
+        offset = sum(values) / len(values) if values else 0.0
+        self.sx, self.sy, self.sxx, self.sxy, self.syy = [0.0], [0.0], [0.0], [0.0], [0.0]
+        for x, value in enumerate(values):
+            y = float(value) - offset
+            self.sx.append(self.sx[-1] + x)
+            self.sy.append(self.sy[-1] + y)
+            self.sxx.append(self.sxx[-1] + x * x)
+            self.sxy.append(self.sxy[-1] + x * y)
+            self.syy.append(self.syy[-1] + y * y)
+
+    def fit(self, start: int, end: int):
+        """Return (slope, sse) of the least-squares line through points [start, end)."""
+        n = end - start
+        sx = self.sx[end] - self.sx[start]
+        sy = self.sy[end] - self.sy[start]
+        vxx = (self.sxx[end] - self.sxx[start]) - sx * sx / n
+        vxy = (self.sxy[end] - self.sxy[start]) - sx * sy / n
+        vyy = (self.syy[end] - self.syy[start]) - sy * sy / n
+        if vxx <= 1e-12:
+            return 0.0, max(vyy, 0.0)
+        slope = vxy / vxx
+        return slope, max(vyy - vxy * slope, 0.0)
+
+
+def estimate_noise_sigma(values: Sequence[float]) -> float:
+    """Robust noise estimate from second differences, which are zero on a line.
+
+    For i.i.d. noise, Var(second difference) = 6σ²; the MAD is scaled to σ.
+    """
+    scale = median(abs(float(v)) for v in values) if values else 0.0
+    floor = CHANGEPOINT_NOISE_FLOOR * scale
+    if len(values) < 3:
+        return floor
+    second_diffs = [values[i + 1] - 2 * values[i] + values[i - 1] for i in range(1, len(values) - 1)]
+    centre = median(second_diffs)
+    mad = median(abs(d - centre) for d in second_diffs)
+    return max(1.4826 * mad / 6 ** 0.5, floor)
+
+
+def pelt_changepoints(values: Sequence[float], penalty: Optional[float] = None,
+                      min_size: int = CHANGEPOINT_MIN_SEGMENT) -> List[int]:
+    """Segment boundaries [0, b1, ..., n] that minimise Σ SSE + penalty per segment."""
+    n = len(values)
+    if n < 2 * min_size:
+        return [0, n]
+    if penalty is None:
+        sigma = estimate_noise_sigma(values)
+        penalty = CHANGEPOINT_PENALTY_FACTOR * sigma * sigma * max(1.0, math.log(n))
+
+    sums = _PrefixSums(values)
+    inf = float('inf')
+    best_cost = [inf] * (n + 1)
+    best_cost[0] = -penalty
+    last_break = [0] * (n + 1)
+    candidates: List[int] = []
+    for end in range(min_size, n + 1):
+        # `end - min_size` becomes admissible as a segment start.
+        new_start = end - min_size
+        if new_start == 0 or new_start >= min_size:
+            candidates.append(new_start)
+        costs = [(best_cost[s] + sums.fit(s, end)[1] + penalty, s) for s in candidates]
+        best_cost[end], last_break[end] = min(costs)
+        # PELT pruning: SSE is additive-superadditive, so a start that is
+        # already worse than the optimum can never become optimal again.
+        candidates = [s for cost, s in costs if cost - penalty <= best_cost[end]]
+
+    boundaries = [n]
+    while boundaries[-1] > 0:
+        boundaries.append(last_break[boundaries[-1]])
+    return boundaries[::-1]
+
+
+def segment_series(values: Sequence[float], penalty: Optional[float] = None,
+                   min_size: int = CHANGEPOINT_MIN_SEGMENT) -> List[Dict[str, Any]]:
+    """Piecewise-linear segments of `values` as {'start', 'end', 'slope'} dicts (end exclusive)."""
+    boundaries = pelt_changepoints(values, penalty, min_size)
+    sums = _PrefixSums(values)
+    return [
+        {'start': start, 'end': end, 'slope': sums.fit(start, end)[0]}
+        for start, end in zip(boundaries[:-1], boundaries[1:])
+    ]
+
+
+def detect_plateau_segmented(
+    values: Sequence[float],
+    timestamps: Optional[Sequence[Any]] = None,
+    threshold: float = 0.005,
+    min_duration: int = 3,
+    check_frequency: str = "session",
+    penalty: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Like `detect_plateau`, but classifies the most recent trend segment.
+
+    Returns the `detect_plateau` keys plus 'onset_index', the first point of
+    the trailing run of plateauing segments, and 'segments'. 'duration' is the
+    number of points from the onset onwards. If `timestamps` (datetimes
+    parallel to `values`) are given, also returns 'onset_at' and
+    'duration_days'.
+    """
+    n = len(values)
+    if n < min_duration:
+        result = classify_plateau(calculate_trend_slope(values), n, threshold, min_duration, check_frequency)
+        result.update({'onset_index': None, 'segments': []})
+        return result
+
+    segments = segment_series(values, penalty, min_size=max(CHANGEPOINT_MIN_SEGMENT, min_duration))
+    last = segments[-1]
+    result = classify_plateau(last['slope'], last['end'] - last['start'], threshold, min_duration, check_frequency)
+    result.update({'onset_index': None, 'segments': segments})
+    if not result['plateauing']:
+        return result
+
+    onset = last['start']
+    for segment in reversed(segments[:-1]):
+        earlier = classify_plateau(segment['slope'], segment['end'] - segment['start'], threshold, min_duration)
+        if not earlier['plateauing']:
+            break
+        onset = segment['start']
+
+    result['onset_index'] = onset
+    result['duration'] = n - onset
+    result['details'] = f"{result['details']} Onset at point {onset} of {n}."
+    if timestamps is not None:
+        result['onset_at'] = timestamps[onset]
+        result['duration_days'] = (timestamps[-1] - timestamps[onset]).days
+    return result
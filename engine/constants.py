@@ -31,3 +31,30 @@ EXERCISE_DEFAULT_1RM = {
 }
 
 PLATEAU_EVENT_NOTIFICATION_COOLDOWN_WEEKS = 3
+
+# Plateau check window shared by the recommendation route and the nightly scan
+PLATEAU_MIN_HISTORY = 5  # Need at least this many e1RM records to check for a plateau
+PLATEAU_CHECK_WINDOW = 15  # Look at the last N e1RM records
+
+# e1RM confidence (1 - coefficient of variation) over the newest N estimates
+CONFIDENCE_WINDOW = 10
+CONFIDENCE_MIN_SAMPLES = 3
+
+# Fatigue decays with a base tau of at most 72h (quads), scaled by a calibrated
+# recovery multiplier of at most 2.0 (recovery_calibration.MULTIPLIER_GRID), so
+# sets older than this contribute < 1% of their stimulus (e^(-672/144)).
+# Bounding the session-history queries by it also lets the planner skip all but
+# the latest workout_sets partitions.
+FATIGUE_HISTORY_DAYS = 28
+# e1RM history handed to the plateau analysis route.
+PLATEAU_ANALYSIS_HISTORY_DAYS = 365
+
+# Starting RIR bias for new users; matches the users.rir_bias column default.
+DEFAULT_USER_RIR_BIAS = 2.0
+# Minimum e1RM confidence before the RIR bias is applied to a recommendation
+MIN_CONFIDENCE_FOR_BIAS_ADJUSTMENT = 0.5
+
+# Plate rounding defaults, used when a user has no equipment settings
+PLATE_ROUNDING_LOGIC = "nearest_prefer_heavier"  # Ties round up to the heavier load
+AVAILABLE_PLATE_SIZES_KG = [25.0, 20.0, 15.0, 10.0, 5.0, 2.5, 1.25, 0.5]
+BARBELL_WEIGHT_KG = 20.0
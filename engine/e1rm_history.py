@@ -0,0 +1,220 @@
+"""
+Writer for estimated_1rm_history and the per user/exercise trend state that
+goes with it.
+
+Every e1RM row is written through `record_e1rm`, which also folds the value
+into `e1rm_stats`: least-squares accumulators (n, Σx, Σy, Σxy, Σx²) over the
+last E1RM_STATS_WINDOW estimates. Readers get the trend slope from one
+primary-key lookup instead of re-querying and re-fitting the window.
+
+x is the estimate's sequence number for the pair (0, 1, 2, ...), so the slope
+is per estimate, the same as calculate_trend_slope over the window values.
+Estimates enter the window in write order.
+
+The same row also keeps a windowed Welford mean/M2 over the last
+CONFIDENCE_WINDOW estimates. `confidence_from_stats` turns these into the
+score `predictions.calculate_confidence_score` computes, without re-reading
+the history.
+"""
+import math
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from constants import CONFIDENCE_MIN_SAMPLES, CONFIDENCE_WINDOW, PLATEAU_CHECK_WINDOW
+
+E1RM_STATS_WINDOW = PLATEAU_CHECK_WINDOW
+
+
+def empty_e1rm_stats() -> Dict[str, Any]:
+    return {
+        'n': 0,
+        'next_x': 0,
+        'sum_x': 0.0,
+        'sum_y': 0.0,
+        'sum_xy': 0.0,
+        'sum_xx': 0.0,
+        'window_values': [],
+        'conf_n': 0,
+        'conf_mean': 0.0,
+        'conf_m2': 0.0,
+    }
+
+
+def push_e1rm_value(stats: Dict[str, Any], value: float, window: int = E1RM_STATS_WINDOW) -> Dict[str, Any]:
+    """Return a copy of `stats` with `value` appended and, once the window is
+    full, the oldest value removed. O(1) apart from copying the window list."""
+    updated = {
+        'n': int(stats['n']),
+        'next_x': int(stats['next_x']),
+        'sum_x': float(stats['sum_x']),
+        'sum_y': float(stats['sum_y']),
+        'sum_xy': float(stats['sum_xy']),
+        'sum_xx': float(stats['sum_xx']),
+        'window_values': [float(v) for v in stats['window_values']],
+        'conf_n': int(stats.get('conf_n') or 0),
+        'conf_mean': float(stats.get('conf_mean') or 0.0),
+        'conf_m2': float(stats.get('conf_m2') or 0.0),
+    }
+
+    # Windowed Welford update of the confidence mean/M2; the value leaving the
+    # confidence window is still in window_values at this point.
+    conf_window = min(CONFIDENCE_WINDOW, window)
+    mean, m2 = updated['conf_mean'], updated['conf_m2']
+    if updated['conf_n'] < conf_window:
+        updated['conf_n'] += 1
+        delta = value - mean
+        mean += delta / updated['conf_n']
+        m2 += delta * (value - mean)
+    else:
+        old_value = updated['window_values'][-conf_window]
+        new_mean = mean + (value - old_value) / conf_window
+        m2 += (value - old_value) * (value - new_mean + old_value - mean)
+        mean = new_mean
+    updated['conf_mean'], updated['conf_m2'] = mean, max(m2, 0.0)
+
+    x = float(updated['next_x'])
+    updated['sum_x'] += x
+    updated['sum_y'] += value
+    updated['sum_xy'] += x * value
+    updated['sum_xx'] += x * x
+    updated['window_values'].append(float(value))
+    updated['n'] += 1
+    updated['next_x'] += 1
+
+    if updated['n'] > window:
+        old_y = updated['window_values'].pop(0)
+        old_x = float(updated['next_x'] - updated['n'])
+        updated['sum_x'] -= old_x
+        updated['sum_y'] -= old_y
+        updated['sum_xy'] -= old_x * old_y
+        updated['sum_xx'] -= old_x * old_x
+        updated['n'] -= 1
+    return updated
+
+
+def e1rm_stats_from_values(values: Sequence[float], window: int = E1RM_STATS_WINDOW) -> Dict[str, Any]:
+    """Build trend state from a chronological series (backfills and tests)."""
+    stats = empty_e1rm_stats()
+    for value in values:
+        stats = push_e1rm_value(stats, float(value), window)
+    return stats
+
+
+def e1rm_stats_slope(stats: Dict[str, Any]) -> float:
+    """Least-squares slope of the windowed values from the accumulators."""
+    n = int(stats['n'])
+    if n < 2:
+        return 0.0
+    sum_x, sum_y = float(stats['sum_x']), float(stats['sum_y'])
+    den = n * float(stats['sum_xx']) - sum_x * sum_x
+    if abs(den) < 1e-9:
+        return 0.0
+    return (n * float(stats['sum_xy']) - sum_x * sum_y) / den
+
+
+def confidence_from_stats(stats: Optional[Dict[str, Any]],
+                          min_samples: int = CONFIDENCE_MIN_SAMPLES) -> Optional[float]:
+    """1 - coefficient of variation of the windowed estimates, rounded to 2 dp.
+
+    Same result as calculate_confidence_score; None with fewer than `min_samples`.
+    """
+    if not stats or int(stats.get('conf_n') or 0) < min_samples:
+        return None
+    n = int(stats['conf_n'])
+    mean = float(stats['conf_mean'])
+    if mean == 0:
+        return 0.0
+    std_dev = math.sqrt(max(float(stats['conf_m2']), 0.0) / (n - 1))
+    if std_dev == 0:
+        return 1.0
+    return round(max(0.0, 1.0 - std_dev / mean), 2)
+
+
+_STATS_COLUMNS = "n, next_x, sum_x, sum_y, sum_xy, sum_xx, window_values, conf_n, conf_mean, conf_m2"
+_CONFIDENCE_COLUMNS = "conf_n, conf_mean, conf_m2"
+
+
+def _stats_from_row(row, columns: str = _STATS_COLUMNS) -> Dict[str, Any]:
+    """Accept rows from both RealDictCursor and plain tuple cursors."""
+    if isinstance(row, tuple):
+        return dict(zip(columns.split(", "), row))
+    return dict(row)
+
+
+def get_e1rm_stats(cur, user_id: str, exercise_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch the trend state for a user/exercise pair, or None if no e1RM has been recorded."""
+    cur.execute(
+        f"SELECT {_STATS_COLUMNS} FROM e1rm_stats WHERE user_id = %s AND exercise_id = %s;",
+        (str(user_id), str(exercise_id))
+    )
+    row = cur.fetchone()
+    return _stats_from_row(row) if row else None
+
+
+def get_confidence_score(cur, user_id: str, exercise_id: str) -> Optional[float]:
+    """Confidence of the pair's current e1RM from one primary-key lookup."""
+    cur.execute(
+        f"SELECT {_CONFIDENCE_COLUMNS} FROM e1rm_stats WHERE user_id = %s AND exercise_id = %s;",
+        (str(user_id), str(exercise_id))
+    )
+    row = cur.fetchone()
+    return confidence_from_stats(_stats_from_row(row, _CONFIDENCE_COLUMNS)) if row else None
+
+
+def get_confidence_scores(cur, user_id: str,
+                          exercise_ids: Optional[Iterable[str]] = None) -> Dict[str, Optional[float]]:
+    """Confidence for all of a user's exercises (or just `exercise_ids`) in one
+    query, keyed by exercise id. Pairs below the sample minimum map to None."""
+    query = f"SELECT exercise_id, {_CONFIDENCE_COLUMNS} FROM e1rm_stats WHERE user_id = %s"
+    params = [str(user_id)]
+    if exercise_ids is not None:
+        query += " AND exercise_id = ANY(%s::uuid[])"
+        params.append([str(exercise_id) for exercise_id in exercise_ids])
+    cur.execute(query + ";", tuple(params))
+    scores = {}
+    for row in cur.fetchall():
+        if isinstance(row, tuple):
+            exercise_id, row = row[0], row[1:]
+        else:
+            exercise_id = row['exercise_id']
+        scores[str(exercise_id)] = confidence_from_stats(_stats_from_row(row, _CONFIDENCE_COLUMNS))
+    return scores
+
+
+def record_e1rm(cur, user_id: str, exercise_id: str, estimated_1rm: float,
+                calculation_method: str, calculated_at, e1rm_id: str) -> Dict[str, Any]:
+    """
+    Insert an estimated_1rm_history row and fold it into e1rm_stats, in the
+    caller's transaction. The stats row is locked while it is updated so
+    concurrent writers for the same pair serialize. Returns the new stats.
+    """
+    cur.execute(
+        """
+        INSERT INTO estimated_1rm_history
+        (id, user_id, exercise_id, estimated_1rm, calculation_method, calculated_at)
+        VALUES (%s, %s, %s, %s, %s, %s);
+        """,
+        (e1rm_id, str(user_id), str(exercise_id), estimated_1rm, calculation_method, calculated_at)
+    )
+
+    cur.execute(
+        "INSERT INTO e1rm_stats (user_id, exercise_id) VALUES (%s, %s) ON CONFLICT (user_id, exercise_id) DO NOTHING;",
+        (str(user_id), str(exercise_id))
+    )
+    cur.execute(
+        f"SELECT {_STATS_COLUMNS} FROM e1rm_stats WHERE user_id = %s AND exercise_id = %s FOR UPDATE;",
+        (str(user_id), str(exercise_id))
+    )
+    stats = push_e1rm_value(_stats_from_row(cur.fetchone()), float(estimated_1rm))
+
+    cur.execute(
+        """
+        UPDATE e1rm_stats
+        SET n = %s, next_x = %s, sum_x = %s, sum_y = %s, sum_xy = %s, sum_xx = %s,
+            window_values = %s, conf_n = %s, conf_mean = %s, conf_m2 = %s, updated_at = NOW()
+        WHERE user_id = %s AND exercise_id = %s;
+        """,
+        (stats['n'], stats['next_x'], stats['sum_x'], stats['sum_y'], stats['sum_xy'], stats['sum_xx'],
+         stats['window_values'], stats['conf_n'], stats['conf_mean'], stats['conf_m2'],
+         str(user_id), str(exercise_id))
+    )
+    return stats
@@ -0,0 +1,125 @@
+"""Conditional GETs (ETag / If-None-Match) for per-user read endpoints.
+
+Every user has a version counter per data scope in Redis (DATA_VERSION_KEYS).
+Routes that write a scope call `bump_data_version(user_id, scope)` after
+committing. A read route decorated with `@conditional_get(*scopes)` derives its
+ETag from the requesting user, the request path and query string, and those
+counters, so the tag is known before the view runs. A matching If-None-Match is
+answered with 304 without touching the database. Otherwise the view runs and a
+200 response gets the ETag.
+
+Counters are initialised to the current time in nanoseconds, not 0, so tags
+issued before a Redis flush can't match counters created after it. Without
+Redis the view simply runs and no ETag is sent.
+"""
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import g, make_response, request
+
+from cache import get_redis
+from exercise_catalog import EXERCISE_CATALOG_VERSION_KEY
+
+logger = logging.getLogger(__name__)
+
+# Change on deploys that alter response bodies, so clients don't keep old ones.
+ETAG_SALT = os.getenv("ETAG_SALT", "")
+
+DATA_VERSION_KEYS = {
+    # workouts, workout_sets and the e1RM history derived from them
+    "training": "data_version:{user_id}:training",
+    # workout_plans, plan_days, plan_exercises and plan_metrics
+    "plans": "data_version:{user_id}:plans",
+    # Cached profile fields (see user_profiles.py)
+    "profile": "user_profile:{user_id}:version",
+    # Exercise names and muscle groups (global, see exercise_catalog.py)
+    "exercises": EXERCISE_CATALOG_VERSION_KEY,
+}
+
+
+def _keys(user_id, scopes):
+    return [DATA_VERSION_KEYS[scope].format(user_id=user_id) for scope in scopes]
+
+
+def bump_data_version(user_id, *scopes):
+    """Invalidate `scopes` for `user_id` after a committed write."""
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in _keys(user_id, scopes):
+            pipe.set(key, time.time_ns(), nx=True)
+            pipe.incr(key)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not bump data version {scopes} for user {user_id}: {e}")
+
+
+def data_versions(user_id, scopes):
+    """Current counters for `scopes`, creating missing ones. Raises on Redis errors."""
+    redis = get_redis()
+    keys = _keys(user_id, scopes)
+    values = redis.mget(keys)
+    missing = [key for key, value in zip(keys, values) if value is None]
+    if missing:
+        pipe = redis.pipeline(transaction=False)
+        for key in missing:
+            pipe.set(key, time.time_ns(), nx=True)
+        pipe.mget(keys)
+        values = pipe.execute()[-1]
+    return [value.decode() if isinstance(value, bytes) else str(value) for value in values]
+
+
+def compute_etag(user_id, full_path, versions, day=None):
+    parts = [ETAG_SALT, str(user_id), full_path, *versions]
+    if day is not None:
+        parts.append(day)
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def request_fingerprint(scopes, daily=False):
+    """Hash of the current user, request path and query, and `scopes` versions.
+
+    Versions are read once per request and scope set, so stacked decorators
+    share the Redis round trip. Raises on Redis errors.
+    """
+    user_id = g.current_user_id
+    memo = g.setdefault("_data_versions", {})
+    versions = memo.get(scopes)
+    if versions is None:
+        versions = memo[scopes] = data_versions(user_id, scopes)
+    day = datetime.now(timezone.utc).date().isoformat() if daily else None
+    return compute_etag(user_id, request.full_path, versions, day)
+
+
+def conditional_get(*scopes, daily=False):
+    """Answer unchanged GETs with 304 based on the user's data versions.
+
+    Apply below @jwt_required. `daily=True` also varies the tag by UTC date,
+    for views whose output depends on the current date.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or getattr(g, "current_user_id", None) is None:
+                return view(*args, **kwargs)
+            try:
+                etag = request_fingerprint(scopes, daily)
+            except Exception as e:
+                logger.debug(f"Data versions unavailable, serving {request.path} without ETag: {e}")
+                return view(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.vary.add("Authorization")
+            return response
+        return wrapper
+    return decorator
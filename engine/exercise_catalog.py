@@ -0,0 +1,160 @@
+"""In-process cache of the exercises table.
+
+The catalog is near-static reference data, so every worker keeps a full copy
+in memory. It is loaded on the first lookup, not at import time, so importing
+the app (gunicorn's master, scripts, tests) opens no database connection. It
+is swapped atomically on reload. Writers such as database/seed_data.py
+signal a change with `bump_catalog_version()`, which increments a Redis
+counter (EXERCISE_CATALOG_VERSION_KEY, also the "exercises" ETag scope in
+etags.py). Readers compare that counter at most every
+EXERCISE_CATALOG_CHECK_SECONDS and reload when it moved. Without Redis the
+copy is still reloaded every EXERCISE_CATALOG_MAX_AGE_SECONDS. A lookup of an
+unknown id triggers a reload at most every EXERCISE_CATALOG_MISS_RELOAD_SECONDS,
+so an exercise inserted without a bump is found shortly after.
+
+Returned rows are shared between requests and must not be mutated.
+"""
+import logging
+import os
+import threading
+import time
+
+import psycopg2.extras
+
+from cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+EXERCISE_CATALOG_CHECK_SECONDS = float(os.getenv("EXERCISE_CATALOG_CHECK_SECONDS", "5"))
+EXERCISE_CATALOG_MAX_AGE_SECONDS = float(os.getenv("EXERCISE_CATALOG_MAX_AGE_SECONDS", "900"))
+EXERCISE_CATALOG_MISS_RELOAD_SECONDS = float(os.getenv("EXERCISE_CATALOG_MISS_RELOAD_SECONDS", "30"))
+EXERCISE_CATALOG_VERSION_KEY = "exercise_catalog:version"
+
+# Columns served by the public listing (GET /v1/exercises).
+LIST_COLUMNS = (
+    "id", "name", "category", "equipment", "difficulty",
+    "primary_muscles", "secondary_muscles", "main_target_muscle_group", "is_public",
+)
+
+
+class _Snapshot:
+    __slots__ = ("by_id", "public", "version", "loaded_at")
+
+    def __init__(self, rows, version, loaded_at):
+        self.by_id = {str(row["id"]): row for row in rows}
+        self.public = [
+            {column: row.get(column) for column in LIST_COLUMNS}
+            for row in sorted(rows, key=lambda row: row["name"])
+            if row.get("is_public")
+        ]
+        self.version = version
+        self.loaded_at = loaded_at
+
+
+class ExerciseCatalog:
+
+    def __init__(self):
+        self._snapshot = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._get_connection = None
+        self._release_connection = None
+
+    def configure(self, get_connection, release_connection):
+        self._get_connection = get_connection
+        self._release_connection = release_connection
+
+    def load(self):
+        """Reload the whole table. Raises on database errors."""
+        version = _remote_version()  # Read before the rows, so a concurrent bump triggers another reload
+        conn = self._get_connection()
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute("SELECT * FROM exercises;")
+                rows = cur.fetchall()
+        finally:
+            self._release_connection(conn)
+        self._snapshot = _Snapshot(rows, version, time.monotonic())
+        self._next_check = self._snapshot.loaded_at + EXERCISE_CATALOG_CHECK_SECONDS
+        logger.info("Loaded exercise catalog: %s exercises (version %s)", len(rows), version)
+        return self._snapshot
+
+    def _current(self, force=False):
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and not force and now < self._next_check:
+            return snapshot
+        # One thread refreshes; the others keep serving the current copy.
+        if snapshot is not None and not self._lock.acquire(blocking=False):
+            return snapshot
+        if snapshot is None:
+            self._lock.acquire()
+        try:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return self.load()
+            self._next_check = now + EXERCISE_CATALOG_CHECK_SECONDS
+            version = _remote_version()
+            stale = (
+                force
+                or (version is not None and version != snapshot.version)
+                or now - snapshot.loaded_at >= EXERCISE_CATALOG_MAX_AGE_SECONDS
+            )
+            if stale:
+                try:
+                    return self.load()
+                except Exception as e:
+                    logger.warning(f"Exercise catalog reload failed, serving the previous copy: {e}")
+            return snapshot
+        finally:
+            self._lock.release()
+
+    def get(self, exercise_id):
+        """The exercise row for `exercise_id`, or None."""
+        snapshot = self._current()
+        row = snapshot.by_id.get(str(exercise_id))
+        if row is None and time.monotonic() - snapshot.loaded_at >= EXERCISE_CATALOG_MISS_RELOAD_SECONDS:
+            row = self._current(force=True).by_id.get(str(exercise_id))
+        return row
+
+    def list_public(self, offset, limit):
+        """(total, page) of public exercises ordered by name."""
+        public = self._current().public
+        return len(public), public[offset:offset + limit]
+
+
+def _remote_version():
+    try:
+        return get_redis().get(EXERCISE_CATALOG_VERSION_KEY)
+    except Exception as e:
+        logger.debug(f"Exercise catalog version check failed: {e}")
+        return None
+
+
+catalog = ExerciseCatalog()
+
+
+def get_exercise(exercise_id):
+    return catalog.get(exercise_id)
+
+
+def list_public_exercises(offset, limit):
+    return catalog.list_public(offset, limit)
+
+
+def exercise_name(exercise_id):
+    row = catalog.get(exercise_id)
+    return row["name"] if row else None
+
+
+def bump_catalog_version():
+    """Signal every worker to reload after exercises were changed."""
+    try:
+        get_redis().incr(EXERCISE_CATALOG_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Could not bump exercise catalog version: {e}")
+
+
+def init_app(app, get_connection, release_connection):
+    """Wire the catalog to the connection pool. The first lookup loads it."""
+    catalog.configure(get_connection, release_connection)
@@ -0,0 +1,22 @@
+# Gunicorn settings for the engine; loaded automatically from the working directory.
+# Command-line flags (see docker-compose.yml) take precedence over these values.
+import os
+import shutil
+
+bind = "0.0.0.0:5000"
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+
+
+def on_starting(server):
+    """Start every master with an empty Prometheus multiprocess directory."""
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop live gauges of workers that exited (see engine/metrics.py)."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,75 @@
+"""Fast JSON serialization for API responses.
+
+Flask 2.0 has no pluggable JSON provider (that arrived in 2.2), so blueprints
+import `jsonify` from here instead of from flask. It serializes with orjson
+when it is installed and with the standard library otherwise. Both paths write
+UUIDs as strings, Decimals as floats and dates/datetimes as ISO 8601, so
+handlers can return database values as they come without converting each one.
+`init_app` installs the same conversions as the app's JSON encoder for code
+that still calls flask.jsonify.
+"""
+import json
+import uuid
+from datetime import date, time
+from decimal import Decimal
+
+from flask import current_app
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional speedup, see engine/requirements.txt
+    orjson = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(o):
+    """Conversions for types neither serializer handles natively."""
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, (date, time)):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if hasattr(o, "tolist"):  # numpy scalars and arrays on the stdlib path
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """flask.jsonify encoder with the same conversions as `dumps`."""
+
+    def default(self, o):
+        try:
+            return _default(o)
+        except TypeError:
+            return super().default(o)
+
+
+def dumps(obj, indent=False):
+    """Serialize `obj` to UTF-8 JSON bytes."""
+    if orjson is not None:
+        options = _ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=_default, option=options)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False,
+        indent=2 if indent else None, separators=(", ", ": ") if indent else (",", ":"),
+    ).encode()
+
+
+def jsonify(*args, **kwargs):
+    """Drop-in replacement for flask.jsonify backed by `dumps`."""
+    if args and kwargs:
+        raise TypeError("jsonify() behavior undefined when passed both args and kwargs")
+    data = args[0] if len(args) == 1 else (args or kwargs)
+    indent = current_app.config["JSONIFY_PRETTYPRINT_REGULAR"] or current_app.debug
+    return current_app.response_class(
+        dumps(data, indent=indent) + b"\n",
+        mimetype=current_app.config["JSONIFY_MIMETYPE"],
+    )
+
+
+def init_app(app):
+    app.json_encoder = JSONEncoder
@@ -71,6 +71,28 @@ def update_user_rir_bias(
     return new_bias, new_error_ema
 
 
+def predict_reps_for_bias_update(
+    weight_kg: float,
+    prior_e1rm: float,
+    rir: int,
+    rir_bias: float
+) -> int:
+    """
+    Predicts the reps a user should manage at `weight_kg` given their e1RM
+    before the set, used as the reference point for `update_user_rir_bias`.
+
+    Formula: R_pred = ((1 - w / prior_e1RM) / 0.0333) - max(0, rir - rir_bias),
+    floored at 0. Returns 0 when there is no prior e1RM or the weight is at or
+    above it.
+    """
+    if prior_e1rm <= 0.001 or weight_kg >= prior_e1rm:
+        return 0
+
+    reps_component_from_1rm = (1.0 - (weight_kg / prior_e1rm)) / 0.0333
+    adjusted_rir_for_pred = max(0, rir - rir_bias)
+    return max(0, round(reps_component_from_1rm - adjusted_rir_for_pred))
+
+
 # Define a type alias for session records for clarity
 SessionRecord = Dict[str, Any] # Expects keys like 'session_date': datetime, 'stimulus': float
 
@@ -103,7 +125,8 @@ def calculate_current_fatigue(
         muscle_group: The muscle group for which to calculate fatigue (e.g., 'chest').
         session_history: A list of session records. Each record is a dictionary
                          expected to have 'session_date' (datetime) and
-                         'stimulus' (float) keys.
+                         'stimulus' (float) keys, or a
+                         (session_date, stimulus) tuple such as rows.SessionLoad.
         default_recovery_tau_map: A dictionary mapping muscle groups to their
                                   baseline recovery tau values in hours.
         user_recovery_multiplier: A multiplier to adjust the tau value for
@@ -122,8 +145,11 @@ def calculate_current_fatigue(
         adjusted_tau_hours = default_recovery_tau_map['default'] # Fallback to a sensible default
 
     for session in session_history:
-        session_date = session.get('session_date')
-        stimulus = session.get('stimulus')
+        if isinstance(session, tuple):  # rows.SessionLoad
+            session_date, stimulus = session
+        else:
+            session_date = session.get('session_date')
+            stimulus = session.get('stimulus')
 
         if not isinstance(session_date, datetime) or not isinstance(stimulus, (float, int)):
             # Optionally log a warning or skip this record
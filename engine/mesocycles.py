@@ -1,6 +1,7 @@
 import uuid
 from datetime import date, timedelta
 import psycopg2 # For type hinting cursor
+import psycopg2.extras
 
 PHASE_ACCUMULATION = 'accumulation'
 PHASE_INTENSIFICATION = 'intensification'
@@ -11,6 +12,12 @@ PHASE_DURATIONS = {
     PHASE_DELOAD: 1,
 }
 PHASE_ORDER = [PHASE_ACCUMULATION, PHASE_INTENSIFICATION, PHASE_DELOAD]
+CYCLE_WEEKS = sum(PHASE_DURATIONS.values())
+# Week (0-based) within a cycle at which each phase begins.
+PHASE_OFFSETS_WEEKS = {
+    phase: sum(PHASE_DURATIONS[p] for p in PHASE_ORDER[:index])
+    for index, phase in enumerate(PHASE_ORDER)
+}
 
 def _get_next_phase_details(current_phase: str, current_phase_start_date: date) -> tuple[str, date]:
     """ Calculates the next phase and its natural start date. """
@@ -129,3 +136,132 @@ def get_or_create_current_mesocycle(db_cursor: 'psycopg2.extensions.cursor', use
                 'week_number': final_week_in_phase, 'start_date': final_phase_start_date}
     else:
         return meso
+
+
+def compute_mesocycle_state(phase: str, phase_start_date: date, current_date: date) -> dict:
+    """ Closed-form mesocycle position on `current_date`.
+
+    Given a stored phase and the date that phase started, returns the phase,
+    its start date and week number today, plus how many full cycles have
+    completed since (`cycles_completed` > 0 means a new mesocycle has begun).
+    Equivalent to walking the transitions week by week, in O(1).
+    """
+    phase_offset = PHASE_OFFSETS_WEEKS.get(phase, 0)
+    cycle_start_date = phase_start_date - timedelta(weeks=phase_offset)
+    weeks_since_cycle_start = (current_date - cycle_start_date).days // 7
+
+    if weeks_since_cycle_start < phase_offset:
+        # current_date precedes the stored phase start; nothing to advance.
+        return {'phase': phase, 'start_date': phase_start_date, 'week_number': 1, 'cycles_completed': 0}
+
+    cycles_completed, week_in_cycle = divmod(weeks_since_cycle_start, CYCLE_WEEKS)
+    current_phase = PHASE_ORDER[0]
+    for candidate in PHASE_ORDER:
+        if week_in_cycle >= PHASE_OFFSETS_WEEKS[candidate]:
+            current_phase = candidate
+    current_phase_offset = PHASE_OFFSETS_WEEKS[current_phase]
+
+    return {
+        'phase': current_phase,
+        'start_date': cycle_start_date + timedelta(weeks=cycles_completed * CYCLE_WEEKS + current_phase_offset),
+        'week_number': week_in_cycle - current_phase_offset + 1,
+        'cycles_completed': cycles_completed,
+    }
+
+
+def get_current_mesocycle(db_cursor: 'psycopg2.extensions.cursor', user_id: str, current_date: date) -> dict:
+    """ Read-only counterpart of get_or_create_current_mesocycle for request paths.
+
+    Projects the user's latest stored mesocycle forward to `current_date` with
+    compute_mesocycle_state without writing anything; the nightly
+    advance_all_mesocycles job persists the transitions. Users with no
+    mesocycle yet get an unsaved accumulation week 1 (id None).
+    """
+    db_cursor.execute(
+        "SELECT id, user_id, phase, start_date, week_number FROM mesocycles "
+        "WHERE user_id = %s ORDER BY start_date DESC, id DESC LIMIT 1",
+        (user_id,)
+    )
+    meso = db_cursor.fetchone()
+    if not meso:
+        return {'id': None, 'user_id': user_id, 'phase': PHASE_ACCUMULATION, 'week_number': 1, 'start_date': current_date}
+
+    state = compute_mesocycle_state(meso['phase'], meso['start_date'], current_date)
+    return {
+        # After a completed cycle the nightly job will insert a new row.
+        'id': meso['id'] if state['cycles_completed'] == 0 else None,
+        'user_id': user_id,
+        'phase': state['phase'],
+        'week_number': state['week_number'],
+        'start_date': state['start_date'],
+    }
+
+
+def advance_all_mesocycles(db_conn: 'psycopg2.extensions.connection', current_date: date, batch_size: int = 5000) -> dict:
+    """ Nightly bulk advancement of every user's mesocycle to `current_date`.
+
+    Walks users in keyset-paginated batches and, per batch, issues one UPDATE
+    for in-cycle phase changes and one INSERT for users who finished a cycle
+    or have logged a workout but have no mesocycle yet. Users who never
+    trained are skipped; get_current_mesocycle gives them an unsaved default.
+    Each batch is committed on its own, so the job never holds one transaction
+    across the whole user table. Advancing is idempotent, so a retry after a
+    failed batch leaves the committed batches unchanged.
+    Returns counts of updated and inserted rows.
+    """
+    counts = {'updated': 0, 'inserted': 0}
+    last_user_id = None
+    while True:
+        with db_conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT u.id, m.id, m.phase, m.start_date, m.week_number
+                FROM users u
+                LEFT JOIN LATERAL (
+                    SELECT id, phase, start_date, week_number FROM mesocycles
+                    WHERE user_id = u.id
+                    ORDER BY start_date DESC, id DESC LIMIT 1
+                ) m ON TRUE
+                WHERE (%s::uuid IS NULL OR u.id > %s::uuid)
+                  AND (m.id IS NOT NULL OR EXISTS (SELECT 1 FROM workouts w WHERE w.user_id = u.id))
+                ORDER BY u.id
+                LIMIT %s;
+                """,
+                (last_user_id, last_user_id, batch_size)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            updates, inserts = [], []
+            for user_id, meso_id, phase, start_date, week_number in rows:
+                if meso_id is None:
+                    inserts.append((str(uuid.uuid4()), str(user_id), PHASE_ACCUMULATION, current_date, 1))
+                    continue
+                state = compute_mesocycle_state(phase, start_date, current_date)
+                if state['cycles_completed'] > 0:
+                    inserts.append((str(uuid.uuid4()), str(user_id), state['phase'], state['start_date'], state['week_number']))
+                elif (state['phase'], state['start_date'], state['week_number']) != (phase, start_date, week_number):
+                    updates.append((str(meso_id), state['phase'], state['start_date'], state['week_number']))
+
+            if updates:
+                psycopg2.extras.execute_values(
+                    cur,
+                    "UPDATE mesocycles AS m SET phase = v.phase, start_date = v.start_date::date, week_number = v.week_number "
+                    "FROM (VALUES %s) AS v(id, phase, start_date, week_number) WHERE m.id = v.id::uuid",
+                    updates,
+                    page_size=batch_size,
+                )
+            if inserts:
+                psycopg2.extras.execute_values(
+                    cur,
+                    "INSERT INTO mesocycles (id, user_id, phase, start_date, week_number) VALUES %s",
+                    inserts,
+                    page_size=batch_size,
+                )
+        db_conn.commit()
+        counts['updated'] += len(updates)
+        counts['inserted'] += len(inserts)
+        last_user_id = str(rows[-1][0])
+        if len(rows) < batch_size:
+            break
+    return counts
@@ -0,0 +1,154 @@
+"""Prometheus metrics for the engine, served at /metrics.
+
+Under gunicorn every worker is its own process, so prometheus_client runs in
+multiprocess mode when PROMETHEUS_MULTIPROC_DIR is set (see gunicorn.conf.py,
+which clears the directory on start and marks exited workers dead). Each
+scrape then aggregates all workers' samples. Without it, e.g. `python app.py`,
+the default single-process registry is used.
+
+The RQ queue depth is read from Redis at scrape time rather than tracked.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+METRICS_RQ_QUEUES = ("training",)
+
+REQUEST_LATENCY = Histogram(
+    "gymgenius_http_request_duration_seconds",
+    "Route latency by blueprint and endpoint.",
+    ["blueprint", "endpoint", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "gymgenius_db_pool_checkout_seconds",
+    "Time spent getting a connection from the pool (includes opening new connections).",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+DB_POOL_CHECKOUT_ERRORS = Counter(
+    "gymgenius_db_pool_checkout_errors_total",
+    "Pool checkouts that failed, e.g. because the pool was exhausted.",
+)
+DB_POOL_IN_USE = Gauge(
+    "gymgenius_db_pool_connections_in_use",
+    "Connections currently checked out, summed over live workers.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_MAX = Gauge(
+    "gymgenius_db_pool_connections_max",
+    "Pool capacity, summed over live workers.",
+    multiprocess_mode="livesum",
+)
+JWT_BLOCKLIST_CHECKS = Counter(
+    "gymgenius_jwt_blocklist_checks_total",
+    "JWT blocklist lookups by outcome (revoked, valid, error).",
+    ["result"],
+)
+COMPUTATION_LATENCY = Histogram(
+    "gymgenius_computation_duration_seconds",
+    "Time spent in hot in-process computations.",
+    ["computation"],
+    buckets=(0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
+
+
+@contextmanager
+def observe_computation(name):
+    """Time the enclosed block into gymgenius_computation_duration_seconds."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        COMPUTATION_LATENCY.labels(computation=name).observe(time.perf_counter() - started)
+
+
+def timed_computation(name):
+    """Decorator form of `observe_computation`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with observe_computation(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RQQueueCollector:
+    """Reports the length of each RQ queue when scraped."""
+
+    def __init__(self, queue_names=METRICS_RQ_QUEUES):
+        self.queue_names = queue_names
+        self._redis = None
+
+    def collect(self):
+        depth = GaugeMetricFamily("gymgenius_rq_queue_depth", "Jobs waiting in an RQ queue.", labels=["queue"])
+        try:
+            from redis import Redis
+            from rq import Queue
+
+            if self._redis is None:
+                self._redis = Redis.from_url(REDIS_URL, socket_timeout=1)
+            for name in self.queue_names:
+                depth.add_metric([name], Queue(name, connection=self._redis).count)
+        except Exception as e:
+            logger.warning(f"Could not read RQ queue depth for metrics: {e}")
+            return
+        yield depth
+
+
+_rq_registry = CollectorRegistry()
+_rq_registry.register(RQQueueCollector())
+
+
+def _start_request_timer():
+    g._metrics_started = time.perf_counter()
+
+
+def _observe_request(response):
+    started = g.pop("_metrics_started", None)
+    if started is not None and request.endpoint != "metrics":
+        REQUEST_LATENCY.labels(
+            blueprint=request.blueprint or "app",
+            endpoint=request.endpoint or "unmatched",
+            method=request.method,
+            status=str(response.status_code),
+        ).observe(time.perf_counter() - started)
+    return response
+
+
+def metrics_view():
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        output = generate_latest(registry)
+    else:
+        output = generate_latest(REGISTRY)
+    return Response(output + generate_latest(_rq_registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app, limiter=None):
+    """Register request timing hooks and the /metrics route on `app`."""
+    app.before_request(_start_request_timer)
+    app.after_request(_observe_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
+    if limiter is not None:
+        limiter.exempt(metrics_view)  # Scraped every few seconds
@@ -0,0 +1,88 @@
+"""Monthly partition maintenance for the time-series tables.
+
+workout_sets and estimated_1rm_history are range-partitioned by month
+(migration 007). The nightly job keeps PARTITION_MONTHS_AHEAD months of empty
+partitions ready, so live writes never land in the `<table>_default`
+catch-all. With PARTITION_RETENTION_MONTHS set, it also detaches partitions
+that ended more than that many months ago. Detached partitions become plain
+tables that can be archived or dropped; nothing is deleted here.
+"""
+import logging
+import os
+import re
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = {
+    "workout_sets": "completed_at",
+    "estimated_1rm_history": "calculated_at",
+}
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# 0 keeps every partition attached.
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def add_months(day, months):
+    """First day of the month `months` after the month containing `day`."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_month(partition_name):
+    """The month a `<table>_pYYYY_MM` partition covers, or None for other names."""
+    match = _PARTITION_SUFFIX.search(partition_name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def ensure_partitions(conn, today, months_ahead=PARTITION_MONTHS_AHEAD):
+    """Create missing monthly partitions from this month to `months_ahead`
+    months out. Returns {table: partitions created}."""
+    created = {}
+    with conn.cursor() as cur:
+        for table in PARTITIONED_TABLES:
+            cur.execute(
+                "SELECT ensure_monthly_partitions(%s, %s, %s);",
+                (table, add_months(today, 0), add_months(today, months_ahead)),
+            )
+            created[table] = cur.fetchone()[0]
+    return created
+
+
+def detach_expired_partitions(conn, today, retention_months=PARTITION_RETENTION_MONTHS):
+    """Detach partitions whose month ended more than `retention_months` ago.
+
+    Returns the names of the detached partitions. The default partition is
+    never touched. Does nothing when `retention_months` is 0.
+    """
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(today, -retention_months)
+    detached = []
+    with conn.cursor() as cur:
+        for table in PARTITIONED_TABLES:
+            cur.execute(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname;",
+                (table,),
+            )
+            for (partition_name,) in cur.fetchall():
+                month = partition_month(partition_name)
+                if month is None or add_months(month, 1) > cutoff:
+                    continue
+                cur.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{partition_name}";')
+                detached.append(partition_name)
+    return detached
+
+
+def maintain_partitions(conn, today):
+    """Nightly entry point: create upcoming partitions, detach expired ones."""
+    created = ensure_partitions(conn, today)
+    detached = detach_expired_partitions(conn, today)
+    logger.info("Partition maintenance for %s: created %s, detached %s", today, created, detached)
+    return {"created": created, "detached": detached}
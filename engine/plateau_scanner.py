@@ -0,0 +1,235 @@
+"""Population-wide nightly plateau scan.
+
+Walks every active user/exercise pair (an e1RM recorded within
+PLATEAU_SCAN_ACTIVE_DAYS) in keyset-paginated chunks. For each chunk it loads
+up to PLATEAU_SCAN_HISTORY_LIMIT estimates per pair from the last
+PLATEAU_ANALYSIS_HISTORY_DAYS in one query.
+
+Most active pairs are still progressing. NumPy grouped sums fit the slope of
+every pair's last PLATEAU_SCAN_PREFILTER_POINTS estimates at once, and pairs
+whose recent estimates still clearly rise are dropped before the per-series
+work. The rest go through `detect_plateau_segmented`, the detector of the
+plateau-analysis route, which classifies only the latest change-point segment
+and also reports when the plateau began. The recommendation route differs: it
+classifies the linear slope over the last PLATEAU_CHECK_WINDOW estimates
+(e1rm_stats) with `classify_plateau`. Both use the same slope threshold and
+PlateauStatus values, but a stall after a long climb can be flagged here while
+that route's window still slopes upwards.
+
+New events are bulk-inserted into plateau_events. A pair is skipped if it has
+an unacknowledged event from the last PLATEAU_EVENT_NOTIFICATION_COOLDOWN_WEEKS,
+or an event since the plateau's onset.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import psycopg2.extras
+
+from .constants import (
+    PLATEAU_ANALYSIS_HISTORY_DAYS,
+    PLATEAU_EVENT_NOTIFICATION_COOLDOWN_WEEKS,
+    PLATEAU_MIN_HISTORY,
+)
+from .changepoint import CHANGEPOINT_MIN_SEGMENT, detect_plateau_segmented
+
+logger = logging.getLogger(__name__)
+
+# Pairs with no e1RM recorded in this many days are not scanned.
+PLATEAU_SCAN_ACTIVE_DAYS = 28
+# Most recent estimates per pair handed to the change-point segmentation.
+PLATEAU_SCAN_HISTORY_LIMIT = 200
+# User/exercise pairs loaded and classified per chunk.
+PLATEAU_SCAN_CHUNK_PAIRS = 2000
+# Value stored in plateau_events.protocol_applied for scanner-created events.
+PLATEAU_SCAN_PROTOCOL = "nightly_scan"
+# Trailing estimates whose slope decides whether a pair is segmented at all.
+# A plateau this long always passes; shorter ones are found on a later night.
+PLATEAU_SCAN_PREFILTER_POINTS = 2 * CHANGEPOINT_MIN_SEGMENT
+# Pairs gaining more than this fraction of their level per estimate over the
+# trailing points are still progressing and are not segmented.
+PLATEAU_SCAN_PREFILTER_MIN_GAIN = 0.005
+
+
+def grouped_trend_slopes(pair_codes, values, n_pairs):
+    """Least-squares slope of each pair's series, for all pairs at once.
+
+    `pair_codes` gives each value's pair index (0..n_pairs-1). Within a pair,
+    values must be in chronological order. x is the position in the pair's
+    series, as in `calculate_trend_slope`. Returns (slopes, counts). Pairs
+    with fewer than two points get a slope of 0.
+    """
+    counts = np.bincount(pair_codes, minlength=n_pairs)
+    x = (np.arange(len(values)) - _pair_starts(counts)[pair_codes]).astype(float)
+
+    sum_x = np.bincount(pair_codes, weights=x, minlength=n_pairs)
+    sum_y = np.bincount(pair_codes, weights=values, minlength=n_pairs)
+    sum_xy = np.bincount(pair_codes, weights=x * values, minlength=n_pairs)
+    sum_xx = np.bincount(pair_codes, weights=x * x, minlength=n_pairs)
+    den = counts * sum_xx - sum_x * sum_x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = np.where(np.abs(den) > 1e-9, (counts * sum_xy - sum_x * sum_y) / den, 0.0)
+    return slopes, counts
+
+
+def _pair_starts(counts):
+    """Index of each pair's first value in the pair-sorted arrays."""
+    return np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+
+def prefilter_pairs(pair_codes, values, n_pairs):
+    """Pair indexes worth segmenting: enough history and a trailing trend that
+    is not clearly rising."""
+    counts = np.bincount(pair_codes, minlength=n_pairs)
+    position = np.arange(len(values)) - _pair_starts(counts)[pair_codes]
+    tail = position >= counts[pair_codes] - PLATEAU_SCAN_PREFILTER_POINTS
+    tail_codes, tail_values = pair_codes[tail], values[tail]
+    tail_slopes, tail_counts = grouped_trend_slopes(tail_codes, tail_values, n_pairs)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tail_means = np.bincount(tail_codes, weights=tail_values, minlength=n_pairs) / tail_counts
+    rising = tail_slopes > PLATEAU_SCAN_PREFILTER_MIN_GAIN * np.abs(tail_means)
+    return np.flatnonzero((counts >= PLATEAU_MIN_HISTORY) & ~rising)
+
+
+def classify_pairs(pairs, history_rows, min_duration=3):
+    """Segment each candidate pair's e1RM history and return the plateauing ones.
+
+    `pairs` is a list of (user_id, exercise_id). `history_rows` holds
+    (pair_index, estimated_1rm, calculated_at) tuples, sorted by pair index and
+    then chronologically. Returns (user_id, exercise_id, plateau_status) tuples.
+    Each plateau_status carries 'onset_at' and 'duration_days'.
+    """
+    if not history_rows:
+        return []
+    pair_codes = np.fromiter((row[0] for row in history_rows), dtype=np.int64, count=len(history_rows))
+    values = np.fromiter((float(row[1]) for row in history_rows), dtype=float, count=len(history_rows))
+    counts = np.bincount(pair_codes, minlength=len(pairs))
+    starts = _pair_starts(counts)
+
+    plateaus = []
+    for pair_index in prefilter_pairs(pair_codes, values, len(pairs)):
+        rows = history_rows[starts[pair_index]:starts[pair_index] + counts[pair_index]]
+        plateau_status = detect_plateau_segmented(
+            [float(row[1]) for row in rows],
+            timestamps=[row[2] for row in rows],
+            min_duration=min_duration,
+        )
+        if plateau_status['plateauing']:
+            user_id, exercise_id = pairs[int(pair_index)]
+            plateaus.append((user_id, exercise_id, plateau_status))
+    return plateaus
+
+
+def _load_chunk_history(cur, pairs, history_since):
+    """Estimates of each pair since `history_since` as (pair_index,
+    estimated_1rm, calculated_at) rows, sorted by pair and then chronologically.
+    The time bound lets the planner skip older estimated_1rm_history partitions."""
+    cur.execute(
+        """
+        SELECT p.ord - 1 AS pair_index, h.estimated_1rm, h.calculated_at
+        FROM unnest(%s::uuid[], %s::uuid[]) WITH ORDINALITY AS p(user_id, exercise_id, ord)
+        CROSS JOIN LATERAL (
+            SELECT estimated_1rm, calculated_at FROM estimated_1rm_history
+            WHERE user_id = p.user_id AND exercise_id = p.exercise_id
+              AND calculated_at >= %s
+            ORDER BY calculated_at DESC
+            LIMIT %s
+        ) h
+        ORDER BY p.ord, h.calculated_at ASC;
+        """,
+        (
+            [user_id for user_id, _ in pairs], [exercise_id for _, exercise_id in pairs],
+            history_since, PLATEAU_SCAN_HISTORY_LIMIT,
+        )
+    )
+    return cur.fetchall()
+
+
+def _insert_plateau_events(cur, plateaus, run_started_at):
+    """Bulk-insert plateau events, skipping pairs still inside the notification
+    cooldown and plateaus that already have an event (acknowledged or not)."""
+    cutoff_date = run_started_at - timedelta(weeks=PLATEAU_EVENT_NOTIFICATION_COOLDOWN_WEEKS)
+    rows = [
+        (
+            user_id, exercise_id, run_started_at, plateau_status['duration_days'], PLATEAU_SCAN_PROTOCOL,
+            f"{plateau_status['status'].value} Detected by the nightly scan; "
+            f"plateau began {plateau_status['onset_at']:%Y-%m-%d} "
+            f"(slope since: {plateau_status['slope']:.4f}).",
+            cutoff_date, plateau_status['onset_at'],
+        )
+        for user_id, exercise_id, plateau_status in plateaus
+    ]
+    if not rows:
+        return 0
+    inserted = psycopg2.extras.execute_values(
+        cur,
+        """
+        INSERT INTO plateau_events (
+            user_id, exercise_id, detected_at,
+            plateau_duration_days, protocol_applied, details, acknowledged_at
+        )
+        SELECT v.user_id::uuid, v.exercise_id::uuid, v.detected_at::timestamptz,
+               v.duration::int, v.protocol, v.details, NULL
+        FROM (VALUES %s) AS v(user_id, exercise_id, detected_at, duration, protocol, details, cutoff, onset)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM plateau_events pe
+            WHERE pe.user_id = v.user_id::uuid AND pe.exercise_id = v.exercise_id::uuid
+              AND (
+                  (pe.acknowledged_at IS NULL AND pe.detected_at >= v.cutoff::timestamptz)
+                  OR pe.detected_at >= v.onset::timestamptz
+              )
+        )
+        RETURNING 1;
+        """,
+        rows,
+        fetch=True,
+    )
+    return len(inserted)
+
+
+def scan_all_plateaus(db_conn, run_started_at=None, chunk_pairs=PLATEAU_SCAN_CHUNK_PAIRS):
+    """Scan every active user/exercise pair and record new plateau events.
+
+    Each chunk is committed on its own, so a long scan does not keep one
+    transaction open and a retry only repeats chunks that did not commit.
+    The cooldown check stops a retry from inserting duplicates. Returns
+    {"pairs_scanned", "plateaus", "inserted"}.
+    """
+    run_started_at = run_started_at or datetime.now(timezone.utc)
+    active_since = run_started_at - timedelta(days=PLATEAU_SCAN_ACTIVE_DAYS)
+    history_since = run_started_at - timedelta(days=PLATEAU_ANALYSIS_HISTORY_DAYS)
+    totals = {"pairs_scanned": 0, "plateaus": 0, "inserted": 0}
+    last_key = None
+    while True:
+        with db_conn.cursor() as cur:
+            # Keyset pagination on the e1rm_stats primary key.
+            cur.execute(
+                """
+                SELECT user_id::text, exercise_id::text FROM e1rm_stats
+                WHERE updated_at >= %s AND n >= %s
+                  AND (%s::boolean OR (user_id, exercise_id) > (%s::uuid, %s::uuid))
+                ORDER BY user_id, exercise_id
+                LIMIT %s;
+                """,
+                (
+                    active_since, PLATEAU_MIN_HISTORY, last_key is None,
+                    last_key[0] if last_key else None, last_key[1] if last_key else None,
+                    chunk_pairs,
+                )
+            )
+            pairs = [tuple(row) for row in cur.fetchall()]
+            if not pairs:
+                break
+            plateaus = classify_pairs(pairs, _load_chunk_history(cur, pairs, history_since))
+            totals["inserted"] += _insert_plateau_events(cur, plateaus, run_started_at)
+        db_conn.commit()
+        totals["pairs_scanned"] += len(pairs)
+        totals["plateaus"] += len(plateaus)
+        last_key = pairs[-1]
+        if len(pairs) < chunk_pairs:
+            break
+    logger.info(
+        "Plateau scan: %s pairs scanned, %s plateauing, %s events inserted.",
+        totals["pairs_scanned"], totals["plateaus"], totals["inserted"],
+    )
+    return totals
@@ -11,9 +11,15 @@ from constants import ( # Adjusted import based on change description
     MIN_CONFIDENCE_FOR_BIAS_ADJUSTMENT,
     PLATE_ROUNDING_LOGIC,
     AVAILABLE_PLATE_SIZES_KG,
-    BARBELL_WEIGHT_KG
+    BARBELL_WEIGHT_KG,
+    CONFIDENCE_MIN_SAMPLES,
+    CONFIDENCE_WINDOW,
 )
 
+DEFAULT_AVAILABLE_PLATES_KG = AVAILABLE_PLATE_SIZES_KG
+DEFAULT_BARBELL_WEIGHT_KG = BARBELL_WEIGHT_KG
+DEFAULT_ASSUMED_RIR = 2  # RIR assumed for sets logged without one
+
 # Helper for manual stddev and mean if numpy not used
 def _calculate_stats(values: list[float]) -> tuple[float | None, float | None]:
     n = len(values)
@@ -33,8 +39,8 @@ def calculate_confidence_score(
     user_id: str,
     exercise_id: str,
     db_cursor: 'psycopg2.extensions.cursor', # Type hint for psycopg2 cursor
-    min_samples: int = 3,
-    max_samples: int = 10
+    min_samples: int = CONFIDENCE_MIN_SAMPLES,
+    max_samples: int = CONFIDENCE_WINDOW
 ) -> float | None:
     """
     Calculates a confidence score for the current 1RM estimate based on historical consistency.
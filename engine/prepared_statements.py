@@ -0,0 +1,146 @@
+"""Server-side prepared statements for the recommendation and log-set paths.
+
+The statements below run on nearly every recommendation and logged set. Each
+is PREPAREd once per pooled connection, on that connection's first checkout
+(see ConnectionPool.getconn in app.py), so the server parses and plans it
+once instead of on every call. Handlers run them by name:
+
+    execute_prepared(cur, "latest_e1rm", (user_id, exercise_id))
+
+A connection on which a statement is not prepared runs the SQL text instead,
+with the same parameters. That covers connections made outside the pool (RQ
+workers, scripts, tests), a PREPARE that failed, e.g. on a schema that lacks a
+column, and PREPARED_STATEMENTS_ENABLED=false. Disable it when connecting
+through a transaction-pooling proxy such as PgBouncer, which does not keep
+prepared statements per client.
+
+Statements are written with %s placeholders in parameter order and must not
+select `*`: a prepared `*` query fails once a migration changes the columns.
+"""
+import logging
+import os
+import re
+import weakref
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+PREPARED_STATEMENTS_ENABLED = os.getenv("PREPARED_STATEMENTS_ENABLED", "true").lower() == "true"
+
+PREPARED_STATEMENTS = {
+    "latest_e1rm": (
+        "SELECT estimated_1rm FROM estimated_1rm_history WHERE user_id = %s AND exercise_id = %s "
+        "ORDER BY calculated_at DESC LIMIT 1"
+    ),
+    "latest_e1rm_source": (
+        "SELECT estimated_1rm, source_weight, source_reps, source_rir FROM estimated_1rm_history "
+        "WHERE user_id = %s AND exercise_id = %s ORDER BY calculated_at DESC LIMIT 1"
+    ),
+    "exercise_muscle_group": "SELECT name, main_target_muscle_group FROM exercises WHERE id = %s",
+    "latest_readiness": (
+        "SELECT sleep_hours, stress_level, hrv_ms FROM workouts WHERE user_id = %s AND completed_at IS NOT NULL "
+        "ORDER BY completed_at DESC LIMIT 1"
+    ),
+    # Per-workout MTI for one muscle group over the last 21 days. The ws.completed_at
+    # bound keeps the workout_sets index range tight; a day of slack covers long sessions.
+    "recent_session_mti": """
+        SELECT w.completed_at AS session_date, SUM(ws.mti) AS stimulus
+        FROM workout_sets ws
+        JOIN workouts w ON ws.workout_id = w.id
+        JOIN exercises e ON ws.exercise_id = e.id
+        WHERE ws.user_id = %s
+          AND e.main_target_muscle_group = %s
+          AND ws.completed_at >= (NOW() AT TIME ZONE 'UTC') - INTERVAL '22 days'
+          AND w.completed_at IS NOT NULL
+          AND w.completed_at >= (NOW() AT TIME ZONE 'UTC') - INTERVAL '21 days'
+        GROUP BY w.id, w.completed_at
+        ORDER BY w.completed_at ASC
+    """,
+    # Per-set tonnage for one muscle group over the last N days (rows.SessionLoad)
+    "recent_session_tonnage": """
+        SELECT ws.completed_at AS session_date, (ws.actual_weight * ws.actual_reps) AS stimulus
+        FROM workout_sets ws
+        JOIN exercises e ON ws.exercise_id = e.id
+        WHERE ws.user_id = %s AND e.main_target_muscle_group = %s
+          AND ws.completed_at >= NOW() - %s * INTERVAL '1 day'
+          AND ws.actual_weight IS NOT NULL AND ws.actual_reps IS NOT NULL
+        ORDER BY ws.completed_at DESC LIMIT 50
+    """,
+    "lock_user_rir_bias": "SELECT rir_bias, rir_bias_lr, rir_bias_error_ema FROM users WHERE id = %s FOR UPDATE",
+    "update_user_rir_bias": (
+        "UPDATE users SET rir_bias = %s, rir_bias_error_ema = %s, updated_at = NOW() WHERE id = %s"
+    ),
+    "todays_workout": (
+        "SELECT id FROM workouts WHERE user_id = %s AND DATE(started_at AT TIME ZONE 'UTC') = %s "
+        "ORDER BY started_at DESC LIMIT 1"
+    ),
+    "insert_auto_workout": (
+        "INSERT INTO workouts (id, user_id, started_at, notes, created_at, updated_at) "
+        "VALUES (%s, %s, %s, %s, NOW(), NOW())"
+    ),
+    "max_set_number": (
+        "SELECT COALESCE(MAX(set_number), 0) AS max_set_num FROM workout_sets "
+        "WHERE workout_id = %s AND exercise_id = %s"
+    ),
+}
+
+_PLACEHOLDER_RE = re.compile(r"%s")
+
+# Statement names prepared on each pooled connection
+_prepared = weakref.WeakKeyDictionary()
+
+
+def _numbered(sql):
+    """Rewrite %s placeholders as $1, $2, ... for PREPARE."""
+    counter = iter(range(1, sql.count("%s") + 1))
+    return _PLACEHOLDER_RE.sub(lambda match: f"${next(counter)}", sql)
+
+
+_EXECUTE_SQL = {
+    name: f"EXECUTE {name} ({', '.join(['%s'] * sql.count('%s'))})"
+    for name, sql in PREPARED_STATEMENTS.items()
+}
+
+
+def statements_prepared(conn):
+    """Whether `prepare_statements` has already run on `conn`."""
+    return conn in _prepared
+
+
+def prepare_statements(conn):
+    """PREPARE every registered statement on an idle connection.
+
+    Each statement is prepared in its own autocommit step, so one failure
+    doesn't undo the rest. Failed statements fall back to their SQL text.
+    """
+    names = set()
+    if PREPARED_STATEMENTS_ENABLED:
+        autocommit = conn.autocommit
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                for name, sql in PREPARED_STATEMENTS.items():
+                    try:
+                        cur.execute(f"PREPARE {name} AS {_numbered(sql)}")
+                        names.add(name)
+                    except psycopg2.Error as e:
+                        logger.warning(f"Could not prepare statement {name}, using plain SQL: {e}")
+        finally:
+            conn.autocommit = autocommit
+    _prepared[conn] = frozenset(names)
+
+
+def execute_prepared(cur, name, params):
+    """Run the registered statement `name` on `cur`, prepared if possible."""
+    if name in _prepared.get(cur.connection, ()):
+        cur.execute(_EXECUTE_SQL[name], params)
+    else:
+        cur.execute(PREPARED_STATEMENTS[name], params)
+
+
+def fetch_prepared_records(conn, record_type, name, params):
+    """`rows.fetch_records` for a registered statement."""
+    with conn.cursor() as cur:
+        execute_prepared(cur, name, params)
+        return list(map(record_type._make, cur.fetchall()))
@@ -0,0 +1,170 @@
+"""Opt-in request profiling for Flask routes.
+
+A request is profiled with cProfile when either:
+
+* it sends `X-Profile-Request: <INTERNAL_API_KEY>`, or
+* it falls in the random PROFILE_SAMPLE_RATE fraction of traffic (0 by default).
+
+Everything else runs unwrapped apart from one random draw. The top
+PROFILE_TOP_N functions by own time are stored under the endpoint name. With
+PROFILE_STORAGE=redis (the default) they go to a capped Redis list. With
+PROFILE_STORAGE=dir they go to JSON files under PROFILE_DIR. Stored profiles
+are read back with `get_profiles`. Profiled responses carry an `X-Profile-Id`
+header. Endpoint names must be Flask endpoint names (dotted identifiers); any
+other name is rejected before it reaches a file path or Redis key.
+
+`init_app` wraps every registered view, and `profiled` wraps a single one.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request
+
+from cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+PROFILE_STORAGE = os.getenv("PROFILE_STORAGE", "redis")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/gymgenius_profiles")
+PROFILE_KEEP_PER_ENDPOINT = int(os.getenv("PROFILE_KEEP_PER_ENDPOINT", "20"))
+PROFILE_TTL_SECONDS = int(os.getenv("PROFILE_TTL_SECONDS", str(7 * 24 * 3600)))
+PROFILE_HEADER = "X-Profile-Request"
+_REDIS_KEY_PREFIX = "profiles:"
+_ENDPOINT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*")
+
+
+def internal_key_matches(provided):
+    """Constant-time check of `provided` against INTERNAL_API_KEY (unset never matches)."""
+    internal_api_key = os.getenv("INTERNAL_API_KEY")
+    if not internal_api_key or provided is None:
+        return False
+    return hmac.compare_digest(provided.encode(), internal_api_key.encode())
+
+
+def _endpoint_dir(endpoint):
+    if not _ENDPOINT_RE.fullmatch(endpoint):
+        raise ValueError(f"Invalid endpoint name: {endpoint!r}")
+    return os.path.join(PROFILE_DIR, endpoint)
+
+
+def should_profile():
+    """Decide whether the current request is profiled."""
+    if internal_key_matches(request.headers.get(PROFILE_HEADER)):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def top_frames(profiler, limit=PROFILE_TOP_N):
+    """The `limit` functions with the most own time, as JSON-friendly dicts."""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, lineno, funcname), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{lineno}({funcname})",
+            "calls": ncalls,
+            "own_ms": round(tottime * 1000.0, 3),
+            "cumulative_ms": round(cumtime * 1000.0, 3),
+        })
+    rows.sort(key=lambda row: row["own_ms"], reverse=True)
+    return rows[:limit]
+
+
+def store_profile(endpoint, profile):
+    """Persist one profile. Storage failures are logged, never raised."""
+    try:
+        if PROFILE_STORAGE == "dir":
+            endpoint_dir = _endpoint_dir(endpoint)
+            os.makedirs(endpoint_dir, exist_ok=True)
+            with open(os.path.join(endpoint_dir, f"{profile['id']}.json"), "w") as fh:
+                json.dump(profile, fh)
+            # Keep the newest PROFILE_KEEP_PER_ENDPOINT files.
+            files = sorted(
+                (os.path.join(endpoint_dir, name) for name in os.listdir(endpoint_dir)),
+                key=os.path.getmtime,
+            )
+            for stale in files[:-PROFILE_KEEP_PER_ENDPOINT]:
+                os.remove(stale)
+        else:
+            key = f"{_REDIS_KEY_PREFIX}{endpoint}"
+            pipe = get_redis().pipeline()
+            pipe.lpush(key, json.dumps(profile))
+            pipe.ltrim(key, 0, PROFILE_KEEP_PER_ENDPOINT - 1)
+            pipe.expire(key, PROFILE_TTL_SECONDS)
+            pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not store profile for {endpoint}: {e}")
+
+
+def get_profiles(endpoint, limit=PROFILE_KEEP_PER_ENDPOINT):
+    """Stored profiles for `endpoint`, newest first. Raises ValueError for a
+    name that is not a Flask endpoint name."""
+    if PROFILE_STORAGE == "dir":
+        endpoint_dir = _endpoint_dir(endpoint)
+        if not os.path.isdir(endpoint_dir):
+            return []
+        files = sorted(
+            (os.path.join(endpoint_dir, name) for name in os.listdir(endpoint_dir)),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        profiles = []
+        for path in files[:limit]:
+            with open(path) as fh:
+                profiles.append(json.load(fh))
+        return profiles
+    if not _ENDPOINT_RE.fullmatch(endpoint):
+        raise ValueError(f"Invalid endpoint name: {endpoint!r}")
+    return [json.loads(raw) for raw in get_redis().lrange(f"{_REDIS_KEY_PREFIX}{endpoint}", 0, limit - 1)]
+
+
+def profiled(view):
+    """Wrap a view so selected requests run under cProfile."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not should_profile():
+            return view(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = view(*args, **kwargs)
+        finally:
+            profiler.disable()
+        endpoint = request.endpoint or view.__name__
+        profile = {
+            "id": uuid.uuid4().hex,
+            "endpoint": endpoint,
+            "method": request.method,
+            "path": request.path,
+            "captured_at": datetime.now(timezone.utc).isoformat(),
+            "wall_ms": round((time.perf_counter() - started) * 1000.0, 3),
+            "top_frames": top_frames(profiler),
+        }
+        store_profile(endpoint, profile)
+        try:
+            response = make_response(response)
+            response.headers["X-Profile-Id"] = profile["id"]
+        except Exception:
+            pass  # Leave unusual return values untouched
+        return response
+    return wrapper
+
+
+def init_app(app):
+    """Wrap every view registered on `app` so far with `profiled`."""
+    for endpoint, view in list(app.view_functions.items()):
+        if endpoint not in ("static", "metrics"):
+            app.view_functions[endpoint] = profiled(view)
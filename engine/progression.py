@@ -54,9 +54,28 @@ def detect_plateau(
             'slope': float - Calculated slope of the values.
             'details': str - Human-readable summary.
     """
-    n = len(values)
-    slope = calculate_trend_slope(values)
-
+    return classify_plateau(
+        calculate_trend_slope(values),
+        len(values),
+        threshold=threshold,
+        min_duration=min_duration,
+        check_frequency=check_frequency,
+    )
+
+
+def classify_plateau(
+    slope: float,
+    n: int,
+    threshold: float = 0.005,
+    min_duration: int = 3,
+    check_frequency: str = "session"
+) -> Dict[str, Any]:
+    """
+    Classifies a trend slope over `n` data points into the `detect_plateau`
+    result dict. Shared by `detect_plateau` and callers that already hold the
+    slope (e.g. from the incremental e1RM trend state), so both agree on the
+    PlateauStatus semantics.
+    """
     # Normalize threshold against the average value if avg_value is significant
     # This makes threshold relative to the magnitude of values
     # However, for metrics like e1RM, absolute changes might be more relevant.
@@ -231,6 +250,7 @@ def confidence_score(predictions: Iterable[float], actuals: Iterable[float]) ->
 __all__ = [
     "calculate_trend_slope",
     "detect_plateau",
+    "classify_plateau",
     "generate_deload_protocol",
     "confidence_score",
     "PlateauStatus",
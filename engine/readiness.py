@@ -1,15 +1,144 @@
+import logging
 import uuid
-from datetime import datetime, timezone, timedelta # Ensure all are imported
+from datetime import date, datetime, timezone, timedelta # Ensure all are imported
 import psycopg2
 import psycopg2.extras # For RealDictCursor if needed, though AVG might not require it.
-from app import get_db_connection, release_db_connection, logger
 
-# The functions will be added here in subsequent steps.
+logger = logging.getLogger(__name__)
+
+# --- Readiness score weights (sum to 1.0) ---
+SLEEP_TARGET_HOURS = 8.0
+STRESS_MAX_LEVEL = 10
+SLEEP_WEIGHT = 0.4
+STRESS_WEIGHT = 0.3
+HRV_WEIGHT = 0.3
+# Score 0..1 maps linearly onto a multiplier of 0.93..1.07 (score 0.5 -> 1.0)
+MULTIPLIER_BASE = 0.93
+MULTIPLIER_RANGE = 0.14
+
+# --- Rolling HRV baseline ---
+# Each user's 30-day HRV baseline is kept in user_hrv_baselines as a running
+# sum/count plus a ring of per-day contributions (slot = day index % window),
+# so expiring a day is a subtraction instead of an AVG() over workouts.
+HRV_BASELINE_WINDOW_DAYS = 30
+HRV_RING_EPOCH = date(2000, 1, 1) # Must match the slot mapping in migration 003
+
+
+def _hrv_ring_slot(day: date) -> int:
+    return (day - HRV_RING_EPOCH).days % HRV_BASELINE_WINDOW_DAYS
+
+
+def _empty_hrv_ring(ring_day: date) -> dict:
+    return {
+        'hrv_sum': 0.0,
+        'hrv_count': 0,
+        'day_sums': [0.0] * HRV_BASELINE_WINDOW_DAYS,
+        'day_counts': [0] * HRV_BASELINE_WINDOW_DAYS,
+        'ring_day': ring_day,
+    }
+
+
+def advance_hrv_ring(ring: dict, to_day: date) -> dict:
+    """
+    Returns a copy of `ring` rolled forward so that it covers the window ending
+    on `to_day`, dropping the contributions of days that fell out of it.
+    At most HRV_BASELINE_WINDOW_DAYS slots are touched regardless of the gap.
+    """
+    rolled = {
+        'hrv_sum': float(ring['hrv_sum']),
+        'hrv_count': int(ring['hrv_count']),
+        'day_sums': [float(v) for v in ring['day_sums']],
+        'day_counts': [int(v) for v in ring['day_counts']],
+        'ring_day': ring['ring_day'],
+    }
+    days_to_advance = (to_day - rolled['ring_day']).days
+    if days_to_advance <= 0:
+        return rolled
+    if days_to_advance >= HRV_BASELINE_WINDOW_DAYS:
+        return _empty_hrv_ring(to_day)
+
+    for offset in range(1, days_to_advance + 1):
+        slot = _hrv_ring_slot(rolled['ring_day'] + timedelta(days=offset))
+        rolled['hrv_sum'] -= rolled['day_sums'][slot]
+        rolled['hrv_count'] -= rolled['day_counts'][slot]
+        rolled['day_sums'][slot] = 0.0
+        rolled['day_counts'][slot] = 0
+    if rolled['hrv_count'] <= 0: # Reset accumulated float error when the window empties
+        rolled['hrv_sum'], rolled['hrv_count'] = 0.0, 0
+    rolled['ring_day'] = to_day
+    return rolled
+
+
+def apply_hrv_contribution(ring: dict, day: date, hrv_delta: float, count_delta: int) -> dict:
+    """
+    Adds (or with negative deltas, removes) an HRV reading taken on `day`.
+    Readings older than the ring's window are ignored. Callers advance the
+    ring to today first; a reading dated after the ring day (a client clock
+    ahead of ours) is counted on the ring day instead of moving the ring
+    into the future and expiring valid days.
+    """
+    day = min(day, ring['ring_day'])
+    ring = advance_hrv_ring(ring, day)
+    if (ring['ring_day'] - day).days >= HRV_BASELINE_WINDOW_DAYS:
+        return ring
+    slot = _hrv_ring_slot(day)
+    ring['day_sums'][slot] += hrv_delta
+    ring['day_counts'][slot] += count_delta
+    ring['hrv_sum'] += hrv_delta
+    ring['hrv_count'] += count_delta
+    return ring
+
+
+def _utc_day(ts: datetime) -> date:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).date()
+
+
+def update_hrv_baseline(cur, user_id: str, old_hrv_ms, old_completed_at, new_hrv_ms, new_completed_at) -> None:
+    """
+    Keeps user_hrv_baselines in step with a workout's hrv_ms/completed_at
+    change. Must run in the same transaction as the workouts UPDATE; the
+    baseline row is locked for the read-modify-write.
+    """
+    old_counted = old_hrv_ms is not None and old_completed_at is not None
+    new_counted = new_hrv_ms is not None and new_completed_at is not None
+    if not old_counted and not new_counted:
+        return
+    if old_counted and new_counted and float(old_hrv_ms) == float(new_hrv_ms) \
+            and _utc_day(old_completed_at) == _utc_day(new_completed_at):
+        return
+
+    today = datetime.now(timezone.utc).date()
+    cur.execute(
+        "INSERT INTO user_hrv_baselines (user_id, ring_day) VALUES (%s, %s) ON CONFLICT (user_id) DO NOTHING;",
+        (user_id, today)
+    )
+    cur.execute(
+        "SELECT hrv_sum, hrv_count, day_sums, day_counts, ring_day FROM user_hrv_baselines "
+        "WHERE user_id = %s FOR UPDATE;",
+        (user_id,)
+    )
+    ring = advance_hrv_ring(cur.fetchone(), today)
+    if old_counted:
+        ring = apply_hrv_contribution(ring, _utc_day(old_completed_at), -float(old_hrv_ms), -1)
+    if new_counted:
+        ring = apply_hrv_contribution(ring, _utc_day(new_completed_at), float(new_hrv_ms), 1)
+
+    cur.execute(
+        """
+        UPDATE user_hrv_baselines
+        SET hrv_sum = %s, hrv_count = %s, day_sums = %s, day_counts = %s, ring_day = %s, updated_at = NOW()
+        WHERE user_id = %s;
+        """,
+        (ring['hrv_sum'], ring['hrv_count'], ring['day_sums'], ring['day_counts'], ring['ring_day'], user_id)
+    )
+
 
 def get_personal_hrv_baseline(user_id: uuid.UUID, db_conn) -> float | None:
     """
-    Calculates the average hrv_ms from the workouts table for the given user_id
-    over the last 30 days (where hrv_ms is not NULL).
+    Returns the user's average hrv_ms over the last 30 days from the rolling
+    baseline in user_hrv_baselines (one primary-key lookup).
 
     Args:
         user_id: The UUID of the user.
@@ -20,21 +149,19 @@ def get_personal_hrv_baseline(user_id: uuid.UUID, db_conn) -> float | None:
     """
     try:
         with db_conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            sql_query = """
-                SELECT AVG(hrv_ms) as avg_hrv
-                FROM workouts
-                WHERE user_id = %s
-                  AND hrv_ms IS NOT NULL
-                  AND completed_at >= NOW() - INTERVAL '30 days';
-            """
-            cur.execute(sql_query, (str(user_id),)) # Ensure user_id is string for query
+            cur.execute(
+                "SELECT hrv_sum, hrv_count, day_sums, day_counts, ring_day FROM user_hrv_baselines WHERE user_id = %s;",
+                (str(user_id),)
+            )
             result = cur.fetchone()
 
-            if result and result['avg_hrv'] is not None:
-                return float(result['avg_hrv'])
-            else:
-                logger.info(f"No recent HRV data found for user {user_id} to calculate baseline.")
-                return None
+            if result:
+                # Expire days that left the window since the last write, without persisting.
+                ring = advance_hrv_ring(result, datetime.now(timezone.utc).date())
+                if ring['hrv_count'] > 0:
+                    return ring['hrv_sum'] / ring['hrv_count']
+            logger.info(f"No recent HRV data found for user {user_id} to calculate baseline.")
+            return None
     except psycopg2.Error as e:
         logger.error(f"Database error calculating HRV baseline for user {user_id}: {e}", exc_info=True)
         # Depending on desired behavior, could re-raise or return None
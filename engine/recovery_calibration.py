@@ -0,0 +1,190 @@
+"""Batch calibration of per-user recovery multipliers.
+
+`calculate_current_fatigue` models fatigue as Σ stimulus * exp(-Δt / (tau * m)),
+where `m` is the user's per-muscle-group entry in `users.recovery_multipliers`.
+This module fits `m` from a user's whole set history: for every session it
+measures the performance drop relative to the best e1RM previously achieved
+on the same exercises, and picks the multiplier whose fatigue curve best
+explains those drops (least squares, drop ≈ k * fatigue with k > 0).
+
+All candidate multipliers are evaluated at once with NumPy; the pairwise
+session decay matrix is built in row chunks to bound memory on long histories.
+"""
+import json
+import logging
+from itertools import groupby
+
+import numpy as np
+import psycopg2.extras
+
+from .learning_models import DEFAULT_RECOVERY_TAU_MAP
+
+logger = logging.getLogger(__name__)
+
+# Candidate recovery multipliers (1.0 = default tau).
+MULTIPLIER_GRID = np.round(np.linspace(0.5, 2.0, 16), 2)
+# Sessions with a measurable drop needed before a muscle group is calibrated.
+MIN_SESSIONS_FOR_CALIBRATION = 6
+# Rows of the session decay matrix evaluated per chunk.
+DECAY_CHUNK_ROWS = 128
+
+
+def estimate_e1rm(weights, reps, rir):
+    """Vectorized Epley e1RM on (reps + RIR), matching estimate_1rm_with_rir_bias with zero bias."""
+    total_reps = np.minimum(reps + rir, 29)
+    return weights / (1.0 - 0.0333 * total_reps)
+
+
+def _prior_best(exercise_codes, e1rm):
+    """Best e1RM achieved on the same exercise strictly before each set (NaN if none).
+
+    Expects rows in chronological order.
+    """
+    prior_best = np.full(e1rm.shape, np.nan)
+    order = np.argsort(exercise_codes, kind="stable")
+    boundaries = np.flatnonzero(np.diff(exercise_codes[order])) + 1
+    for group in np.split(order, boundaries):
+        running_max = np.maximum.accumulate(e1rm[group])
+        prior_best[group[1:]] = running_max[:-1]
+    return prior_best
+
+
+def session_fatigue(session_hours, stimulus, taus):
+    """Fatigue carried into each session from all earlier ones, for every tau.
+
+    Returns an array of shape (len(taus), len(session_hours)).
+    """
+    n_sessions = len(session_hours)
+    fatigue = np.zeros((len(taus), n_sessions))
+    for start in range(0, n_sessions, DECAY_CHUNK_ROWS):
+        stop = min(start + DECAY_CHUNK_ROWS, n_sessions)
+        # Only sessions before `stop` can contribute to rows [start, stop).
+        elapsed = session_hours[start:stop, None] - session_hours[None, :stop]
+        earlier = elapsed > 0
+        decay = np.exp(-np.where(earlier, elapsed, 0.0)[None, :, :] / taus[:, None, None])
+        fatigue[:, start:stop] = (decay * earlier) @ stimulus[:stop]
+    return fatigue
+
+
+def fit_recovery_multiplier(session_hours, stimulus, drops, base_tau_hours, multipliers=MULTIPLIER_GRID):
+    """Best-fitting recovery multiplier for one muscle group, or None.
+
+    `drops` holds each session's performance drop (NaN where it couldn't be
+    measured). For every candidate the scale k is solved in closed form, so
+    the search costs one matrix product per chunk rather than an optimizer.
+    """
+    measured = ~np.isnan(drops)
+    if measured.sum() < MIN_SESSIONS_FOR_CALIBRATION:
+        return None
+
+    fatigue = session_fatigue(session_hours, stimulus, base_tau_hours * multipliers)[:, measured]
+    observed = drops[measured]
+
+    sxx = np.einsum("ij,ij->i", fatigue, fatigue)
+    sxy = fatigue @ observed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = sxy / sxx
+        sse = observed @ observed - sxy * scale
+    sse[~(sxx > 0) | ~(scale > 0)] = np.inf
+    if not np.isfinite(sse).any():
+        return None
+    return float(multipliers[int(np.argmin(sse))])
+
+
+def fit_user_recovery_multipliers(set_rows, tau_map=DEFAULT_RECOVERY_TAU_MAP):
+    """Fit recovery multipliers for every muscle group in one user's history.
+
+    `set_rows` are (workout_id, exercise_id, muscle_group, weight, reps, rir,
+    mti, completed_at) tuples in chronological order. Returns a dict mapping
+    muscle group to multiplier for the groups with enough data.
+    """
+    if not set_rows:
+        return {}
+
+    workout_ids, exercise_ids, muscle_groups, weights, reps, rir, mti, completed_at = zip(*set_rows)
+    weights = np.asarray(weights, dtype=float)
+    reps = np.asarray(reps, dtype=float)
+    rir = np.nan_to_num(np.asarray(rir, dtype=float))
+    mti = np.nan_to_num(np.asarray(mti, dtype=float))
+    epoch_hours = np.array([ts.timestamp() for ts in completed_at]) / 3600.0
+
+    _, exercise_codes = np.unique(np.asarray(exercise_ids, dtype=str), return_inverse=True)
+    e1rm = estimate_e1rm(weights, reps, rir)
+    prior_best = _prior_best(exercise_codes, e1rm)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        set_drops = np.maximum(0.0, 1.0 - e1rm / prior_best)
+
+    # One session per (muscle group, workout): summed stimulus, first set time, mean drop.
+    session_keys = np.char.add(np.asarray(muscle_groups, dtype=str), np.char.add("|", np.asarray(workout_ids, dtype=str)))
+    _, session_codes = np.unique(session_keys, return_inverse=True)
+    n_sessions = session_codes.max() + 1
+    session_stimulus = np.bincount(session_codes, weights=mti, minlength=n_sessions)
+    session_hours = np.full(n_sessions, np.inf)
+    np.minimum.at(session_hours, session_codes, epoch_hours)
+    measured = ~np.isnan(set_drops)
+    drop_sums = np.bincount(session_codes[measured], weights=set_drops[measured], minlength=n_sessions)
+    drop_counts = np.bincount(session_codes[measured], minlength=n_sessions)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        session_drops = np.where(drop_counts > 0, drop_sums / drop_counts, np.nan)
+    session_muscle = np.empty(n_sessions, dtype=object)
+    session_muscle[session_codes] = muscle_groups
+
+    multipliers = {}
+    for muscle_group in set(muscle_groups):
+        in_group = session_muscle == muscle_group
+        order = np.argsort(session_hours[in_group], kind="stable")
+        base_tau = tau_map.get(muscle_group.lower(), tau_map['default'])
+        multiplier = fit_recovery_multiplier(
+            session_hours[in_group][order],
+            session_stimulus[in_group][order],
+            session_drops[in_group][order],
+            base_tau,
+        )
+        if multiplier is not None:
+            multipliers[muscle_group] = multiplier
+    return multipliers
+
+
+def calibrate_recovery_multipliers(conn, user_ids, run_started_at=None):
+    """Fit and store recovery multipliers for `user_ids`.
+
+    Loads the users' full set history in one query and writes every result
+    back with a single bulk UPDATE, merging into the existing JSONB so muscle
+    groups without enough data keep their previous value. Returns the number
+    of users updated.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT ws.user_id, ws.workout_id, ws.exercise_id, e.main_target_muscle_group,
+                   ws.actual_weight, ws.actual_reps, ws.actual_rir, ws.mti, ws.completed_at
+            FROM workout_sets ws
+            JOIN exercises e ON ws.exercise_id = e.id
+            WHERE ws.user_id = ANY(%s::uuid[])
+              AND ws.completed_at IS NOT NULL
+              AND e.main_target_muscle_group IS NOT NULL
+              AND ws.actual_weight > 0 AND ws.actual_reps > 0
+            ORDER BY ws.user_id, ws.completed_at;
+            """,
+            (list(user_ids),)
+        )
+        results = []
+        for user_id, rows in groupby(cur.fetchall(), key=lambda row: row[0]):
+            multipliers = fit_user_recovery_multipliers([row[1:] for row in rows])
+            if multipliers:
+                results.append((str(user_id), json.dumps(multipliers)))
+
+        if results:
+            psycopg2.extras.execute_values(
+                cur,
+                """
+                UPDATE users AS u
+                SET recovery_multipliers = COALESCE(u.recovery_multipliers, '{}'::jsonb) || v.multipliers::jsonb,
+                    updated_at = NOW()
+                FROM (VALUES %s) AS v(user_id, multipliers)
+                WHERE u.id = v.user_id::uuid;
+                """,
+                results
+            )
+    logger.info("Calibrated recovery multipliers for %s of %s users.", len(results), len(user_ids))
+    return len(results)
@@ -0,0 +1,122 @@
+"""Server-side response cache for expensive per-user GET endpoints.
+
+`@cached_response(*scopes)` stores a view's 200 response in Redis under a key
+built by `etags.request_fingerprint`, i.e. from the user, path and query string
+and the user's data versions for `scopes`. A write that bumps one of those
+versions therefore makes every cached response for it unreachable; the entries
+themselves just expire after the TTL, which also bounds how stale
+time-dependent output (e.g. fatigue decay) can get.
+
+On a miss only one worker computes the response (single-flight). It takes a
+short Redis lock, and the others poll for the stored result for up to
+RESPONSE_CACHE_WAIT_SECONDS before computing it themselves. If the lock
+disappears without a result, e.g. because the leader's view returned an error,
+they stop waiting straight away. Without Redis the view simply runs.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from functools import wraps
+
+from flask import Response, g, make_response, request
+
+from cache import get_redis
+from etags import request_fingerprint
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_LOCK_SECONDS = int(os.getenv("RESPONSE_CACHE_LOCK_SECONDS", "30"))
+RESPONSE_CACHE_WAIT_SECONDS = float(os.getenv("RESPONSE_CACHE_WAIT_SECONDS", "10"))
+RESPONSE_CACHE_POLL_SECONDS = float(os.getenv("RESPONSE_CACHE_POLL_SECONDS", "0.05"))
+RESPONSE_CACHE_PREFIX = "response_cache:"
+
+
+def _serialize(response):
+    return json.dumps({"body": response.get_data(as_text=True), "mimetype": response.mimetype})
+
+
+def _deserialize(cached):
+    stored = json.loads(cached)
+    return Response(stored["body"], status=200, mimetype=stored["mimetype"])
+
+
+def _release(redis, lock_key, token):
+    try:
+        if redis.get(lock_key) == token.encode():
+            redis.delete(lock_key)
+    except Exception as e:
+        logger.debug(f"Could not release response cache lock {lock_key}: {e}")
+
+
+def _compute_and_store(redis, key, ttl, compute):
+    response = make_response(compute())
+    if response.status_code == 200:
+        try:
+            redis.setex(key, ttl, _serialize(response))
+        except Exception as e:
+            logger.debug(f"Could not store cached response {key}: {e}")
+    return response
+
+
+def _wait_for_leader(redis, key, lock_key):
+    """The leader's stored response, or None if it gave up or took too long."""
+    deadline = time.monotonic() + RESPONSE_CACHE_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(RESPONSE_CACHE_POLL_SECONDS)
+        cached, lock = redis.mget([key, lock_key])
+        if cached is not None:
+            return cached
+        if lock is None:
+            return None
+    return None
+
+
+def _single_flight(redis, key, ttl, compute):
+    lock_key = key + ":lock"
+    token = uuid.uuid4().hex
+    try:
+        leader = redis.set(lock_key, token, nx=True, ex=RESPONSE_CACHE_LOCK_SECONDS)
+        cached = None if leader else _wait_for_leader(redis, key, lock_key)
+    except Exception as e:
+        logger.debug(f"Response cache lock failed for {key}: {e}")
+        return compute()
+
+    if cached is not None:
+        return _deserialize(cached)
+    try:
+        return _compute_and_store(redis, key, ttl, compute)
+    finally:
+        if leader:
+            _release(redis, lock_key, token)
+
+
+def cached_response(*scopes, daily=False, ttl=None):
+    """Cache 200 responses of a per-user GET view in Redis.
+
+    Apply below @jwt_required (and below @conditional_get when both are used,
+    so a 304 skips the cache lookup). `scopes` must cover every table the view
+    reads that users can change; `daily=True` also varies the key by UTC date.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or getattr(g, "current_user_id", None) is None:
+                return view(*args, **kwargs)
+            try:
+                redis = get_redis()
+                key = RESPONSE_CACHE_PREFIX + request_fingerprint(scopes, daily)
+                cached = redis.get(key)
+            except Exception as e:
+                logger.debug(f"Response cache unavailable for {request.path}: {e}")
+                return view(*args, **kwargs)
+
+            if cached is not None:
+                return _deserialize(cached)
+            return _single_flight(
+                redis, key, ttl or RESPONSE_CACHE_TTL_SECONDS, lambda: view(*args, **kwargs)
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+"""Lean row types for hot read paths.
+
+RealDictCursor builds a dict per row, and handlers then convert numeric
+columns from Decimal one value at a time. Two things here avoid that:
+
+* `register_row_types(conn)` makes a connection return NUMERIC columns (and
+  NUMERIC arrays) as floats. The API pool calls it once for every connection
+  it opens, so no handler needs `float(row[...])` any more.
+* The NamedTuple records below are filled from plain tuple cursors by
+  `fetch_records`. A record is a tuple with named fields, so it costs far less
+  than a dict and still reads as `row.stimulus`.
+
+Response-bound queries need not keep RealDictCursor either. A tuple would be
+serialized as a JSON array, so those handlers build each response object
+themselves: volume-summary from records, and mti-trends, 1rm-evolution,
+volume-heatmap and mti-history from plain tuple rows by position.
+RealDictCursor is left for the queries whose rows go into a response unchanged.
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import psycopg2.extensions
+
+NUMERIC_ARRAY_OID = 1231
+
+
+def _numeric_as_float(value, cur):
+    return float(value) if value is not None else None
+
+
+DECIMAL_AS_FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, "DECIMAL_AS_FLOAT", _numeric_as_float
+)
+DECIMAL_ARRAY_AS_FLOAT = psycopg2.extensions.new_array_type(
+    (NUMERIC_ARRAY_OID,), "DECIMAL_ARRAY_AS_FLOAT", DECIMAL_AS_FLOAT
+)
+
+
+def register_row_types(conn):
+    """Return NUMERIC values as floats on `conn`."""
+    psycopg2.extensions.register_type(DECIMAL_AS_FLOAT, conn)
+    psycopg2.extensions.register_type(DECIMAL_ARRAY_AS_FLOAT, conn)
+
+
+class SessionLoad(NamedTuple):
+    """One training session's stimulus, as consumed by calculate_current_fatigue."""
+    session_date: datetime
+    stimulus: Optional[float]
+
+
+class E1rmPoint(NamedTuple):
+    estimated_1rm: float
+    calculated_at: Optional[datetime]
+
+
+class PerformedSet(NamedTuple):
+    actual_weight: Optional[float]
+    actual_reps: Optional[int]
+    actual_rir: Optional[int]
+    completed_at: Optional[datetime]
+    mti: Optional[float]
+    notes: Optional[str]
+
+
+class MuscleVolume(NamedTuple):
+    muscle_group: Optional[str]
+    volume: Optional[float]
+
+
+class WeeklyMuscleVolume(NamedTuple):
+    week: datetime
+    muscle_group: Optional[str]
+    volume: Optional[float]
+
+
+def fetch_records(conn, record_type, query, params=None):
+    """Run `query` on a tuple cursor and return its rows as `record_type`.
+
+    The query must select exactly the record's fields, in field order.
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        return list(map(record_type._make, cur.fetchall()))
@@ -0,0 +1,231 @@
+"""Per-request SQL instrumentation.
+
+`get_db_connection` hands out pooled connections created with
+`InstrumentedConnection`. Every cursor they open, whatever `cursor_factory`
+the caller passes, times its statements. Inside a Flask request each statement
+is recorded on `g`. `finish_request` then:
+
+* logs requests that exceed SQL_SLOW_REQUEST_QUERIES or SQL_SLOW_REQUEST_MS;
+* flags statement fingerprints repeated SQL_N_PLUS_ONE_THRESHOLD or more
+  times as N+1 suspects;
+* folds the request into per-endpoint aggregates for `get_sql_stats`;
+* adds a `Server-Timing: db;dur=...` header.
+
+Statements run outside a request (RQ workers, scripts) are not recorded.
+Aggregates are kept per process.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import psycopg2.extensions
+from flask import g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+SQL_INSTRUMENTATION_ENABLED = os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+SQL_SLOW_REQUEST_QUERIES = int(os.getenv("SQL_SLOW_REQUEST_QUERIES", "15"))
+SQL_SLOW_REQUEST_MS = float(os.getenv("SQL_SLOW_REQUEST_MS", "250"))
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+# Distinct fingerprints kept per endpoint in the aggregates.
+SQL_STATS_MAX_FINGERPRINTS = 50
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalise a statement so executions that differ only in literals,
+    whitespace or IN-list length share one fingerprint."""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    elif not isinstance(sql, str):
+        sql = str(sql)  # psycopg2.sql.Composed
+    sql = _COMMENT_RE.sub(" ", sql)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?)", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip().rstrip(";").strip()
+
+
+class RequestSqlStats:
+    """Statements executed while handling one request."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.total_ms = 0.0
+        self.fingerprints = Counter()
+        self.fingerprint_ms = Counter()
+
+    def add(self, sql, duration_ms):
+        key = fingerprint(sql)
+        self.query_count += 1
+        self.total_ms += duration_ms
+        self.fingerprints[key] += 1
+        self.fingerprint_ms[key] += duration_ms
+
+    def n_plus_one_suspects(self, threshold=None):
+        threshold = threshold or SQL_N_PLUS_ONE_THRESHOLD
+        return {key: count for key, count in self.fingerprints.items() if count >= threshold}
+
+
+def _record(sql, duration_ms):
+    if not has_request_context():
+        return
+    stats = g.get("_sql_stats")
+    if stats is None:
+        stats = g._sql_stats = RequestSqlStats()
+    stats.add(sql, duration_ms)
+
+
+class InstrumentedCursorMixin:
+    """Times execute/executemany/callproc and records them on the current request."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record(query, (time.perf_counter() - started) * 1000.0)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record(query, (time.perf_counter() - started) * 1000.0)
+
+    def callproc(self, procname, parameters=None):
+        started = time.perf_counter()
+        try:
+            return super().callproc(procname, parameters)
+        finally:
+            _record(f"CALL {procname}", (time.perf_counter() - started) * 1000.0)
+
+
+_instrumented_factories = {}
+_factories_lock = threading.Lock()
+
+
+def _instrumented_factory(cursor_factory):
+    """Cached subclass of `cursor_factory` with InstrumentedCursorMixin in front."""
+    factory = _instrumented_factories.get(cursor_factory)
+    if factory is None:
+        with _factories_lock:
+            factory = _instrumented_factories.get(cursor_factory)
+            if factory is None:
+                factory = type(
+                    f"Instrumented{cursor_factory.__name__}",
+                    (InstrumentedCursorMixin, cursor_factory),
+                    {},
+                )
+                _instrumented_factories[cursor_factory] = factory
+    return factory
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors are instrumented. Pass as `connection_factory`."""
+
+    def cursor(self, *args, **kwargs):
+        cursor_factory = kwargs.pop("cursor_factory", None) or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs["cursor_factory"] = _instrumented_factory(cursor_factory)
+        return super().cursor(*args, **kwargs)
+
+
+def connection_kwargs():
+    """Extra psycopg2.connect() kwargs that install the instrumentation, if enabled."""
+    return {"connection_factory": InstrumentedConnection} if SQL_INSTRUMENTATION_ENABLED else {}
+
+
+# --- Aggregates ---
+
+_aggregates = {}
+_aggregates_lock = threading.Lock()
+
+
+def _empty_aggregate():
+    return {
+        "requests": 0,
+        "queries": 0,
+        "db_time_ms": 0.0,
+        "max_queries": 0,
+        "max_db_time_ms": 0.0,
+        "slow_requests": 0,
+        "n_plus_one_requests": 0,
+        "fingerprints": Counter(),
+    }
+
+
+def finish_request(response):
+    """after_request hook: log, flag and aggregate the request's SQL."""
+    stats = g.pop("_sql_stats", None)
+    if stats is None:
+        return response
+
+    endpoint = request.endpoint or request.path
+    suspects = stats.n_plus_one_suspects()
+    slow = stats.query_count > SQL_SLOW_REQUEST_QUERIES or stats.total_ms > SQL_SLOW_REQUEST_MS
+    if slow:
+        logger.warning(
+            "SQL heavy request %s %s (%s): %s queries, %.1f ms in DB",
+            request.method, request.path, endpoint, stats.query_count, stats.total_ms,
+        )
+    for key, count in suspects.items():
+        logger.warning("Possible N+1 in %s: %s executions of: %s", endpoint, count, key[:200])
+
+    with _aggregates_lock:
+        aggregate = _aggregates.setdefault(endpoint, _empty_aggregate())
+        aggregate["requests"] += 1
+        aggregate["queries"] += stats.query_count
+        aggregate["db_time_ms"] += stats.total_ms
+        aggregate["max_queries"] = max(aggregate["max_queries"], stats.query_count)
+        aggregate["max_db_time_ms"] = max(aggregate["max_db_time_ms"], stats.total_ms)
+        aggregate["slow_requests"] += int(slow)
+        aggregate["n_plus_one_requests"] += int(bool(suspects))
+        aggregate["fingerprints"].update(stats.fingerprints)
+        if len(aggregate["fingerprints"]) > SQL_STATS_MAX_FINGERPRINTS:
+            aggregate["fingerprints"] = Counter(dict(aggregate["fingerprints"].most_common(SQL_STATS_MAX_FINGERPRINTS)))
+
+    response.headers.add("Server-Timing", f"db;dur={stats.total_ms:.1f};desc=\"{stats.query_count} queries\"")
+    return response
+
+
+def get_sql_stats(top=10):
+    """Per-endpoint aggregates, heaviest endpoints (by total DB time) first."""
+    with _aggregates_lock:
+        snapshot = {endpoint: dict(aggregate) for endpoint, aggregate in _aggregates.items()}
+    endpoints = []
+    for endpoint, aggregate in sorted(snapshot.items(), key=lambda item: -item[1]["db_time_ms"]):
+        requests_seen = aggregate["requests"] or 1
+        endpoints.append({
+            "endpoint": endpoint,
+            "requests": aggregate["requests"],
+            "avg_queries": round(aggregate["queries"] / requests_seen, 2),
+            "max_queries": aggregate["max_queries"],
+            "avg_db_time_ms": round(aggregate["db_time_ms"] / requests_seen, 2),
+            "max_db_time_ms": round(aggregate["max_db_time_ms"], 2),
+            "slow_requests": aggregate["slow_requests"],
+            "n_plus_one_requests": aggregate["n_plus_one_requests"],
+            "top_statements": [
+                {"fingerprint": key, "executions": count}
+                for key, count in aggregate["fingerprints"].most_common(top)
+            ],
+        })
+    return {"pid": os.getpid(), "endpoints": endpoints}
+
+
+def reset_sql_stats():
+    with _aggregates_lock:
+        _aggregates.clear()
+
+
+def init_app(app):
+    """Register the after_request hook on `app`."""
+    if SQL_INSTRUMENTATION_ENABLED:
+        app.after_request(finish_request)
@@ -1,11 +1,19 @@
 import os
 import logging
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
 import psycopg2
 import psycopg2.extras
 from redis import Redis
 from rq import Queue, Retry, get_current_job
 
-from .app import get_db_connection
+from .app import get_db_connection, release_db_connection, get_db_connection_params
+from .mesocycles import advance_all_mesocycles
+from .partitions import maintain_partitions as maintain_all_partitions
+from .plateau_scanner import scan_all_plateaus
+from .user_model_updates import (
+    init_worker_connection, process_user_batch, select_users_to_process, shard_hash_bounds,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +26,12 @@ queue = Queue("training", connection=redis_conn)
 
 DEFAULT_RETRY = Retry(max=3, interval=[10, 30, 60])
 
+# Nightly pipeline sizing
+NIGHTLY_SHARD_COUNT = int(os.getenv("NIGHTLY_SHARD_COUNT", "8"))
+NIGHTLY_POOL_SIZE = int(os.getenv("NIGHTLY_POOL_SIZE", str(os.cpu_count() or 2)))
+NIGHTLY_USER_BATCH_SIZE = int(os.getenv("NIGHTLY_USER_BATCH_SIZE", "100"))
+NIGHTLY_SHARD_JOB_TIMEOUT = int(os.getenv("NIGHTLY_SHARD_JOB_TIMEOUT", "7200"))
+
 
 def enqueue_nightly_user_model_update(task_name="nightly_user_model_update", force_run=False):
     """Enqueue nightly update with retry strategy."""
@@ -28,33 +42,192 @@ def enqueue_nightly_user_model_update(task_name="nightly_user_model_update", for
         retry=DEFAULT_RETRY,
     )
 
-def nightly_user_model_update(task_name="nightly_user_model_update", force_run=False):
-    """Process nightly per-user training tasks."""
+def nightly_user_model_update(task_name="nightly_user_model_update", force_run=False, shard_count=None):
+    """Fan the nightly run out into one job per user-id hash shard, plus one
+    set-based mesocycle advancement job, one plateau scan for all users and
+    one partition maintenance job."""
     job = get_current_job()
     if job and job.meta.get("retry_count", 0) > 0:
         logger.info(
             "Retry attempt %s for job %s", job.meta["retry_count"], job.id
         )
 
+    shard_count = shard_count or NIGHTLY_SHARD_COUNT
+    run_started_at = datetime.now(timezone.utc)
+    shard_job_ids = []
+    for shard_index in range(shard_count):
+        shard_job = queue.enqueue(
+            process_user_shard,
+            task_name=task_name,
+            shard_index=shard_index,
+            shard_count=shard_count,
+            force_run=force_run,
+            run_started_at=run_started_at,
+            retry=DEFAULT_RETRY,
+            job_timeout=NIGHTLY_SHARD_JOB_TIMEOUT,
+        )
+        shard_job_ids.append(shard_job.id)
+
+    mesocycle_job = queue.enqueue(
+        advance_mesocycles,
+        run_date=run_started_at.date(),
+        retry=DEFAULT_RETRY,
+    )
+    plateau_scan_job = queue.enqueue(
+        scan_plateaus,
+        run_started_at=run_started_at,
+        retry=DEFAULT_RETRY,
+        job_timeout=NIGHTLY_SHARD_JOB_TIMEOUT,
+    )
+    partition_job = queue.enqueue(
+        maintain_partitions,
+        run_date=run_started_at.date(),
+        retry=DEFAULT_RETRY,
+    )
+
+    logger.info("--- Enqueued %s nightly shard jobs for %s ---", shard_count, task_name)
+    if job:
+        job.meta["shard_job_ids"] = shard_job_ids
+        job.meta["mesocycle_job_id"] = mesocycle_job.id
+        job.meta["plateau_scan_job_id"] = plateau_scan_job.id
+        job.meta["partition_job_id"] = partition_job.id
+        job.save_meta()
+    return shard_job_ids
+
+
+def advance_mesocycles(run_date=None):
+    """Advance every user's mesocycle to `run_date`, committing per batch."""
+    run_date = run_date or datetime.now(timezone.utc).date()
     conn = None
     try:
         conn = get_db_connection()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT id, email FROM users;")
-            users = cur.fetchall()
-        logger.info("--- Starting Nightly Training Tasks ---")
-        for user in users:
-            user_id = str(user["id"])
-            user_email = user["email"]
-            logger.info(
-                "Simulating training tasks for user_id: %s (Email: %s)...",
-                user_id,
-                user_email,
-            )
-        logger.info("--- Finished Nightly Training Tasks ---")
+        counts = advance_all_mesocycles(conn, run_date)
+        logger.info(
+            "Advanced mesocycles for %s: %s updated, %s created.",
+            run_date, counts["updated"], counts["inserted"],
+        )
+        return counts
     except psycopg2.Error as e:
-        logger.error("Database error during nightly update: %s", e)
+        logger.error("Database error advancing mesocycles: %s", e)
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_db_connection(conn)
+
+
+def scan_plateaus(run_started_at=None):
+    """Record plateau events for every active user/exercise pair."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        return scan_all_plateaus(conn, run_started_at)
+    except psycopg2.Error as e:
+        logger.error("Database error during plateau scan: %s", e)
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_db_connection(conn)
+
+
+def maintain_partitions(run_date=None):
+    """Create upcoming monthly partitions and detach expired ones."""
+    run_date = run_date or datetime.now(timezone.utc).date()
+    conn = None
+    try:
+        conn = get_db_connection()
+        result = maintain_all_partitions(conn, run_date)
+        conn.commit()
+        return result
+    except psycopg2.Error as e:
+        logger.error("Database error maintaining partitions: %s", e)
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_db_connection(conn)
+
+
+def process_user_shard(task_name, shard_index, shard_count, force_run=False, run_started_at=None):
+    """Stream one shard's users and run their model updates on a process pool.
+
+    Only users with workout_sets stored after their `last_processed_at`
+    watermark are selected unless `force_run` is set. Users are read through a
+    server-side cursor so the shard never holds the whole user list in memory,
+    and at most two batches per pool process are in flight at a time. Progress
+    is published on the job's meta.
+    """
+    job = get_current_job()
+    run_started_at = run_started_at or datetime.now(timezone.utc)
+    hash_low, hash_high = shard_hash_bounds(shard_index, shard_count)
+    progress = {
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "users_processed": 0,
+        "users_failed": 0,
+        "batches_done": 0,
+        "finished": False,
+    }
+
+    def publish_progress():
+        if job:
+            job.meta["progress"] = progress
+            job.save_meta()
+
+    def collect(done_futures):
+        for future in done_futures:
+            result = future.result()
+            progress["users_processed"] += result["processed"]
+            progress["users_failed"] += len(result["failed"])
+            progress["batches_done"] += 1
+        publish_progress()
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        logger.info("--- Starting nightly shard %s/%s (%s) ---", shard_index + 1, shard_count, task_name)
+        with ProcessPoolExecutor(
+            max_workers=NIGHTLY_POOL_SIZE,
+            initializer=init_worker_connection,
+            initargs=(get_db_connection_params(),),
+        ) as executor:
+            pending = set()
+            # Named cursor => server-side; rows arrive itersize at a time.
+            with conn.cursor(name=f"nightly_shard_{shard_index}") as cur:
+                cur.itersize = NIGHTLY_USER_BATCH_SIZE
+                select_users_to_process(cur, hash_low, hash_high, force_run, run_started_at)
+                batch = []
+                for (user_id,) in cur:
+                    batch.append(str(user_id))
+                    if len(batch) < NIGHTLY_USER_BATCH_SIZE:
+                        continue
+                    pending.add(executor.submit(process_user_batch, batch, run_started_at))
+                    batch = []
+                    if len(pending) >= NIGHTLY_POOL_SIZE * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                if batch:
+                    pending.add(executor.submit(process_user_batch, batch, run_started_at))
+            conn.commit()  # Closes the server-side cursor's transaction
+            done, _ = wait(pending)
+            collect(done)
+
+        progress["finished"] = True
+        publish_progress()
+        logger.info(
+            "--- Finished nightly shard %s/%s: %s users processed, %s failed ---",
+            shard_index + 1, shard_count, progress["users_processed"], progress["users_failed"],
+        )
+        return progress
+    except psycopg2.Error as e:
+        logger.error("Database error during nightly shard %s: %s", shard_index, e)
+        if conn:
+            conn.rollback()
         raise
     finally:
         if conn:
-            conn.close()
+            release_db_connection(conn)
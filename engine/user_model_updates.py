@@ -0,0 +1,215 @@
+"""Per-user model updates run by the nightly training pipeline.
+
+`tasks.process_user_shard` streams a shard's user ids and hands them to a
+process pool in batches; each pool process keeps its own database connection
+(opened by `init_worker_connection`) and runs every step in `NIGHTLY_STEPS`
+for each user, committing per user so one bad account doesn't roll back the
+rest of the batch. `NIGHTLY_BATCH_STEPS` then run once over the users that
+succeeded, for work that is cheaper in bulk. Only when those have committed too
+does their `last_processed_at` watermark advance. The per-user results are
+already committed by then, so a failed batch step means the per-user steps run
+again next night for the same users. Every step must therefore be idempotent:
+each one rebuilds its result from a fixed window of sets (see
+`recalibrate_rir_bias`) rather than adjusting the stored value, so running it
+twice on unchanged data gives the same result as running it once. Cached user
+profiles (see user_profiles.py) of those users are invalidated at the end of
+the batch.
+"""
+import logging
+from datetime import datetime, timezone
+
+import psycopg2
+import psycopg2.extras
+
+from .constants import DEFAULT_USER_RIR_BIAS
+from .learning_models import update_user_rir_bias, predict_reps_for_bias_update
+from .recovery_calibration import calibrate_recovery_multipliers
+from .user_profiles import bump_profile_versions
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent sets replayed when recalibrating a user's RIR bias.
+RIR_BIAS_REPLAY_SETS = 50
+
+# hashtext() returns a signed 32-bit integer; shards split this range evenly.
+_HASH_MIN = -(2 ** 31)
+_HASH_SPAN = 2 ** 32
+
+# Connection owned by the current pool process (see init_worker_connection).
+_worker_conn = None
+
+
+def shard_hash_bounds(shard_index, shard_count):
+    """Return the half-open [low, high) hashtext(user id) range of a shard."""
+    low = _HASH_MIN + (_HASH_SPAN * shard_index) // shard_count
+    high = _HASH_MIN + (_HASH_SPAN * (shard_index + 1)) // shard_count
+    return low, high
+
+
+def init_worker_connection(conn_params):
+    """Process pool initializer: open this process's database connection."""
+    global _worker_conn
+    _worker_conn = psycopg2.connect(**conn_params)
+
+
+def recalibrate_rir_bias(cur, user_id, run_started_at):
+    """Rebuild the user's RIR bias from their most recent sets.
+
+    log-set already applied each of these sets to the stored bias online, so
+    the replay does not stack on the stored state. It starts from
+    DEFAULT_USER_RIR_BIAS with an empty error EMA, feeds the last
+    RIR_BIAS_REPLAY_SETS sets, oldest first, through `update_user_rir_bias`
+    against the e1RM that was current before each, and overwrites the stored
+    values. The result depends only on those sets, so re-running the step on
+    unchanged data leaves the bias where it is.
+    """
+    cur.execute(
+        "SELECT rir_bias_lr FROM users WHERE id = %s FOR UPDATE;",
+        (user_id,)
+    )
+    user_row = cur.fetchone()
+    if not user_row:
+        return
+
+    cur.execute(
+        """
+        SELECT recent.actual_weight, recent.actual_reps, recent.actual_rir,
+               prior.estimated_1rm AS prior_e1rm
+        FROM (
+            SELECT ws.exercise_id, ws.actual_weight, ws.actual_reps, ws.actual_rir, ws.completed_at
+            FROM workout_sets ws
+            WHERE ws.user_id = %s AND ws.actual_rir IS NOT NULL
+            ORDER BY ws.completed_at DESC
+            LIMIT %s
+        ) recent
+        LEFT JOIN LATERAL (
+            SELECT h.estimated_1rm FROM estimated_1rm_history h
+            WHERE h.user_id = %s AND h.exercise_id = recent.exercise_id
+              AND h.calculated_at < recent.completed_at
+            ORDER BY h.calculated_at DESC LIMIT 1
+        ) prior ON TRUE
+        ORDER BY recent.completed_at ASC;
+        """,
+        (user_id, RIR_BIAS_REPLAY_SETS, user_id)
+    )
+    replay_sets = cur.fetchall()
+    if not replay_sets:
+        return
+
+    base_lr = float(user_row['rir_bias_lr'])
+    bias, error_ema = DEFAULT_USER_RIR_BIAS, 0.0
+    for row in replay_sets:
+        prior_e1rm = float(row['prior_e1rm']) if row['prior_e1rm'] is not None else 0.0
+        predicted_reps = predict_reps_for_bias_update(
+            float(row['actual_weight']), prior_e1rm, int(row['actual_rir']), bias
+        )
+        bias, error_ema = update_user_rir_bias(
+            bias, predicted_reps, int(row['actual_reps']), base_lr, error_ema
+        )
+
+    cur.execute(
+        "UPDATE users SET rir_bias = %s, rir_bias_error_ema = %s, updated_at = NOW() WHERE id = %s;",
+        (bias, error_ema, user_id)
+    )
+
+
+# Steps run for each user, in order. Each takes (cursor, user_id, run_started_at)
+# and must be idempotent (see the module docstring).
+NIGHTLY_STEPS = (
+    ("rir_bias", recalibrate_rir_bias),
+)
+
+# Steps run once per batch over the users whose per-user steps succeeded.
+# Each takes (connection, user_ids, run_started_at) and commits with the batch.
+NIGHTLY_BATCH_STEPS = (
+    ("recovery_multipliers", calibrate_recovery_multipliers),
+)
+
+
+def select_users_to_process(cur, hash_low, hash_high, force_run, run_started_at):
+    """Execute the query for a shard's user ids on `cur`.
+
+    Selects users with sets logged since their watermark, unless forced. Sets
+    are matched on `created_at`, the time the server stored them, not on the
+    client-supplied `completed_at`, so sets logged offline and synced later
+    with a backdated time are still picked up.
+    """
+    cur.execute(
+        """
+        SELECT u.id FROM users u
+        WHERE hashtext(u.id::text) >= %s AND hashtext(u.id::text) < %s
+          AND (%s OR EXISTS (
+              SELECT 1 FROM workout_sets ws
+              WHERE ws.user_id = u.id
+                AND ws.created_at > COALESCE(u.last_processed_at, '-infinity')
+                AND ws.created_at <= %s
+          ));
+        """,
+        (hash_low, hash_high, bool(force_run), run_started_at)
+    )
+
+
+def advance_watermark(cur, user_ids, run_started_at):
+    """Mark the users as processed up to the start of this run.
+
+    Uses the run's start time rather than now() so sets logged while the run
+    is in progress are picked up the next night; GREATEST keeps a retried
+    older run from moving the watermark backwards.
+    """
+    cur.execute(
+        "UPDATE users SET last_processed_at = GREATEST(last_processed_at, %s) WHERE id = ANY(%s::uuid[]);",
+        (run_started_at, list(user_ids))
+    )
+
+
+def process_user_batch(user_ids, run_started_at=None):
+    """Run every nightly step for each user in `user_ids`.
+
+    Executes inside a pool process. Returns a summary dict with the number of
+    users processed and the ids of users whose update failed. If a batch step
+    fails, no watermark is advanced and the whole batch counts as failed.
+    """
+    run_started_at = run_started_at or datetime.now(timezone.utc)
+    processed = 0
+    failed = []
+    for user_id in user_ids:
+        step_name = None
+        try:
+            with _worker_conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                for step_name, step in NIGHTLY_STEPS:
+                    step(cur, user_id, run_started_at)
+            _worker_conn.commit()
+            processed += 1
+        except psycopg2.Error as e:
+            _worker_conn.rollback()
+            logger.error("Database error in nightly step '%s' for user %s: %s", step_name, user_id, e)
+            failed.append(user_id)
+        except Exception as e:
+            _worker_conn.rollback()
+            logger.error("Unexpected error in nightly step '%s' for user %s: %s", step_name, user_id, e, exc_info=True)
+            failed.append(user_id)
+
+    succeeded = [user_id for user_id in user_ids if user_id not in failed]
+    if not succeeded:
+        return {"processed": processed, "failed": failed}
+
+    step_name = None
+    try:
+        for step_name, step in NIGHTLY_BATCH_STEPS:
+            step(_worker_conn, succeeded, run_started_at)
+            _worker_conn.commit()
+        step_name = "watermark"
+        with _worker_conn.cursor() as cur:
+            advance_watermark(cur, succeeded, run_started_at)
+        _worker_conn.commit()
+    except psycopg2.Error as e:
+        _worker_conn.rollback()
+        logger.error("Database error in nightly batch step '%s': %s", step_name, e)
+        processed, failed = 0, list(user_ids)
+    except Exception as e:
+        _worker_conn.rollback()
+        logger.error("Unexpected error in nightly batch step '%s': %s", step_name, e, exc_info=True)
+        processed, failed = 0, list(user_ids)
+    # rir_bias and recovery_multipliers changed; drop the API's cached profiles.
+    bump_profile_versions(succeeded)
+    return {"processed": processed, "failed": failed}
@@ -0,0 +1,162 @@
+"""Per-user profile cache for the hot recommendation and analytics paths.
+
+A profile is the subset of the `users` row those paths read (PROFILE_FIELDS).
+Each user has a version counter in Redis (`user_profile:<id>:version`) that
+writers bump with `bump_profile_version()` after committing a change, and the
+profile itself is stored under a key that embeds that version, so a bump
+invalidates every copy at once without deleting anything.
+
+Reads go through two tiers:
+
+* a per-process dict, trusted for USER_PROFILE_LOCAL_TTL_SECONDS after the
+  version was last checked;
+* Redis, which costs one GET to confirm the version and one more to fetch the
+  profile when the version moved.
+
+Only a miss in both reads the row, using the caller's cursor. The worker that
+made the change drops its local copy immediately. Other workers see it within
+USER_PROFILE_LOCAL_TTL_SECONDS. Without Redis, the local tier alone bounds
+staleness the same way.
+
+Returned profiles are shared between requests and must not be mutated.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+USER_PROFILE_LOCAL_TTL_SECONDS = float(os.getenv("USER_PROFILE_LOCAL_TTL_SECONDS", "1"))
+USER_PROFILE_LOCAL_MAX_ENTRIES = int(os.getenv("USER_PROFILE_LOCAL_MAX_ENTRIES", "10000"))
+USER_PROFILE_REDIS_TTL_SECONDS = int(os.getenv("USER_PROFILE_REDIS_TTL_SECONDS", "3600"))
+
+# `users` columns kept in a profile. Columns missing from the row are left out.
+PROFILE_FIELDS = (
+    "goal_slider", "rir_bias", "recovery_multipliers", "experience_level",
+    "equipment_settings", "sex", "equipment_type", "available_plates", "unit_system",
+)
+
+
+class _Entry:
+    __slots__ = ("version", "profile", "checked_at")
+
+    def __init__(self, version, profile, checked_at):
+        self.version = version
+        self.profile = profile
+        self.checked_at = checked_at
+
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _version_key(user_id):
+    return f"user_profile:{user_id}:version"
+
+
+def _profile_key(user_id, version):
+    return f"user_profile:{user_id}:v{version}"
+
+
+def _profile_from_row(row):
+    return {
+        field: float(row[field]) if isinstance(row[field], Decimal) else row[field]
+        for field in PROFILE_FIELDS
+        if field in row
+    }
+
+
+def _remember(user_id, version, profile, now):
+    with _local_lock:
+        _local[user_id] = _Entry(version, profile, now)
+        _local.move_to_end(user_id)
+        while len(_local) > USER_PROFILE_LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def _fetch_row(cur, user_id):
+    cur.execute("SELECT * FROM users WHERE id = %s;", (user_id,))
+    row = cur.fetchone()
+    return _profile_from_row(row) if row else None
+
+
+def load_user_profile(cur, user_id):
+    """The cached profile dict for `user_id`, or None if the user doesn't exist.
+
+    `cur` must be a RealDictCursor. It is only used when neither tier has a
+    current copy.
+    """
+    user_id = str(user_id)
+    now = time.monotonic()
+    entry = _local.get(user_id)
+    if entry is not None and now - entry.checked_at < USER_PROFILE_LOCAL_TTL_SECONDS:
+        return entry.profile
+
+    redis = None
+    version = None
+    try:
+        redis = get_redis()
+        version = (redis.get(_version_key(user_id)) or b"0").decode()
+    except Exception as e:
+        logger.debug(f"User profile version check failed for {user_id}: {e}")
+        redis = None
+
+    if entry is not None and version is not None and version == entry.version:
+        entry.checked_at = now
+        return entry.profile
+
+    profile = None
+    if redis is not None:
+        try:
+            cached = redis.get(_profile_key(user_id, version))
+            profile = json.loads(cached) if cached else None
+        except Exception as e:
+            logger.debug(f"User profile read from Redis failed for {user_id}: {e}")
+
+    if profile is None:
+        profile = _fetch_row(cur, user_id)
+        if profile is None:
+            with _local_lock:
+                _local.pop(user_id, None)
+            return None
+        if redis is not None:
+            try:
+                redis.setex(_profile_key(user_id, version), USER_PROFILE_REDIS_TTL_SECONDS, json.dumps(profile))
+            except Exception as e:
+                logger.debug(f"User profile write to Redis failed for {user_id}: {e}")
+
+    _remember(user_id, version, profile, now)
+    return profile
+
+
+def bump_profile_versions(user_ids):
+    """Invalidate cached profiles after their `users` rows were committed."""
+    user_ids = [str(user_id) for user_id in user_ids]
+    if not user_ids:
+        return
+    with _local_lock:
+        for user_id in user_ids:
+            _local.pop(user_id, None)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.incr(_version_key(user_id))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not bump user profile versions for {len(user_ids)} users: {e}")
+
+
+def bump_profile_version(user_id):
+    bump_profile_versions([user_id])
+
+
+def clear_local_profiles():
+    """Drop this process's copies; the Redis tier is left alone."""
+    with _local_lock:
+        _local.clear()
@@ -1,9 +1,16 @@
 import pytest
 
 from engine.app import app
+import user_profiles  # Imported by the blueprints under this name
 
 @pytest.fixture()
 def client():
     app.config.update(TESTING=True)
     with app.test_client() as client:
         yield client
+
+@pytest.fixture(autouse=True)
+def clear_user_profile_cache():
+    """Tests reuse user ids with different mocked rows; start each one cold."""
+    user_profiles.clear_local_profiles()
+    yield
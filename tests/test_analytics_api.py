@@ -7,7 +7,7 @@ import psycopg2 # For explicitly raising psycopg2.Error in tests
 
 # Import the Flask app from engine.app
 from engine.app import app
-# Assuming PlateauStatus is accessible for mocking detect_plateau results
+# Assuming PlateauStatus is accessible for mocking detect_plateau_segmented results
 from engine.progression import PlateauStatus
 
 # --- Test Fixtures ---
@@ -46,7 +46,7 @@ MOCK_MUSCLE_GROUP = "chest"
 # --- Test Cases for Plateau Analysis Endpoint ---
 
 @patch('engine.blueprints.analytics.generate_deload_protocol')
-@patch('engine.blueprints.analytics.detect_plateau')
+@patch('engine.blueprints.analytics.detect_plateau_segmented')
 @patch('engine.blueprints.analytics.calculate_current_fatigue')
 @patch('engine.blueprints.analytics.get_db_connection')
 def test_get_plateau_analysis_success_no_plateau(
@@ -64,7 +64,7 @@ def test_get_plateau_analysis_success_no_plateau(
         {'recovery_multipliers': {MOCK_MUSCLE_GROUP: 1.0}} # User recovery multipliers
     ]
     mock_cursor.fetchall.side_effect = [
-        [{'estimated_1rm': 100.0 + i} for i in range(10)], # e1RM history (10 data points)
+        [(100.0 + i, None) for i in range(10)], # e1RM history (10 data points)
         [] # Session history for fatigue (empty for simplicity here)
     ]
 
@@ -91,7 +91,7 @@ def test_get_plateau_analysis_success_no_plateau(
 
 
 @patch('engine.blueprints.analytics.generate_deload_protocol')
-@patch('engine.blueprints.analytics.detect_plateau')
+@patch('engine.blueprints.analytics.detect_plateau_segmented')
 @patch('engine.blueprints.analytics.calculate_current_fatigue')
 @patch('engine.blueprints.analytics.get_db_connection')
 def test_get_plateau_analysis_success_stagnation_with_deload(
@@ -107,7 +107,7 @@ def test_get_plateau_analysis_success_stagnation_with_deload(
         {'recovery_multipliers': {}}
     ]
     mock_cursor.fetchall.side_effect = [
-        [{'estimated_1rm': 100.0} for _ in range(10)], # Stagnant e1RM history
+        [(100.0, None) for _ in range(10)], # Stagnant e1RM history
         []
     ]
 
@@ -136,7 +136,7 @@ def test_get_plateau_analysis_success_stagnation_with_deload(
     )
 
 @patch('engine.blueprints.analytics.generate_deload_protocol')
-@patch('engine.blueprints.analytics.detect_plateau')
+@patch('engine.blueprints.analytics.detect_plateau_segmented')
 @patch('engine.blueprints.analytics.calculate_current_fatigue')
 @patch('engine.blueprints.analytics.get_db_connection')
 def test_get_plateau_analysis_success_regression_with_deload(
@@ -152,7 +152,7 @@ def test_get_plateau_analysis_success_regression_with_deload(
         {'recovery_multipliers': {}}
     ]
     mock_cursor.fetchall.side_effect = [
-        [{'estimated_1rm': 100.0 - i} for i in range(10)], # Regressing e1RM history
+        [(100.0 - i, None) for i in range(10)], # Regressing e1RM history
         []
     ]
 
@@ -186,7 +186,7 @@ def test_get_plateau_analysis_insufficient_data(mock_get_db_conn, client):
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
     mock_cursor.fetchone.return_value = {'name': MOCK_EXERCISE_NAME, 'main_target_muscle_group': MOCK_MUSCLE_GROUP}
-    mock_cursor.fetchall.return_value = [{'estimated_1rm': 100.0} for _ in range(3)] # Only 3 data points
+    mock_cursor.fetchall.return_value = [(100.0, None) for _ in range(3)] # Only 3 data points
 
     token = generate_jwt_token(MOCK_USER_ID)
     response = client.get(
@@ -299,7 +299,7 @@ def test_get_plateau_analysis_db_error_fatigue_calc_related_fetch(mock_get_db_co
         {'name': MOCK_EXERCISE_NAME, 'main_target_muscle_group': MOCK_MUSCLE_GROUP}, # Exercise details
         # No more fetchone needed until after the failing execute
     ]
-    mock_cursor.fetchall.return_value = [{'estimated_1rm': 100.0 + i} for i in range(10)] # e1RM history
+    mock_cursor.fetchall.return_value = [(100.0 + i, None) for i in range(10)] # e1RM history
 
     # Third execute call (user recovery multipliers) raises error
     def conditional_execute_effect(query, params):
@@ -338,17 +338,10 @@ def test_1rm_evolution_success(mock_get_db_conn, client):
     mock_get_db_conn.return_value = mock_conn
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
+    # Tuple rows: (exercise_id, estimated_1rm, calculated_at)
     mock_cursor.fetchall.return_value = [
-        {
-            'exercise_id': uuid.UUID(MOCK_EXERCISE_ID),
-            'estimated_1rm': 100.0,
-            'calculated_at': datetime.datetime(2024, 1, 1)
-        },
-        {
-            'exercise_id': uuid.UUID(MOCK_EXERCISE_ID),
-            'estimated_1rm': 105.0,
-            'calculated_at': datetime.datetime(2024, 1, 8)
-        }
+        (uuid.UUID(MOCK_EXERCISE_ID), 100.0, datetime.datetime(2024, 1, 1)),
+        (uuid.UUID(MOCK_EXERCISE_ID), 105.0, datetime.datetime(2024, 1, 8)),
     ]
 
     token = generate_jwt_token(MOCK_USER_ID)
@@ -360,6 +353,7 @@ def test_1rm_evolution_success(mock_get_db_conn, client):
     data = response.get_json()
     assert MOCK_EXERCISE_ID in data
     assert len(data[MOCK_EXERCISE_ID]) == 2
+    assert data[MOCK_EXERCISE_ID][0]['date'] == '2024-01-01T00:00:00'
 
 
 def test_1rm_evolution_unauthorized(client):
@@ -374,12 +368,9 @@ def test_volume_heatmap_success(mock_get_db_conn, client):
     mock_get_db_conn.return_value = mock_conn
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
+    # Tuple rows: (week, muscle_group, volume)
     mock_cursor.fetchall.return_value = [
-        {
-            'week': datetime.datetime(2024, 1, 1),
-            'muscle_group': 'chest',
-            'volume': 500.0
-        }
+        (datetime.datetime(2024, 1, 1), 'chest', 500.0)
     ]
 
     token = generate_jwt_token(MOCK_USER_ID)
@@ -390,6 +381,7 @@ def test_volume_heatmap_success(mock_get_db_conn, client):
     assert resp.status_code == 200
     data = resp.get_json()
     assert data[0]['muscle_group'] == 'chest'
+    assert data[0]['week'] == '2024-01-01'
 
 
 @patch('engine.blueprints.analytics.get_db_connection')
@@ -405,6 +397,9 @@ def test_key_metrics_success(mock_get_db_conn, client):
         {'avg': 7.5},  # Mock for avg_session_rpe
         {'exercise_name': 'Test Squat', 'frequency': 15}  # Mock for most_frequent_exercise
     ]
+    mock_cursor.fetchall.return_value = [  # e1rm_stats confidence rows
+        {'exercise_id': MOCK_EXERCISE_ID, 'conf_n': 4, 'conf_mean': 100.0, 'conf_m2': 0.0},
+    ]
 
     token = generate_jwt_token(MOCK_USER_ID)
     resp = client.get(
@@ -419,6 +414,7 @@ def test_key_metrics_success(mock_get_db_conn, client):
     assert data['most_frequent_exercise'] is not None
     assert data['most_frequent_exercise']['name'] == 'Test Squat'
     assert data['most_frequent_exercise']['frequency'] == 15
+    assert data['e1rm_confidence'] == {str(MOCK_EXERCISE_ID): 1.0}
 
 @patch('engine.blueprints.analytics.get_db_connection')
 def test_key_metrics_no_frequent_exercise(mock_get_db_conn, client):
@@ -457,7 +453,7 @@ def test_volume_summary_success(mock_get_db_conn, client):
     mock_get_db_conn.return_value = mock_conn
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_cursor.fetchall.return_value = [
-        {'muscle_group': 'chest', 'total_volume': 500.0}
+        ('chest', 500.0)  # muscle_group, volume
     ]
     token = generate_jwt_token(MOCK_USER_ID)
     resp = client.get(
@@ -477,7 +473,7 @@ def test_mti_history_success(mock_get_db_conn, client):
     mock_get_db_conn.return_value = mock_conn
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_cursor.fetchall.return_value = [
-        {'completed_at': datetime.datetime(2024, 1, 1), 'mti': 120}
+        (datetime.datetime(2024, 1, 1), 120)  # (completed_at, mti)
     ]
     token = generate_jwt_token(MOCK_USER_ID)
     resp = client.get(
@@ -47,8 +47,9 @@ MOCK_PLAN_EXERCISE_ID = str(uuid.uuid4())
 
 # --- Test Cases for Workout Plan Endpoints ---
 
+@patch('engine.blueprints.plans.get_exercise', return_value={'main_target_muscle_group': 'chest'})
 @patch('engine.app.get_db_connection')
-def test_create_workout_plan_success(mock_get_db_conn, client):
+def test_create_workout_plan_success(mock_get_db_conn, mock_get_exercise, client):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_get_db_conn.return_value = mock_conn
@@ -65,10 +66,7 @@ def test_create_workout_plan_success(mock_get_db_conn, client):
         'created_at': '2023-01-01T10:00:00Z',
         'updated_at': '2023-01-01T10:00:00Z'
     }
-    mock_cursor.fetchone.side_effect = [
-        mock_plan_data,
-        {'main_target_muscle_group': 'chest'}
-    ]
+    mock_cursor.fetchone.side_effect = [mock_plan_data]
 
     token = generate_jwt_token(MOCK_USER_ID)
     response = client.post(
@@ -245,8 +243,10 @@ def test_update_workout_plan_success(mock_get_db_conn, client):
     assert response.status_code == 200
     assert response.get_json()['name'] == 'Updated Plan Name'
 
+@patch('engine.blueprints.plans.exercise_name')
+@patch('engine.blueprints.plans.get_exercise')
 @patch('engine.app.get_db_connection')
-def test_update_workout_plan_with_structure_change_updates_metrics(mock_get_db_conn, client):
+def test_update_workout_plan_with_structure_change_updates_metrics(mock_get_db_conn, mock_get_exercise, mock_exercise_name, client):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_get_db_conn.return_value = mock_conn
@@ -257,24 +257,24 @@ def test_update_workout_plan_with_structure_change_updates_metrics(mock_get_db_c
     # Mock exercise details for metric calculation
     mock_exercise_detail_leg = {'main_target_muscle_group': 'Legs'}
     mock_exercise_detail_chest = {'main_target_muscle_group': 'Chest'}
+    catalog = {'exercise_id_1': mock_exercise_detail_leg, 'exercise_id_2': mock_exercise_detail_chest}
+    mock_get_exercise.side_effect = catalog.get
+    mock_exercise_name.side_effect = {'exercise_id_1': 'Squat', 'exercise_id_2': 'Bench Press'}.get
 
     # Mock return values for various execute calls:
     # 1. Ownership check
     # 2. Updated plan data (after workout_plans table update)
-    # 3. Exercise detail for 'Legs' exercise (during metrics calculation)
-    # 4. Exercise detail for 'Chest' exercise (during metrics calculation)
-    # 5. Final fetch of updated plan for response (SELECT * from workout_plans)
-    # 6. Fetch plan_days for response
-    # 7. Fetch plan_exercises for day 1
-    # 8. Fetch plan_exercises for day 2 (if any)
-    # 9. Fetch metrics for response
+    # 3. Final fetch of updated plan for response (SELECT * from workout_plans)
+    # 4. Fetch plan_days for response
+    # 5. Fetch plan_exercises for day 1
+    # 6. Fetch plan_exercises for day 2 (if any)
+    # 7. Fetch metrics for response
+    # Exercise muscle groups and names come from the exercise catalog.
     updated_plan_base_data = {'id': MOCK_PLAN_ID, 'user_id': MOCK_USER_ID, 'name': 'Updated Plan Structure'}
 
     mock_cursor.fetchone.side_effect = [
         mock_owner_check,          # Initial ownership check
         updated_plan_base_data,    # Result of UPDATE workout_plans ... RETURNING *
-        mock_exercise_detail_leg,  # For metrics: exercise_id_1 (Squat)
-        mock_exercise_detail_chest,# For metrics: exercise_id_2 (Bench Press)
         updated_plan_base_data,    # For rebuilding response: SELECT * from workout_plans
         {'total_volume': 7, 'muscle_group_frequency': {'Legs': 1, 'Chest': 1}} # For rebuilding response: SELECT from plan_metrics
     ]
@@ -284,8 +284,8 @@ def test_update_workout_plan_with_structure_change_updates_metrics(mock_get_db_c
             {'id': 'new_day_id_1', 'plan_id': MOCK_PLAN_ID, 'day_number': 1, 'name': 'New Day 1'},
         ],
         [ # Plan exercises for new_day_id_1 for response
-            {'exercise_id': 'exercise_id_1', 'exercise_name': 'Squat', 'sets': 4},
-            {'exercise_id': 'exercise_id_2', 'exercise_name': 'Bench Press', 'sets': 3}
+            {'exercise_id': 'exercise_id_1', 'sets': 4},
+            {'exercise_id': 'exercise_id_2', 'sets': 3}
         ]
     ]
 
@@ -608,8 +608,9 @@ def test_delete_plan_day_not_found(mock_get_db_conn, client):
 
 
 # Example for Plan Exercise creation:
+@patch('engine.blueprints.plans.get_exercise', return_value={'id': MOCK_EXERCISE_ID_DB})
 @patch('engine.app.get_db_connection')
-def test_create_plan_exercise_success(mock_get_db_conn, client):
+def test_create_plan_exercise_success(mock_get_db_conn, mock_get_exercise, client):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_get_db_conn.return_value = mock_conn
@@ -617,15 +618,14 @@ def test_create_plan_exercise_success(mock_get_db_conn, client):
 
     # Mock 1: Parent plan day ownership check
     mock_day_owner = {'plan_owner_id': uuid.UUID(MOCK_USER_ID)}
-    # Mock 2: Exercise ID existence check in 'exercises' table
-    mock_exercise_exists = {'id': MOCK_EXERCISE_ID_DB}
-    # Mock 3: Check for order_index conflict (return None for no conflict)
-    # Mock 4: Return value for the new plan exercise
+    # Exercise ID existence is checked against the exercise catalog (patched above)
+    # Mock 2: Check for order_index conflict (return None for no conflict)
+    # Mock 3: Return value for the new plan exercise
     new_plan_exercise_data = {
         'id': MOCK_PLAN_EXERCISE_ID, 'plan_day_id': MOCK_DAY_ID,
         'exercise_id': MOCK_EXERCISE_ID_DB, 'order_index': 0, 'sets': 3
     }
-    mock_cursor.fetchone.side_effect = [mock_day_owner, mock_exercise_exists, None, new_plan_exercise_data]
+    mock_cursor.fetchone.side_effect = [mock_day_owner, None, new_plan_exercise_data]
 
     token = generate_jwt_token(MOCK_USER_ID)
     response = client.post(
@@ -638,8 +638,9 @@ def test_create_plan_exercise_success(mock_get_db_conn, client):
     assert response_data['exercise_id'] == MOCK_EXERCISE_ID_DB
     assert response_data['plan_day_id'] == MOCK_DAY_ID
 
+@patch('engine.blueprints.plans.get_exercise', return_value=None)
 @patch('engine.app.get_db_connection')
-def test_create_plan_exercise_exercise_not_found(mock_get_db_conn, client):
+def test_create_plan_exercise_exercise_not_found(mock_get_db_conn, mock_get_exercise, client):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_get_db_conn.return_value = mock_conn
@@ -648,8 +649,7 @@ def test_create_plan_exercise_exercise_not_found(mock_get_db_conn, client):
     non_existent_exercise_id = str(uuid.uuid4())
 
     mock_day_owner = {'plan_owner_id': uuid.UUID(MOCK_USER_ID)}
-    mock_exercise_exists_check_returns_none = None # Exercise not found
-    mock_cursor.fetchone.side_effect = [mock_day_owner, mock_exercise_exists_check_returns_none]
+    mock_cursor.fetchone.side_effect = [mock_day_owner]  # Exercise not found in the catalog
 
     token = generate_jwt_token(MOCK_USER_ID)
     response = client.post(
@@ -660,18 +660,21 @@ def test_create_plan_exercise_exercise_not_found(mock_get_db_conn, client):
     assert response.status_code == 404 # Or 400 depending on how you want to classify this error
     assert f"exercise with id {non_existent_exercise_id} not found" in response.get_json()['error'].lower()
 
+@patch('engine.blueprints.plans.exercise_name')
 @patch('engine.app.get_db_connection')
-def test_get_plan_exercises_for_day_success(mock_get_db_conn, client):
+def test_get_plan_exercises_for_day_success(mock_get_db_conn, mock_exercise_name, client):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_get_db_conn.return_value = mock_conn
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
     mock_day_owner = {'plan_owner_id': uuid.UUID(MOCK_USER_ID)}
+    squat_id = str(uuid.uuid4())
     mock_exercises_list = [
-        {'id': MOCK_PLAN_EXERCISE_ID, 'exercise_name': 'Bench Press', 'order_index': 0},
-        {'id': str(uuid.uuid4()), 'exercise_name': 'Squat', 'order_index': 1}
+        {'id': MOCK_PLAN_EXERCISE_ID, 'exercise_id': MOCK_EXERCISE_ID_DB, 'order_index': 0},
+        {'id': str(uuid.uuid4()), 'exercise_id': squat_id, 'order_index': 1}
     ]
+    mock_exercise_name.side_effect = {MOCK_EXERCISE_ID_DB: 'Bench Press', squat_id: 'Squat'}.get
     mock_cursor.fetchone.return_value = mock_day_owner # For day ownership check
     mock_cursor.fetchall.return_value = mock_exercises_list # For list of exercises
 
@@ -701,8 +704,9 @@ def test_get_plan_exercises_for_day_day_not_found(mock_get_db_conn, client):
     assert response.status_code == 404
     assert 'parent plan day not found' in response.get_json()['error'].lower()
 
+@patch('engine.blueprints.plans.exercise_name', return_value='Test Exercise')
 @patch('engine.app.get_db_connection')
-def test_update_plan_exercise_success(mock_get_db_conn, client):
+def test_update_plan_exercise_success(mock_get_db_conn, mock_exercise_name, client):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_get_db_conn.return_value = mock_conn
@@ -714,18 +718,16 @@ def test_update_plan_exercise_success(mock_get_db_conn, client):
         'plan_id': MOCK_PLAN_ID,
         'plan_owner_id': uuid.UUID(MOCK_USER_ID)
     }
-    # For the updated exercise data + exercise name lookup
+    # For the updated exercise data; the name comes from the exercise catalog
     updated_exercise_data = {
         'id': MOCK_PLAN_EXERCISE_ID, 'sets': 5, 'exercise_id': MOCK_EXERCISE_ID_DB
     }
-    exercise_name_lookup = {'name': 'Test Exercise'}
 
     # Mock fetchone calls:
     # 1. exercise_info (owner check)
     # 2. order_index conflict check (None means no conflict if order_index is changed)
     # 3. updated exercise data (RETURNING *)
-    # 4. exercise name lookup
-    mock_cursor.fetchone.side_effect = [mock_exercise_info, None, updated_exercise_data, exercise_name_lookup]
+    mock_cursor.fetchone.side_effect = [mock_exercise_info, None, updated_exercise_data]
 
     token = generate_jwt_token(MOCK_USER_ID)
     response = client.put(
@@ -1015,16 +1017,16 @@ def test_create_plan_exercise_missing_required_fields(mock_get_db_conn, client):
     assert response.status_code == 400
     assert 'missing required field: sets' in response.get_json()['error'].lower()
 
+@patch('engine.blueprints.plans.get_exercise', return_value={'id': MOCK_EXERCISE_ID_DB})
 @patch('engine.app.get_db_connection')
-def test_create_plan_exercise_invalid_values(mock_get_db_conn, client):
+def test_create_plan_exercise_invalid_values(mock_get_db_conn, mock_get_exercise, client):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_get_db_conn.return_value = mock_conn
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_day_owner = {'plan_owner_id': uuid.UUID(MOCK_USER_ID)}
-    mock_exercise_exists = {'id': MOCK_EXERCISE_ID_DB}
-    # Simulate ownership, exercise existence, no order conflict for these tests
-    mock_cursor.fetchone.side_effect = [mock_day_owner, mock_exercise_exists, None, MagicMock()]
+    # Simulate ownership and no order conflict for these tests (exercise existence is patched above)
+    mock_cursor.fetchone.side_effect = [mock_day_owner, None, MagicMock()]
 
 
     token = generate_jwt_token(MOCK_USER_ID)
@@ -1035,21 +1037,21 @@ def test_create_plan_exercise_invalid_values(mock_get_db_conn, client):
     response = client.post(f'/v1/plandays/{MOCK_DAY_ID}/exercises', headers={'Authorization': f'Bearer {token}'}, json=payload)
     assert response.status_code == 400
     assert "'order_index' must be non-negative" in response.get_json()['error']
-    mock_cursor.fetchone.side_effect = [mock_day_owner, mock_exercise_exists, None, MagicMock()] # Reset side_effect
+    mock_cursor.fetchone.side_effect = [mock_day_owner, None, MagicMock()] # Reset side_effect
 
     # Invalid sets
     payload = {**base_valid_payload, 'sets': 0}
     response = client.post(f'/v1/plandays/{MOCK_DAY_ID}/exercises', headers={'Authorization': f'Bearer {token}'}, json=payload)
     assert response.status_code == 400
     assert "'sets' must be at least 1" in response.get_json()['error']
-    mock_cursor.fetchone.side_effect = [mock_day_owner, mock_exercise_exists, None, MagicMock()]
+    mock_cursor.fetchone.side_effect = [mock_day_owner, None, MagicMock()]
 
     # Invalid rep_range_low
     payload = {**base_valid_payload, 'rep_range_low': -1}
     response = client.post(f'/v1/plandays/{MOCK_DAY_ID}/exercises', headers={'Authorization': f'Bearer {token}'}, json=payload)
     assert response.status_code == 400
     assert "'rep_range_low' must be non-negative" in response.get_json()['error']
-    mock_cursor.fetchone.side_effect = [mock_day_owner, mock_exercise_exists, None, MagicMock()]
+    mock_cursor.fetchone.side_effect = [mock_day_owner, None, MagicMock()]
 
     # Invalid rest_seconds
     payload = {**base_valid_payload, 'rest_seconds': -10}
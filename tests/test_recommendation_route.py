@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch # Added for mocking
 from engine.blueprints import analytics as analytics_bp
 # Import phase constants for mocking
 from engine.mesocycles import PHASE_ACCUMULATION, PHASE_INTENSIFICATION, PHASE_DELOAD
+from engine.e1rm_history import e1rm_stats_from_values
 
 
 class FakeCursor:
@@ -35,18 +36,24 @@ class FakeCursor:
         if "FROM exercises" in self.last_query:
             return {"name": "Bench Press", "main_target_muscle_group": "chest"} if self.exercise_exists else None
 
+        # Trend state used for plateau detection, built from the mocked e1RM series
+        if "FROM e1rm_stats" in self.last_query:
+            if not self.e1rm_history_for_plateau:
+                return None
+            return e1rm_stats_from_values([r["estimated_1rm"] for r in self.e1rm_history_for_plateau])
+
         # This is for the LATEST e1RM for current performance
         if "FROM estimated_1rm_history" in self.last_query and "ORDER BY calculated_at DESC LIMIT 1" in self.last_query:
             return self.latest_e1rm_record
 
-        # This specific mock for get_or_create_current_mesocycle's internal SELECT will be overridden by monkeypatching the function itself.
-        # So, we don't strictly need to handle it here if get_or_create_current_mesocycle is mocked directly.
+        # This specific mock for get_current_mesocycle's internal SELECT will be overridden by monkeypatching the function itself.
+        # So, we don't strictly need to handle it here if get_current_mesocycle is mocked directly.
         # However, if it *were* to be called, this indicates a test setup issue or unmocked path.
         if "FROM mesocycles" in self.last_query and "ORDER BY start_date DESC" in self.last_query:
-             # This is the fetch for current mesocycle by get_or_create_current_mesocycle
-             # This should ideally be mocked directly by mocking get_or_create_current_mesocycle
+             # This is the fetch for current mesocycle by get_current_mesocycle
+             # This should ideally be mocked directly by mocking get_current_mesocycle
              # For now, return a default if not handled by a specific test's direct mock of the function
-            # print("DEBUG FakeCursor: Returning default meso for initial fetch in get_or_create")
+            # print("DEBUG FakeCursor: Returning default meso for initial fetch in get_current_mesocycle")
             return {"id": str(uuid.uuid4()), "user_id": self.params[0], "phase": "accumulation", "start_date": date(2024,1,1), "week_number":1}
 
         return None
@@ -55,8 +62,6 @@ class FakeCursor:
         # print(f"\nDEBUG FakeCursor fetchall: Last query: {self.last_query}, Params: {self.params}")
         if "FROM workout_sets" in self.last_query:
             return []
-        if "FROM estimated_1rm_history" in self.last_query and "ORDER BY calculated_at ASC" in self.last_query:
-            return self.e1rm_history_for_plateau
         return []
 
     def __enter__(self):
@@ -74,7 +79,9 @@ class FakeConn:
         self.latest_e1rm_record = latest_e1rm_record
 
     def cursor(self, cursor_factory=None):
-        return FakeCursor(self.user_exists, self.exercise_exists, self.e1rm_history_for_plateau, self.latest_e1rm_record)
+        cur = FakeCursor(self.user_exists, self.exercise_exists, self.e1rm_history_for_plateau, self.latest_e1rm_record)
+        cur.connection = self  # As on psycopg2 cursors (prepared_statements.execute_prepared)
+        return cur
 
     def commit(self): pass
     def rollback(self): pass
@@ -95,9 +102,8 @@ def call_route(client, monkeypatch, *, user=True, exercise=True, previous_set_da
                         lambda: FakeConn(user, exercise, e1rm_history_for_plateau=e1rm_history_for_plateau, latest_e1rm_record=latest_e1rm_record))
     monkeypatch.setattr(analytics_bp, "release_db_connection", lambda conn: None)
     monkeypatch.setattr(analytics_bp, "calculate_current_fatigue", fake_fatigue)
-    monkeypatch.setattr(analytics_bp, "calculate_confidence_score", lambda u,e,c: 0.75)
 
-    # Mock get_or_create_current_mesocycle
+    # Mock get_current_mesocycle
     default_meso_mock_data = {
         'id': str(uuid.uuid4()), 'user_id': str(test_user_id),
         'phase': PHASE_ACCUMULATION, 'week_number': 1, 'start_date': date.today()
@@ -107,7 +113,7 @@ def call_route(client, monkeypatch, *, user=True, exercise=True, previous_set_da
     # Ensure the user_id in the mocked meso details matches the one in the route
     effective_meso_details_to_return['user_id'] = str(test_user_id)
 
-    monkeypatch.setattr(analytics_bp, "get_or_create_current_mesocycle",
+    monkeypatch.setattr(analytics_bp, "get_current_mesocycle",
                         lambda cur, uid, today_date: effective_meso_details_to_return) # Pass uid to lambda
 
     # Mock date.today() for consistent results if meso logic depends on it via analytics.py
@@ -9,6 +9,7 @@ from engine.blueprints import workouts as workouts_bp # Blueprint to be tested
 class FakeWorkoutsCursor:
     def __init__(self, conn):
         self.conn = conn
+        self.connection = conn  # As on psycopg2 cursors (prepared_statements.execute_prepared)
         self.result_set = []
         self.current_row = -1
         self.rowcount = 0
@@ -28,9 +29,9 @@ class FakeWorkoutsCursor:
 
         # print(f"Executing query: {q_lower} with params: {params_tuple}") # Debugging
 
-        if "update workout_sets set" in q_lower and "where id = %s and workout_id in (select id from workouts where user_id = %s)" in q_lower:
+        if "update workout_sets set" in q_lower and "where id = %s and user_id = %s" in q_lower:
             # PATCH /v1/sets/<set_id>
-            # Example: UPDATE workout_sets SET actual_reps = %s, updated_at = NOW() WHERE id = %s AND workout_id IN (...)
+            # Example: UPDATE workout_sets SET actual_reps = %s, updated_at = NOW() WHERE id = %s AND user_id = %s
             set_id_to_update = params_tuple[-2] # set_id is second to last
             user_id_for_ownership = params_tuple[-1] # user_id is last
 
@@ -69,7 +70,7 @@ class FakeWorkoutsCursor:
                 self.rowcount = 0
 
 
-        elif "delete from workout_sets where id = %s and workout_id in (select id from workouts where user_id = %s)" in q_lower:
+        elif "delete from workout_sets where id = %s and user_id = %s" in q_lower:
             # DELETE /v1/sets/<set_id>
             set_id_to_delete = params_tuple[0]
             user_id_for_ownership = params_tuple[1]
@@ -156,36 +157,6 @@ class FakeWorkoutsCursor:
             else:
                 self.result_set = []
 
-        # Queries for recommend_set_parameters_for_exercise
-        elif "select goal_slider, rir_bias, available_plates" in q_lower and "from users where id = %s" in q_lower:
-            user_id_param = params_tuple[0]
-            user_details = self.conn.users.get(user_id_param) # Assuming users stored by id for this
-            if user_details:
-                # Ensure all selected fields are returned with defaults if not present in mock
-                self.result_set = [{
-                    'goal_slider': user_details.get('goal_slider', 0.5),
-                    'rir_bias': user_details.get('rir_bias', 0.0),
-                    'available_plates': user_details.get('available_plates', {'plates_kg': [20,10,5,2.5,1.25], 'barbell_weight_kg': 20.0}),
-                    'barbell_weight_kg': (user_details.get('available_plates', {}).get('barbell_weight_kg', 20.0)
-                                          if isinstance(user_details.get('available_plates'), dict)
-                                          else 20.0)
-                }]
-            else:
-                self.result_set = []
-
-        elif "select id, name, equipment_type, main_target_muscle_group from exercises where id = %s" in q_lower:
-            ex_id_param = params_tuple[0]
-            ex_details = self.conn.exercises.get(ex_id_param)
-            if ex_details:
-                self.result_set = [{
-                    'id': ex_details['id'], # Added id and name for logging in endpoint
-                    'name': ex_details['name'],
-                    'equipment_type': ex_details.get('equipment_type', 'barbell'),
-                    'main_target_muscle_group': ex_details.get('main_target_muscle_group', 'chest') # Example default
-                }]
-            else:
-                self.result_set = []
-
         elif "select estimated_1rm from estimated_1rm_history where user_id = %s and exercise_id = %s" in q_lower:
             user_id_param, ex_id_param = params_tuple[0], params_tuple[1]
             history_key = f"{user_id_param}_{ex_id_param}"
@@ -219,7 +190,7 @@ class FakeWorkoutsCursor:
             muscle_group_param = params_tuple[1]
             # This mock will be simpler: it will rely on pre-populated self.conn.fatigue_history
             # which tests can set up directly.
-            # fatigue_history structure: list of dicts like [{'session_date': dt, 'stimulus': float}]
+            # fatigue_history structure: list of (session_date, stimulus) tuples
             self.result_set = self.conn.fatigue_session_history.get(f"{user_id_param}_{muscle_group_param}", [])
 
 
@@ -275,6 +246,12 @@ def mock_db(monkeypatch):
     # Mock for the workouts blueprint
     monkeypatch.setattr(workouts_bp, 'get_db_connection', lambda: conn)
     monkeypatch.setattr(workouts_bp, 'release_db_connection', lambda _conn: None)
+    # Exercise lookups go through the in-process catalog, backed here by the fake tables
+    monkeypatch.setattr(workouts_bp, 'get_exercise', lambda exercise_id: conn.exercises.get(str(exercise_id)))
+    # User profiles go through the profile cache, backed here by the fake users table
+    monkeypatch.setattr(workouts_bp, 'load_user_profile', lambda cur, user_id: conn.users.get(str(user_id)))
+    monkeypatch.setattr(workouts_bp, 'bump_profile_version', lambda user_id: None)
+    monkeypatch.setattr(workouts_bp, 'bump_data_version', lambda user_id, *scopes: None)
 
     # If @jwt_required uses its own db connection from engine.app, mock that too if blocklist is involved
     # For PATCH/DELETE on sets, blocklist is not directly used by these endpoints, but by @jwt_required.
@@ -683,8 +660,8 @@ def test_recommend_set_parameters_significant_fatigue(
     mock_db.estimated_1rm_history[f"{user_id}_{exercise_id}"] = {'estimated_1rm': 100.0}
     # Simulate session history leading to high fatigue
     mock_db.fatigue_session_history[f"{user_id}_{exercise_muscle_group}"] = [
-        {'session_date': datetime.now(timezone.utc) - timedelta(days=1), 'stimulus': 300.0}, # High stimulus
-        {'session_date': datetime.now(timezone.utc) - timedelta(days=2), 'stimulus': 250.0}  # High stimulus
+        (datetime.now(timezone.utc) - timedelta(days=1), 300.0), # (session_date, stimulus), high stimulus
+        (datetime.now(timezone.utc) - timedelta(days=2), 250.0)  # High stimulus
     ]
     # Mock user data (already set in fixture or previous tests, ensure it's what you want)
     mock_db.users[user_id].update({'goal_slider': 0.5, 'rir_bias': 0.0})
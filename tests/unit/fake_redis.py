@@ -0,0 +1,46 @@
+"""In-memory stand-in for the Redis client returned by `cache.get_redis`.
+
+Covers the commands the caching modules use. Pipelines queue calls and run
+them in order on `execute`.
+"""
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = str(value).encode()
+        return True
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value.encode()
+
+    def incr(self, key):
+        self.values[key] = str(int(self.values.get(key) or 0) + 1).encode()
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
@@ -0,0 +1,68 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from engine.changepoint import (
+    pelt_changepoints,
+    segment_series,
+    detect_plateau_segmented,
+)
+from engine.progression import calculate_trend_slope, detect_plateau, PlateauStatus
+
+
+class TestChangepoint(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        # 20 sessions of steady progress, then 10 flat sessions.
+        self.progress_then_flat = (
+            [100.0 + 2.0 * i + rng.gauss(0, 0.5) for i in range(20)]
+            + [140.0 + rng.gauss(0, 0.5) for _ in range(10)]
+        )
+        self.steady_progress = [100.0 + 2.0 * i + rng.gauss(0, 0.5) for i in range(30)]
+
+    def test_single_segment_slope_matches_trend_slope(self):
+        values = [100, 101.5, 103, 103.2, 106]
+        segments = segment_series(values)
+        self.assertEqual(len(segments), 1)
+        self.assertAlmostEqual(segments[0]['slope'], calculate_trend_slope(values), places=9)
+
+    def test_finds_change_point_between_trends(self):
+        boundaries = pelt_changepoints(self.progress_then_flat)
+        self.assertEqual(boundaries[0], 0)
+        self.assertEqual(boundaries[-1], len(self.progress_then_flat))
+        self.assertTrue(any(abs(b - 20) <= 1 for b in boundaries[1:-1]))
+
+    def test_no_change_point_in_steady_progress(self):
+        self.assertEqual(pelt_changepoints(self.steady_progress), [0, len(self.steady_progress)])
+
+    def test_late_stagnation_detected_with_onset(self):
+        values_late_stagnation = [100, 102, 104, 106, 106.1, 106.2, 106.15]
+        self.assertFalse(detect_plateau(values_late_stagnation, threshold=0.1)['plateauing'])
+
+        result = detect_plateau_segmented(values_late_stagnation, threshold=0.1)
+        self.assertTrue(result['plateauing'])
+        self.assertEqual(result['status'], PlateauStatus.STAGNATION)
+        self.assertIn(result['onset_index'], (3, 4))
+        self.assertEqual(result['duration'], len(values_late_stagnation) - result['onset_index'])
+
+    def test_onset_date_and_duration_days(self):
+        start = datetime(2024, 1, 1)
+        timestamps = [start + timedelta(days=2 * i) for i in range(len(self.progress_then_flat))]
+        result = detect_plateau_segmented(self.progress_then_flat, timestamps=timestamps, threshold=0.1)
+        self.assertEqual(result['status'], PlateauStatus.STAGNATION)
+        self.assertEqual(result['onset_at'], timestamps[result['onset_index']])
+        self.assertEqual(result['duration_days'], (timestamps[-1] - result['onset_at']).days)
+
+    def test_progress_is_not_a_plateau(self):
+        result = detect_plateau_segmented(self.steady_progress, threshold=0.1)
+        self.assertFalse(result['plateauing'])
+        self.assertIsNone(result['onset_index'])
+
+    def test_insufficient_data(self):
+        result = detect_plateau_segmented([100, 101])
+        self.assertEqual(result['status'], PlateauStatus.INSUFFICIENT_DATA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import statistics
+import unittest
+from unittest.mock import MagicMock
+
+from engine.e1rm_history import (
+    e1rm_stats_from_values,
+    e1rm_stats_slope,
+    push_e1rm_value,
+    record_e1rm,
+    confidence_from_stats,
+    get_confidence_scores,
+    E1RM_STATS_WINDOW,
+)
+from engine.progression import calculate_trend_slope, classify_plateau, detect_plateau
+
+
+class TestE1rmTrendStats(unittest.TestCase):
+
+    def test_slope_matches_full_refit_while_filling(self):
+        values = [100.0, 101.5, 101.0, 103.0]
+        stats = e1rm_stats_from_values(values)
+        self.assertEqual(stats['n'], 4)
+        self.assertAlmostEqual(e1rm_stats_slope(stats), calculate_trend_slope(values), places=9)
+
+    def test_slope_matches_refit_of_latest_window_after_sliding(self):
+        values = [100.0 + (i % 7) * 0.8 - i * 0.1 for i in range(40)]
+        stats = e1rm_stats_from_values(values)
+        self.assertEqual(stats['n'], E1RM_STATS_WINDOW)
+        self.assertEqual(stats['next_x'], 40)
+        self.assertEqual(stats['window_values'], values[-E1RM_STATS_WINDOW:])
+        self.assertAlmostEqual(
+            e1rm_stats_slope(stats), calculate_trend_slope(values[-E1RM_STATS_WINDOW:]), places=6
+        )
+
+    def test_classification_matches_detect_plateau(self):
+        for values in ([100.0] * 10, [90.0 + i * 2.5 for i in range(10)], [100.0 - i for i in range(8)]):
+            stats = e1rm_stats_from_values(values)
+            from_stats = classify_plateau(e1rm_stats_slope(stats), stats['n'], min_duration=3)
+            refit = detect_plateau(values, min_duration=3)
+            self.assertEqual(from_stats['status'], refit['status'])
+            self.assertEqual(from_stats['plateauing'], refit['plateauing'])
+
+    def test_push_does_not_mutate_input(self):
+        stats = e1rm_stats_from_values([100.0, 101.0])
+        push_e1rm_value(stats, 102.0)
+        self.assertEqual(stats['window_values'], [100.0, 101.0])
+
+    def test_record_e1rm_inserts_history_and_updates_stats(self):
+        cursor = MagicMock(spec=['execute', 'fetchone'])
+        cursor.fetchone.return_value = e1rm_stats_from_values([100.0, 100.5])
+
+        stats = record_e1rm(cursor, 'u1', 'e1', 101.0, 'epley_rir_biased', None, 'id-1')
+
+        queries = [c.args[0] for c in cursor.execute.call_args_list]
+        self.assertIn("INSERT INTO estimated_1rm_history", queries[0])
+        self.assertIn("FOR UPDATE", queries[2])
+        self.assertIn("UPDATE e1rm_stats", queries[3])
+        self.assertEqual(stats['window_values'], [100.0, 100.5, 101.0])
+        self.assertEqual(cursor.execute.call_args_list[3].args[1][6], [100.0, 100.5, 101.0])
+
+
+class TestE1rmConfidence(unittest.TestCase):
+
+    @staticmethod
+    def _refit_confidence(values):
+        # Same formula as predictions.calculate_confidence_score over the newest 10 estimates.
+        window = values[-10:]
+        if len(window) < 3:
+            return None
+        return round(max(0.0, 1.0 - statistics.stdev(window) / statistics.mean(window)), 2)
+
+    def test_matches_refit_confidence_while_sliding(self):
+        values = [100.0 + (i % 5) * 1.7 - (i % 3) * 0.9 for i in range(30)]
+        for end in range(1, len(values) + 1):
+            stats = e1rm_stats_from_values(values[:end])
+            self.assertEqual(confidence_from_stats(stats), self._refit_confidence(values[:end]), msg=f"after {end} values")
+
+    def test_edge_cases(self):
+        self.assertIsNone(confidence_from_stats(None))
+        self.assertIsNone(confidence_from_stats(e1rm_stats_from_values([100.0, 101.0])))
+        self.assertEqual(confidence_from_stats(e1rm_stats_from_values([100.0] * 12)), 1.0)
+        self.assertEqual(confidence_from_stats(e1rm_stats_from_values([0.0] * 4)), 0.0)
+
+    def test_get_confidence_scores_keys_by_exercise(self):
+        cursor = MagicMock()
+        stats = e1rm_stats_from_values([100.0, 102.0, 98.0, 100.0])
+        cursor.fetchall.return_value = [
+            ('e1', stats['conf_n'], stats['conf_mean'], stats['conf_m2']),
+            ('e2', 1, 100.0, 0.0),
+        ]
+        scores = get_confidence_scores(cursor, 'u1', ['e1', 'e2'])
+        self.assertEqual(scores, {'e1': confidence_from_stats(stats), 'e2': None})
+        self.assertIn("ANY(%s::uuid[])", cursor.execute.call_args.args[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+
+from flask import Flask, g, jsonify
+
+from engine import etags
+
+from fake_redis import FakeRedis
+
+
+class TestConditionalGet(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.calls = 0
+
+        @self.app.before_request
+        def authenticate():
+            g.current_user_id = "u1"
+
+        @self.app.route('/v1/users/u1/analytics/key-metrics')
+        @etags.conditional_get("training", "exercises")
+        def key_metrics():
+            self.calls += 1
+            return jsonify(total_workouts=self.calls), 200
+
+        self.redis = FakeRedis()
+        patcher = patch.object(etags, "get_redis", lambda: self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, etag=None, query=""):
+        headers = {"If-None-Match": etag} if etag else {}
+        with self.app.test_request_context('/v1/users/u1/analytics/key-metrics' + query, headers=headers):
+            return self.app.full_dispatch_request()
+
+    def test_unchanged_data_returns_304_without_running_view(self):
+        first = self._get()
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["ETag"]
+        self.assertEqual(first.headers["Cache-Control"], "private, no-cache")
+
+        second = self._get(etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.headers["ETag"], etag)
+        self.assertEqual(self.calls, 1)
+
+        self.assertEqual(self._get(etag, query="?page=2").status_code, 200)
+
+    def test_bump_changes_etag(self):
+        etag = self._get().headers["ETag"]
+        etags.bump_data_version("u1", "training")
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(self.calls, 2)
+
+        etags.bump_data_version("u2", "training")  # Another user's write
+        self.assertEqual(self._get(response.headers["ETag"]).status_code, 304)
+
+    def test_counters_start_from_clock_not_zero(self):
+        etags.bump_data_version("u1", "plans")
+        self.assertGreater(int(self.redis.values["data_version:u1:plans"]), 1)
+
+    def test_redis_down_serves_without_etag(self):
+        self.redis.mget = lambda keys: (_ for _ in ()).throw(ConnectionError("redis down"))
+        response = self._get('W/"anything"')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
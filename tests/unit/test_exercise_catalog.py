@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+
+from engine import exercise_catalog
+from engine.exercise_catalog import ExerciseCatalog
+
+from fake_redis import FakeRedis
+
+
+class TestExerciseCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [
+            {"id": "b", "name": "Squat", "main_target_muscle_group": "quads", "is_public": True},
+            {"id": "a", "name": "Bench Press", "main_target_muscle_group": "chest", "is_public": True},
+            {"id": "c", "name": "Private Curl", "main_target_muscle_group": "biceps", "is_public": False},
+        ]
+        self.loads = 0
+
+        def get_connection():
+            self.loads += 1
+            conn = MagicMock()
+            cur = conn.cursor.return_value.__enter__.return_value
+            cur.fetchall.return_value = [dict(row) for row in self.rows]
+            return conn
+
+        self.redis = FakeRedis()
+        self.clock = [1000.0]
+        for target, value in (
+            ("get_redis", lambda: self.redis),
+            ("time", MagicMock(monotonic=lambda: self.clock[0])),
+        ):
+            patcher = patch.object(exercise_catalog, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.catalog = ExerciseCatalog()
+        self.catalog.configure(get_connection, lambda conn: None)
+        self.catalog.load()
+
+    def test_init_app_loads_on_first_lookup(self):
+        with patch.object(exercise_catalog, "catalog", ExerciseCatalog()):
+            exercise_catalog.init_app(MagicMock(), self.catalog._get_connection, lambda conn: None)
+            self.assertEqual(self.loads, 1)  # Only the load in setUp
+            self.assertEqual(exercise_catalog.exercise_name("b"), "Squat")
+            self.assertEqual(self.loads, 2)
+
+    def test_lookups_served_from_memory(self):
+        for _ in range(5):
+            self.assertEqual(self.catalog.get("a")["name"], "Bench Press")
+        self.assertEqual(self.loads, 1)
+
+        total, page = self.catalog.list_public(0, 1)
+        self.assertEqual(total, 2)
+        self.assertEqual([row["name"] for row in page], ["Bench Press"])
+        self.assertNotIn("Private Curl", [row["name"] for row in self.catalog.list_public(0, 10)[1]])
+        self.assertEqual(self.catalog.get("c")["name"], "Private Curl")
+
+    def test_version_bump_reloads_after_check_interval(self):
+        self.rows[0]["name"] = "Back Squat"
+        self.redis.incr(exercise_catalog.EXERCISE_CATALOG_VERSION_KEY)
+        self.assertEqual(self.catalog.get("b")["name"], "Squat")  # Not checked yet
+
+        self.clock[0] += exercise_catalog.EXERCISE_CATALOG_CHECK_SECONDS
+        self.assertEqual(self.catalog.get("b")["name"], "Back Squat")
+        self.assertEqual(self.loads, 2)
+
+        self.clock[0] += exercise_catalog.EXERCISE_CATALOG_CHECK_SECONDS
+        self.catalog.get("b")
+        self.assertEqual(self.loads, 2)  # Same version, no reload
+
+    def test_bump_catalog_version_triggers_reload(self):
+        self.rows[0]["name"] = "Back Squat"
+        exercise_catalog.bump_catalog_version()
+        self.clock[0] += exercise_catalog.EXERCISE_CATALOG_CHECK_SECONDS
+        self.assertEqual(self.catalog.get("b")["name"], "Back Squat")
+
+    def test_unknown_id_reload_is_throttled(self):
+        self.assertIsNone(self.catalog.get("missing"))
+        self.assertEqual(self.loads, 1)
+
+        self.rows.append({"id": "d", "name": "Deadlift", "is_public": True})
+        self.clock[0] += exercise_catalog.EXERCISE_CATALOG_MISS_RELOAD_SECONDS
+        self.assertEqual(self.catalog.get("d")["name"], "Deadlift")
+        self.assertEqual(self.loads, 2)
+
+    def test_failed_reload_keeps_previous_copy(self):
+        self.catalog.configure(MagicMock(side_effect=psycopg2.OperationalError("db down")), lambda conn: None)
+        self.redis.incr(exercise_catalog.EXERCISE_CATALOG_VERSION_KEY)
+        self.clock[0] += exercise_catalog.EXERCISE_CATALOG_CHECK_SECONDS
+        self.assertEqual(self.catalog.get("a")["name"], "Bench Press")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import unittest
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+import numpy as np
+from flask import Flask
+from flask import jsonify as flask_jsonify
+
+from engine import json_provider
+
+ROW_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
+PAYLOAD = {
+    "id": ROW_ID,
+    "actual_weight": Decimal("82.50"),
+    "completed_at": datetime(2024, 1, 1, 10, 30, 0, 123456, tzinfo=timezone.utc),
+    "week": date(2024, 1, 1),
+    "mti": np.float64(12.5),
+    "notes": None,
+}
+EXPECTED = {
+    "id": str(ROW_ID),
+    "actual_weight": 82.5,
+    "completed_at": "2024-01-01T10:30:00.123456+00:00",
+    "week": "2024-01-01",
+    "mti": 12.5,
+    "notes": None,
+}
+
+
+class TestJsonProvider(unittest.TestCase):
+
+    def test_dumps_converts_database_types(self):
+        self.assertEqual(json.loads(json_provider.dumps(PAYLOAD)), EXPECTED)
+
+    def test_stdlib_fallback_matches(self):
+        with patch.object(json_provider, "orjson", None):
+            self.assertEqual(json.loads(json_provider.dumps(PAYLOAD)), EXPECTED)
+
+    def test_jsonify_and_flask_encoder_agree(self):
+        app = Flask(__name__)
+        json_provider.init_app(app)
+        payload = {key: value for key, value in PAYLOAD.items() if key != "mti"}
+        with app.app_context():
+            fast = json_provider.jsonify(payload)
+            fast_list = json_provider.jsonify([1, 2])
+            default = flask_jsonify(payload)
+
+        self.assertEqual(fast.mimetype, "application/json")
+        self.assertEqual(fast.get_json(), default.get_json())
+        self.assertEqual(fast_list.get_json(), [1, 2])
+
+    def test_unknown_types_still_fail(self):
+        with self.assertRaises(TypeError):
+            json_provider.dumps({"x": object()})
+
+
+if __name__ == '__main__':
+    unittest.main()
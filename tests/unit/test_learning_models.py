@@ -1,5 +1,11 @@
 import pytest
-from engine.learning_models import update_user_rir_bias, MIN_RIR_BIAS, MAX_RIR_BIAS, RIR_BIAS_EMA_ALPHA
+from engine.learning_models import (
+    update_user_rir_bias,
+    predict_reps_for_bias_update,
+    MIN_RIR_BIAS,
+    MAX_RIR_BIAS,
+    RIR_BIAS_EMA_ALPHA,
+)
 
 # Constants used in tests, mirroring those in learning_models.py for clarity
 BASE_LR_FOR_TESTS = 0.10
@@ -232,3 +238,18 @@ def test_ema_accumulation_dynamic_lr_value_check():
         assert calculated_dynamic_lr_from_update2 == pytest.approx(expected_dynamic_lr_for_update2_calculation)
     else: # if error is 0, dynamic_lr could be anything, bias won't change.
         assert new_bias_2 == pytest.approx(old_bias_2)
+
+
+def test_predict_reps_for_bias_update():
+    """
+    Test Case: Predicted reps reference for the RIR bias update
+    - 80kg against a 100kg e1RM: (1 - 0.8) / 0.0333 = 6.006 reps to failure.
+    - rir = 2 with zero bias leaves 6.006 - 2 = 4 reps; a +1 bias only discounts 1 RIR.
+    - No prior e1RM, or a weight at/above it, predicts 0 reps.
+    """
+    assert predict_reps_for_bias_update(80.0, 100.0, 2, 0.0) == 4
+    assert predict_reps_for_bias_update(80.0, 100.0, 2, 1.0) == 5
+    assert predict_reps_for_bias_update(80.0, 100.0, 0, 1.0) == 6
+    assert predict_reps_for_bias_update(80.0, 0.0, 2, 0.0) == 0
+    assert predict_reps_for_bias_update(100.0, 100.0, 0, 0.0) == 0
+    assert predict_reps_for_bias_update(95.0, 100.0, 5, 0.0) == 0
@@ -3,7 +3,18 @@ from unittest.mock import MagicMock, call, patch
 import uuid
 from datetime import date, timedelta
 
-from engine.mesocycles import get_or_create_current_mesocycle, PHASE_ACCUMULATION, PHASE_INTENSIFICATION, PHASE_DELOAD, PHASE_DURATIONS
+from engine import mesocycles
+from engine.mesocycles import (
+    advance_all_mesocycles,
+    get_or_create_current_mesocycle,
+    get_current_mesocycle,
+    compute_mesocycle_state,
+    CYCLE_WEEKS,
+    PHASE_ACCUMULATION,
+    PHASE_INTENSIFICATION,
+    PHASE_DELOAD,
+    PHASE_DURATIONS,
+)
 
 class TestGetOrCreateCurrentMesocycle(unittest.TestCase):
 
@@ -194,5 +205,95 @@ class TestGetOrCreateCurrentMesocycle(unittest.TestCase):
         self._assert_insert_params(captured_insert_params_long, new_id_str_long, PHASE_ACCUMULATION, expected_new_cycle_start_date, expected_week_in_new_cycle)
 
 
+class TestComputeMesocycleState(unittest.TestCase):
+
+    def setUp(self):
+        self.today = date(2024, 1, 15)
+
+    def test_same_phase_advances_week(self):
+        state = compute_mesocycle_state(PHASE_ACCUMULATION, self.today - timedelta(weeks=1), self.today)
+        self.assertEqual(state['phase'], PHASE_ACCUMULATION)
+        self.assertEqual(state['week_number'], 2)
+        self.assertEqual(state['start_date'], self.today - timedelta(weeks=1))
+        self.assertEqual(state['cycles_completed'], 0)
+
+    def test_matches_week_by_week_transitions(self):
+        # Same scenarios as the get_or_create transition tests above.
+        start_acc = self.today - timedelta(weeks=PHASE_DURATIONS[PHASE_ACCUMULATION])
+        state = compute_mesocycle_state(PHASE_ACCUMULATION, start_acc, self.today)
+        self.assertEqual((state['phase'], state['week_number']), (PHASE_INTENSIFICATION, 1))
+        self.assertEqual(state['start_date'], start_acc + timedelta(weeks=PHASE_DURATIONS[PHASE_ACCUMULATION]))
+
+        start_int = self.today - timedelta(weeks=PHASE_DURATIONS[PHASE_INTENSIFICATION])
+        state = compute_mesocycle_state(PHASE_INTENSIFICATION, start_int, self.today)
+        self.assertEqual((state['phase'], state['week_number']), (PHASE_DELOAD, 1))
+
+        start_del = self.today - timedelta(weeks=PHASE_DURATIONS[PHASE_DELOAD])
+        state = compute_mesocycle_state(PHASE_DELOAD, start_del, self.today)
+        self.assertEqual((state['phase'], state['week_number']), (PHASE_ACCUMULATION, 1))
+        self.assertEqual(state['start_date'], self.today)
+        self.assertEqual(state['cycles_completed'], 1)
+
+    def test_long_gap_is_closed_form(self):
+        start_acc = self.today - timedelta(weeks=3 * CYCLE_WEEKS + PHASE_DURATIONS[PHASE_ACCUMULATION] + 1, days=2)
+        state = compute_mesocycle_state(PHASE_ACCUMULATION, start_acc, self.today)
+        self.assertEqual(state['cycles_completed'], 3)
+        self.assertEqual(state['phase'], PHASE_INTENSIFICATION)
+        self.assertEqual(state['week_number'], 2)
+        self.assertEqual(
+            state['start_date'],
+            start_acc + timedelta(weeks=3 * CYCLE_WEEKS + PHASE_DURATIONS[PHASE_ACCUMULATION])
+        )
+
+    def test_future_start_date_is_left_alone(self):
+        start = self.today + timedelta(days=3)
+        state = compute_mesocycle_state(PHASE_INTENSIFICATION, start, self.today)
+        self.assertEqual((state['phase'], state['week_number'], state['start_date']), (PHASE_INTENSIFICATION, 1, start))
+
+    def test_get_current_mesocycle_is_read_only(self):
+        cursor = MagicMock(spec=['execute', 'fetchone'])
+        meso_id = str(uuid.uuid4())
+        cursor.fetchone.return_value = {
+            'id': meso_id, 'user_id': 'u1', 'phase': PHASE_ACCUMULATION,
+            'week_number': 1, 'start_date': self.today - timedelta(weeks=4)
+        }
+
+        meso = get_current_mesocycle(cursor, 'u1', self.today)
+
+        self.assertEqual(cursor.execute.call_count, 1)
+        self.assertTrue(cursor.execute.call_args.args[0].lstrip().startswith("SELECT"))
+        self.assertEqual((meso['phase'], meso['week_number'], meso['id']), (PHASE_INTENSIFICATION, 2, meso_id))
+
+    def test_get_current_mesocycle_without_history(self):
+        cursor = MagicMock(spec=['execute', 'fetchone'])
+        cursor.fetchone.return_value = None
+
+        meso = get_current_mesocycle(cursor, 'u1', self.today)
+
+        self.assertIsNone(meso['id'])
+        self.assertEqual((meso['phase'], meso['week_number'], meso['start_date']), (PHASE_ACCUMULATION, 1, self.today))
+
+    def test_advance_all_commits_per_batch_and_skips_untrained_users(self):
+        cur = MagicMock()
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cur
+        cur.fetchall.side_effect = [
+            [('u1', 'm1', PHASE_ACCUMULATION, self.today, 1),
+             ('u2', None, None, None, None)],
+            [('u3', 'm3', PHASE_ACCUMULATION, self.today - timedelta(weeks=1), 1)],
+        ]
+
+        with patch.object(mesocycles.psycopg2.extras, 'execute_values') as execute_values:
+            counts = advance_all_mesocycles(conn, self.today, batch_size=2)
+
+        self.assertEqual(counts, {'updated': 1, 'inserted': 1})
+        self.assertEqual(conn.commit.call_count, 2)
+        select_sql, first_params = cur.execute.call_args_list[0].args
+        self.assertIn("EXISTS (SELECT 1 FROM workouts", select_sql)
+        self.assertEqual(first_params, (None, None, 2))
+        self.assertEqual(cur.execute.call_args_list[1].args[1], ('u2', 'u2', 2))
+        self.assertEqual(execute_values.call_count, 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from flask import Blueprint, Flask
+from prometheus_client import REGISTRY
+
+# Same module name as app and the blueprints, so collectors are registered once
+import metrics
+from metrics import RQQueueCollector, observe_computation, timed_computation
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        bp = Blueprint('things', __name__)
+
+        @bp.route('/things')
+        def list_things():
+            return "ok"
+
+        self.app.register_blueprint(bp)
+        metrics.init_app(self.app)
+
+    def _get(self, path):
+        with self.app.test_request_context(path):
+            return self.app.full_dispatch_request()
+
+    def test_route_latency_labelled_by_blueprint(self):
+        labels = {'blueprint': 'things', 'endpoint': 'things.list_things', 'method': 'GET', 'status': '200'}
+        before = REGISTRY.get_sample_value('gymgenius_http_request_duration_seconds_count', labels) or 0
+
+        self.assertEqual(self._get('/things').status_code, 200)
+
+        after = REGISTRY.get_sample_value('gymgenius_http_request_duration_seconds_count', labels)
+        self.assertEqual(after, before + 1)
+
+    def test_metrics_endpoint_exposes_text_format(self):
+        self._get('/things')
+        with patch.object(RQQueueCollector, 'collect', return_value=iter(())):
+            response = self._get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'gymgenius_http_request_duration_seconds_bucket', response.data)
+        self.assertNotIn(b'endpoint="metrics"', response.data)
+
+    def test_computation_timing(self):
+        labels = {'computation': 'unit_test'}
+        before = REGISTRY.get_sample_value('gymgenius_computation_duration_seconds_count', labels) or 0
+        with observe_computation('unit_test'):
+            pass
+        self.assertEqual(timed_computation('unit_test')(lambda x: x * 2)(21), 42)
+        self.assertEqual(REGISTRY.get_sample_value('gymgenius_computation_duration_seconds_count', labels), before + 2)
+
+    def test_rq_queue_depth_collector(self):
+        collector = RQQueueCollector(queue_names=('training',))
+        collector._redis = MagicMock()
+        with patch('rq.Queue') as queue_cls:
+            queue_cls.return_value.count = 7
+            families = list(collector.collect())
+        self.assertEqual(families[0].samples[0].labels, {'queue': 'training'})
+        self.assertEqual(families[0].samples[0].value, 7)
+
+    def test_rq_queue_depth_collector_tolerates_redis_errors(self):
+        collector = RQQueueCollector(queue_names=('training',))
+        collector._redis = MagicMock()
+        with patch('rq.Queue', side_effect=ConnectionError("redis down")):
+            self.assertEqual(list(collector.collect()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
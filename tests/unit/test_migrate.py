@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from database import migrate
+from database.migrate import discover, pending, split_statements
+
+
+class TestMigrate(unittest.TestCase):
+
+    def test_split_ignores_semicolons_in_quotes_comments_and_function_bodies(self):
+        sql = """
+        -- leading comment; not a statement
+        CREATE FUNCTION f() RETURNS TRIGGER AS $$
+        BEGIN
+          RAISE NOTICE 'a;b';
+          RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        INSERT INTO t VALUES ('it''s; fine'); /* block; comment */
+        SELECT 1
+        """
+        statements = [statement for statement, _ in split_statements(sql)]
+        self.assertEqual(len(statements), 3)
+        self.assertTrue(statements[0].startswith("CREATE FUNCTION"))
+        self.assertTrue(statements[0].endswith("$$ LANGUAGE plpgsql"))
+        self.assertEqual(statements[1], "INSERT INTO t VALUES ('it''s; fine')")
+        self.assertEqual(statements[2], "SELECT 1")
+
+    def test_directives_attach_to_the_next_statement(self):
+        sql = """
+        -- migrate:no-transaction
+        ALTER TABLE t ADD COLUMN IF NOT EXISTS c INT;
+        -- migrate:batch size=500
+        UPDATE t SET c = 1 WHERE id IN (SELECT id FROM t WHERE c IS NULL LIMIT %(batch_size)s);
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_t_c ON t (c);
+        """
+        statements = split_statements(sql)
+        self.assertEqual(statements[0][1], {"no-transaction": {}})
+        self.assertEqual(statements[1][1], {"batch": {"size": "500"}})
+        self.assertEqual(statements[2][1], {})
+
+    def test_discover_orders_by_version_and_detects_mode(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {
+                "010_later.sql": "SELECT 1;",
+                "002_online.sql": "-- migrate:no-transaction\nCREATE INDEX CONCURRENTLY i ON t (c);",
+                "001_first.sql": "CREATE TABLE t (c INT);",
+                "README.md": "not a migration",
+            }
+            for name, body in files.items():
+                with open(os.path.join(tmp, name), "w") as fh:
+                    fh.write(body)
+            migrations = discover(tmp)
+
+        self.assertEqual([m.version for m in migrations], ["001", "002", "010"])
+        self.assertEqual([m.transactional for m in migrations], [True, False, True])
+        self.assertEqual(
+            [m.version for m in pending(migrations, {"001": migrations[0].checksum}, target="002")],
+            ["002"],
+        )
+
+    def test_foreach_runs_each_generated_statement(self):
+        conn = MagicMock(autocommit=True)
+        cur = conn.cursor.return_value
+        cur.fetchall.return_value = [
+            ("CREATE INDEX CONCURRENTLY IF NOT EXISTS p1_idx ON p1 (c)",),
+            ("ALTER INDEX parent_idx ATTACH PARTITION p1_idx",),
+        ]
+        with patch.object(migrate, "IndexProgressReporter"), \
+                patch.object(migrate, "_drop_invalid_index") as drop_invalid:
+            migrate._run_statement(conn, cur, "SELECT format(...) FROM pg_inherits", {"foreach": {}})
+
+        executed = [call.args[0] for call in cur.execute.call_args_list]
+        self.assertEqual(executed, [
+            "SELECT format(...) FROM pg_inherits",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS p1_idx ON p1 (c)",
+            "ALTER INDEX parent_idx ATTACH PARTITION p1_idx",
+        ])
+        drop_invalid.assert_called_once_with(cur, "p1_idx")
+
+    def test_repo_migrations_parse(self):
+        migrations = discover()
+        self.assertEqual([m.version for m in migrations], sorted(m.version for m in migrations))
+        online = next(m for m in migrations if m.name == "workout_sets_user_id")
+        self.assertFalse(online.transactional)
+        self.assertTrue(any("batch" in directives for _, directives in online.statements))
+        created_at = next(m for m in migrations if m.name == "workout_sets_created_at")
+        self.assertFalse(created_at.transactional)
+        self.assertEqual(sum("foreach" in directives for _, directives in created_at.statements), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+from engine.partitions import (
+    add_months,
+    partition_month,
+    ensure_partitions,
+    detach_expired_partitions,
+)
+
+
+def _mock_conn(fetchall=None, fetchone=None):
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = fetchall or []
+    cur.fetchone.return_value = fetchone
+    return conn, cur
+
+
+class TestPartitions(unittest.TestCase):
+
+    def test_add_months_crosses_years(self):
+        self.assertEqual(add_months(date(2024, 11, 17), 0), date(2024, 11, 1))
+        self.assertEqual(add_months(date(2024, 11, 17), 3), date(2025, 2, 1))
+        self.assertEqual(add_months(date(2024, 1, 31), -1), date(2023, 12, 1))
+
+    def test_partition_month(self):
+        self.assertEqual(partition_month("workout_sets_p2024_03"), date(2024, 3, 1))
+        self.assertIsNone(partition_month("workout_sets_default"))
+
+    def test_ensure_partitions_requests_current_through_ahead(self):
+        conn, cur = _mock_conn(fetchone=(2,))
+        created = ensure_partitions(conn, date(2024, 12, 5), months_ahead=2)
+
+        self.assertEqual(created, {"workout_sets": 2, "estimated_1rm_history": 2})
+        for call in cur.execute.call_args_list:
+            self.assertEqual(call.args[1][1:], (date(2024, 12, 1), date(2025, 2, 1)))
+
+    def test_detach_only_months_past_retention(self):
+        conn, cur = _mock_conn()
+        cur.fetchall.side_effect = [
+            [("workout_sets_default",), ("workout_sets_p2023_12",),
+             ("workout_sets_p2024_01",), ("workout_sets_p2024_02",)],
+            [("estimated_1rm_history_p2024_03",)],
+        ]
+        detached = detach_expired_partitions(conn, date(2024, 4, 10), retention_months=2)
+
+        # Cutoff is 2024-02-01: only months that ended by then are detached.
+        self.assertEqual(detached, ["workout_sets_p2023_12", "workout_sets_p2024_01"])
+        statements = [call.args[0] for call in cur.execute.call_args_list]
+        self.assertIn('ALTER TABLE "workout_sets" DETACH PARTITION "workout_sets_p2024_01";', statements)
+
+    def test_retention_zero_keeps_everything(self):
+        conn, cur = _mock_conn(fetchall=[("workout_sets_p2000_01",)])
+        self.assertEqual(detach_expired_partitions(conn, date(2024, 4, 10), retention_months=0), [])
+        cur.execute.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from engine import plateau_scanner
+from engine.progression import detect_plateau, PlateauStatus
+from engine.plateau_scanner import classify_pairs, grouped_trend_slopes, prefilter_pairs
+
+
+class TestPlateauScanner(unittest.TestCase):
+
+    def setUp(self):
+        self.series = [
+            [100.0, 102.0, 104.0, 106.0, 108.0, 110.0],   # Progressing
+            [100.0, 100.0, 100.001, 100.0, 100.0],        # Stagnating
+            [110.0, 108.0, 106.0, 104.0, 102.0, 100.0],   # Regressing
+            [100.0, 100.0, 100.0],                        # Below PLATEAU_MIN_HISTORY
+            [90.0],
+        ]
+        self.pairs = [(f"user-{i}", f"exercise-{i}") for i in range(len(self.series))]
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.rows = [
+            (i, value, start + timedelta(days=3 * j))
+            for i, series in enumerate(self.series)
+            for j, value in enumerate(series)
+        ]
+
+    def test_classify_pairs_matches_detect_plateau(self):
+        plateaus = classify_pairs(self.pairs, self.rows)
+        by_pair = {(user_id, exercise_id): status for user_id, exercise_id, status in plateaus}
+
+        self.assertEqual(set(by_pair), {self.pairs[1], self.pairs[2]})
+        self.assertEqual(by_pair[self.pairs[1]]['status'], PlateauStatus.STAGNATION)
+        self.assertEqual(by_pair[self.pairs[2]]['status'], PlateauStatus.REGRESSION)
+        for i in (1, 2):
+            self.assertEqual(by_pair[self.pairs[i]]['status'], detect_plateau(self.series[i])['status'])
+
+    def test_classify_pairs_reports_onset_and_duration_days(self):
+        plateaus = classify_pairs(self.pairs, self.rows)
+        stagnation = next(status for user_id, _, status in plateaus if user_id == "user-1")
+        self.assertEqual(stagnation['onset_at'], datetime(2024, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(stagnation['duration_days'], 12)
+
+    def test_classify_pairs_empty_chunk(self):
+        self.assertEqual(classify_pairs([], []), [])
+
+    def test_grouped_slopes_match_per_series_fit(self):
+        codes = np.array([row[0] for row in self.rows])
+        values = np.array([row[1] for row in self.rows])
+        slopes, counts = grouped_trend_slopes(codes, values, len(self.pairs))
+        self.assertEqual(counts.tolist(), [len(series) for series in self.series])
+        for i, series in enumerate(self.series):
+            self.assertAlmostEqual(slopes[i], detect_plateau(series)['slope'], places=9)
+
+    def test_prefilter_skips_rising_pairs_without_segmenting(self):
+        codes = np.array([row[0] for row in self.rows])
+        values = np.array([row[1] for row in self.rows])
+        self.assertEqual(prefilter_pairs(codes, values, len(self.pairs)).tolist(), [1, 2])
+
+        with patch.object(plateau_scanner, "detect_plateau_segmented",
+                          wraps=plateau_scanner.detect_plateau_segmented) as segment:
+            classify_pairs(self.pairs, self.rows)
+        self.assertEqual(segment.call_count, 2)
+
+    def test_stall_after_long_progression_passes_prefilter(self):
+        series = [100.0 + 2.0 * i for i in range(20)] + [138.0] * 8
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        rows = [(0, value, start + timedelta(days=3 * j)) for j, value in enumerate(series)]
+
+        plateaus = classify_pairs([("user-0", "exercise-0")], rows)
+
+        self.assertEqual(len(plateaus), 1)
+        self.assertEqual(plateaus[0][2]['status'], PlateauStatus.STAGNATION)
+
+    def test_chunk_history_is_bounded_to_analysis_window(self):
+        cur = MagicMock()
+        run_started_at = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        cur.fetchall.side_effect = [[("u1", "e1")], []]
+        db_conn = MagicMock()
+        db_conn.cursor.return_value.__enter__.return_value = cur
+
+        plateau_scanner.scan_all_plateaus(db_conn, run_started_at, chunk_pairs=2)
+
+        sql, params = cur.execute.call_args_list[1].args
+        self.assertIn("calculated_at >= %s", sql)
+        self.assertEqual(
+            params[2], run_started_at - timedelta(days=plateau_scanner.PLATEAU_ANALYSIS_HISTORY_DAYS)
+        )
+
+    def test_insert_binds_protocol(self):
+        plateau_status = {
+            'status': PlateauStatus.STAGNATION, 'duration_days': 12, 'slope': 0.0,
+            'onset_at': datetime(2024, 1, 1, tzinfo=timezone.utc),
+        }
+        run_started_at = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        with patch.object(plateau_scanner.psycopg2.extras, "execute_values", return_value=[(1,)]) as execute_values:
+            inserted = plateau_scanner._insert_plateau_events(
+                MagicMock(), [("u1", "e1", plateau_status)], run_started_at
+            )
+
+        self.assertEqual(inserted, 1)
+        sql, rows = execute_values.call_args.args[1:3]
+        self.assertNotIn(plateau_scanner.PLATEAU_SCAN_PROTOCOL, sql)
+        self.assertIn("v.protocol", sql)
+        self.assertEqual(rows[0][4], plateau_scanner.PLATEAU_SCAN_PROTOCOL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import patch
+
+import psycopg2
+
+from engine import prepared_statements
+from engine.rows import SessionLoad
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.connection = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def execute(self, query, params=None):
+        self.connection.executed.append((query, params))
+        if query.startswith(f"PREPARE {self.connection.failing} "):
+            raise psycopg2.ProgrammingError("column does not exist")
+
+    def fetchall(self):
+        return self.connection.rows
+
+
+class FakeConn:
+    def __init__(self, failing=None, rows=()):
+        self.autocommit = False
+        self.failing = failing
+        self.rows = list(rows)
+        self.executed = []
+        self.autocommit_seen = set()
+
+    def cursor(self):
+        self.autocommit_seen.add(self.autocommit)
+        return FakeCursor(self)
+
+
+class TestPreparedStatements(unittest.TestCase):
+
+    def test_placeholders_are_numbered(self):
+        self.assertEqual(
+            prepared_statements._numbered("UPDATE users SET rir_bias = %s WHERE id = %s"),
+            "UPDATE users SET rir_bias = $1 WHERE id = $2",
+        )
+        self.assertEqual(prepared_statements._EXECUTE_SQL["latest_e1rm"], "EXECUTE latest_e1rm (%s, %s)")
+
+    def test_prepares_each_statement_once_in_autocommit(self):
+        conn = FakeConn(failing="update_user_rir_bias")
+        self.assertFalse(prepared_statements.statements_prepared(conn))
+
+        prepared_statements.prepare_statements(conn)
+
+        self.assertTrue(prepared_statements.statements_prepared(conn))
+        self.assertEqual(len(conn.executed), len(prepared_statements.PREPARED_STATEMENTS))
+        self.assertIn(
+            ("PREPARE lock_user_rir_bias AS SELECT rir_bias, rir_bias_lr, rir_bias_error_ema "
+             "FROM users WHERE id = $1 FOR UPDATE", None),
+            conn.executed,
+        )
+        self.assertEqual(conn.autocommit_seen, {True})
+        self.assertFalse(conn.autocommit)
+
+        cur = conn.cursor()
+        prepared_statements.execute_prepared(cur, "lock_user_rir_bias", ("u1",))
+        prepared_statements.execute_prepared(cur, "update_user_rir_bias", (0.5, 0.1, "u1"))
+        self.assertEqual(conn.executed[-2], ("EXECUTE lock_user_rir_bias (%s)", ("u1",)))
+        # Failed PREPARE falls back to the SQL text
+        self.assertEqual(
+            conn.executed[-1],
+            (prepared_statements.PREPARED_STATEMENTS["update_user_rir_bias"], (0.5, 0.1, "u1")),
+        )
+
+    def test_unprepared_connection_runs_sql_text(self):
+        conn = FakeConn(rows=[("2024-01-01", 120.0)])
+        records = prepared_statements.fetch_prepared_records(
+            conn, SessionLoad, "recent_session_tonnage", ("u1", "chest", 28)
+        )
+        self.assertEqual(conn.executed, [
+            (prepared_statements.PREPARED_STATEMENTS["recent_session_tonnage"], ("u1", "chest", 28)),
+        ])
+        self.assertEqual(records[0].stimulus, 120.0)
+
+    def test_disabled_marks_connection_without_preparing(self):
+        conn = FakeConn()
+        with patch.object(prepared_statements, "PREPARED_STATEMENTS_ENABLED", False):
+            prepared_statements.prepare_statements(conn)
+        self.assertTrue(prepared_statements.statements_prepared(conn))
+        self.assertEqual(conn.executed, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
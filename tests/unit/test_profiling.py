@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+from flask import Flask
+
+from engine import profiling
+
+
+def _busy():
+    return sum(i * i for i in range(2000))
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+
+        @self.app.route('/hot')
+        def hot():
+            _busy()
+            return "ok"
+
+        profiling.init_app(self.app)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        for name, value in (('PROFILE_STORAGE', 'dir'), ('PROFILE_DIR', self.tmpdir.name),
+                            ('PROFILE_SAMPLE_RATE', 0.0)):
+            patcher = patch.object(profiling, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get(self, headers=None):
+        with self.app.test_request_context('/hot', headers=headers or {}):
+            return self.app.full_dispatch_request()
+
+    def test_unprofiled_by_default(self):
+        with patch.dict(os.environ, {'INTERNAL_API_KEY': 'secret'}):
+            response = self._get()
+        self.assertNotIn('X-Profile-Id', response.headers)
+        self.assertEqual(profiling.get_profiles('hot'), [])
+
+    def test_admin_header_profiles_request(self):
+        with patch.dict(os.environ, {'INTERNAL_API_KEY': 'secret'}):
+            response = self._get({'X-Profile-Request': 'secret'})
+            self.assertNotIn('X-Profile-Id', self._get({'X-Profile-Request': 'wrong'}).headers)
+
+        self.assertEqual(response.status_code, 200)
+        profiles = profiling.get_profiles('hot')
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]['id'], response.headers['X-Profile-Id'])
+        self.assertEqual(profiles[0]['path'], '/hot')
+        self.assertTrue(any('_busy' in frame['function'] or 'genexpr' in frame['function']
+                            for frame in profiles[0]['top_frames']))
+        own = [frame['own_ms'] for frame in profiles[0]['top_frames']]
+        self.assertEqual(own, sorted(own, reverse=True))
+
+    def test_sample_rate_and_retention(self):
+        with patch.object(profiling, 'PROFILE_SAMPLE_RATE', 1.0), \
+                patch.object(profiling, 'PROFILE_KEEP_PER_ENDPOINT', 3):
+            for _ in range(5):
+                self.assertIn('X-Profile-Id', self._get().headers)
+            self.assertEqual(len(profiling.get_profiles('hot')), 3)
+
+    def test_redis_storage_caps_list_and_swallows_errors(self):
+        redis_client = MagicMock()
+        with patch.object(profiling, 'PROFILE_STORAGE', 'redis'), \
+                patch.object(profiling, 'get_redis', return_value=redis_client):
+            profiling.store_profile('hot', {'id': 'abc'})
+            pipe = redis_client.pipeline.return_value
+            pipe.lpush.assert_called_once()
+            pipe.ltrim.assert_called_once_with('profiles:hot', 0, profiling.PROFILE_KEEP_PER_ENDPOINT - 1)
+
+            redis_client.pipeline.side_effect = ConnectionError("redis down")
+            profiling.store_profile('hot', {'id': 'def'})  # Must not raise
+
+    def test_endpoint_names_cannot_leave_profile_dir(self):
+        for endpoint in ('..', '../etc', 'a/b', 'analytics..x', '.hidden'):
+            with self.assertRaises(ValueError):
+                profiling.get_profiles(endpoint)
+            profiling.store_profile(endpoint, {'id': 'abc'})  # Logged, not written
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+        self.assertEqual(profiling.get_profiles('analytics.get_key_metrics'), [])
+
+    def test_internal_key_matches(self):
+        with patch.dict(os.environ, {'INTERNAL_API_KEY': 'secret'}):
+            self.assertTrue(profiling.internal_key_matches('secret'))
+            self.assertFalse(profiling.internal_key_matches('secreT'))
+            self.assertFalse(profiling.internal_key_matches(None))
+        with patch.dict(os.environ, {'INTERNAL_API_KEY': ''}):
+            self.assertFalse(profiling.internal_key_matches(''))
+
+
+if __name__ == '__main__':
+    unittest.main()
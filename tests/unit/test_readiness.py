@@ -3,7 +3,14 @@ import uuid
 from datetime import datetime, timezone, timedelta
 from unittest.mock import MagicMock, patch
 
-from engine.readiness import get_personal_hrv_baseline, calculate_readiness_multiplier
+from engine.readiness import (
+    get_personal_hrv_baseline,
+    calculate_readiness_multiplier,
+    advance_hrv_ring,
+    apply_hrv_contribution,
+    _empty_hrv_ring,
+    HRV_BASELINE_WINDOW_DAYS,
+)
 # Constants from readiness module for assertion checks
 from engine.readiness import SLEEP_TARGET_HOURS, STRESS_MAX_LEVEL, SLEEP_WEIGHT, STRESS_WEIGHT, HRV_WEIGHT, MULTIPLIER_BASE, MULTIPLIER_RANGE
 
@@ -15,10 +22,19 @@ def mock_db_conn():
     conn.cursor.return_value.__enter__.return_value = conn.cursor_instance # for 'with conn.cursor() as cur:'
     return conn
 
+def _ring_row(ring_day, readings):
+    """Build a user_hrv_baselines row from {date: [hrv values]}."""
+    ring = _empty_hrv_ring(ring_day)
+    for day, values in readings.items():
+        for value in values:
+            ring = apply_hrv_contribution(ring, day, value, 1)
+    return ring
+
 def test_get_hrv_baseline_success(mock_db_conn):
     user_id = uuid.uuid4()
+    today = datetime.now(timezone.utc).date()
     mock_cursor = mock_db_conn.cursor_instance
-    mock_cursor.fetchone.return_value = {'avg_hrv': 55.5}
+    mock_cursor.fetchone.return_value = _ring_row(today, {today: [50.0], today - timedelta(days=3): [61.0]})
 
     avg_hrv = get_personal_hrv_baseline(user_id, mock_db_conn)
 
@@ -28,7 +44,9 @@ def test_get_hrv_baseline_success(mock_db_conn):
 def test_get_hrv_baseline_no_data(mock_db_conn):
     user_id = uuid.uuid4()
     mock_cursor = mock_db_conn.cursor_instance
-    mock_cursor.fetchone.return_value = {'avg_hrv': None} # No average calculated by DB
+    # Row exists but every reading has left the 30-day window since the last write
+    stale_day = datetime.now(timezone.utc).date() - timedelta(days=HRV_BASELINE_WINDOW_DAYS + 5)
+    mock_cursor.fetchone.return_value = _ring_row(stale_day, {stale_day: [55.5]})
 
     avg_hrv = get_personal_hrv_baseline(user_id, mock_db_conn)
 
@@ -52,6 +70,34 @@ def test_get_hrv_baseline_db_error(mock_db_conn):
     assert avg_hrv is None # Should gracefully handle error and return None
 
 
+# --- Tests for the rolling HRV ring ---
+
+def test_hrv_ring_expires_days_outside_window():
+    start = datetime(2024, 5, 1).date()
+    ring = _ring_row(start, {start - timedelta(days=29): [40.0], start: [60.0]})
+    assert ring['hrv_count'] == 2
+
+    rolled = advance_hrv_ring(ring, start + timedelta(days=1))
+    assert rolled['hrv_count'] == 1
+    assert rolled['hrv_sum'] == pytest.approx(60.0)
+    assert ring['hrv_count'] == 2 # Original left untouched
+
+    assert advance_hrv_ring(ring, start + timedelta(days=HRV_BASELINE_WINDOW_DAYS))['hrv_count'] == 0
+
+def test_hrv_ring_replacing_a_reading():
+    day = datetime(2024, 5, 1).date()
+    ring = _ring_row(day, {day: [50.0, 70.0]})
+    # Workout's HRV edited from 70 to 58
+    ring = apply_hrv_contribution(ring, day, -70.0, -1)
+    ring = apply_hrv_contribution(ring, day, 58.0, 1)
+    assert ring['hrv_sum'] / ring['hrv_count'] == pytest.approx(54.0)
+
+def test_hrv_ring_ignores_readings_older_than_window():
+    day = datetime(2024, 5, 1).date()
+    ring = apply_hrv_contribution(_empty_hrv_ring(day), day - timedelta(days=HRV_BASELINE_WINDOW_DAYS), 80.0, 1)
+    assert ring['hrv_count'] == 0
+
+
 # --- Tests for calculate_readiness_multiplier ---
 
 @patch('engine.readiness.get_personal_hrv_baseline') # Mock the baseline function
@@ -251,3 +297,11 @@ def test_calculate_readiness_stress_at_max(mock_get_baseline):
     multiplier, score = calculate_readiness_multiplier(sleep_h, stress_lvl, hrv_ms, user_id, mock_db_conn)
     assert score == pytest.approx(expected_total_score)
     assert multiplier == pytest.approx(MULTIPLIER_BASE + MULTIPLIER_RANGE * expected_total_score)
+
+def test_hrv_ring_clamps_future_readings_to_ring_day():
+    day = datetime(2024, 5, 1).date()
+    ring = _ring_row(day, {day - timedelta(days=20): [40.0]})
+    ring = apply_hrv_contribution(ring, day + timedelta(days=15), 60.0, 1)
+    assert ring['ring_day'] == day
+    assert ring['hrv_count'] == 2
+    assert ring['hrv_sum'] == pytest.approx(100.0)
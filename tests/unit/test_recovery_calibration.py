@@ -0,0 +1,90 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from engine.constants import FATIGUE_HISTORY_DAYS
+from engine.learning_models import DEFAULT_RECOVERY_TAU_MAP, calculate_current_fatigue
+from engine.recovery_calibration import (
+    MULTIPLIER_GRID,
+    estimate_e1rm,
+    session_fatigue,
+    fit_recovery_multiplier,
+    fit_user_recovery_multipliers,
+    MIN_SESSIONS_FOR_CALIBRATION,
+)
+
+
+class TestRecoveryCalibration(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        # Irregular schedule: a session every 1-4 days over ~4 months.
+        gaps = rng.uniform(24.0, 96.0, size=40)
+        self.session_hours = np.cumsum(gaps)
+        self.stimulus = rng.uniform(50.0, 150.0, size=40)
+
+    def test_estimate_e1rm_matches_epley_on_total_reps(self):
+        e1rm = estimate_e1rm(np.array([100.0]), np.array([5.0]), np.array([2.0]))
+        self.assertAlmostEqual(e1rm[0], 100.0 / (1 - 0.0333 * 7), places=6)
+
+    def test_session_fatigue_matches_scalar_model(self):
+        base_tau = 48.0
+        now = datetime(2024, 3, 1, 12, 0)
+        hours = self.session_hours[:10]
+        history = [
+            {'session_date': now - timedelta(hours=float(hours[-1] - h)), 'stimulus': float(s)}
+            for h, s in zip(hours[:-1], self.stimulus[:9])
+        ]
+        vectorized = session_fatigue(hours, self.stimulus[:10], np.array([base_tau * 1.5]))[0, -1]
+        # calculate_current_fatigue measures elapsed time from datetime.now(); the
+        # offset cancels out up to a common decay factor.
+        scalar = calculate_current_fatigue('chest', history, user_recovery_multiplier=1.5)
+        elapsed_since_anchor = (datetime.now() - now).total_seconds() / 3600.0
+        self.assertAlmostEqual(scalar, vectorized * np.exp(-elapsed_since_anchor / (base_tau * 1.5)), places=6)
+
+    def test_fit_recovers_true_multiplier(self):
+        base_tau = 48.0
+        true_multiplier = 1.5
+        fatigue = session_fatigue(self.session_hours, self.stimulus, np.array([base_tau * true_multiplier]))[0]
+        drops = 0.0005 * fatigue
+        drops[0] = np.nan  # First session has no prior best to compare against
+
+        fitted = fit_recovery_multiplier(self.session_hours, self.stimulus, drops, base_tau)
+        self.assertEqual(fitted, true_multiplier)
+
+    def test_fit_requires_minimum_sessions(self):
+        n = MIN_SESSIONS_FOR_CALIBRATION - 1
+        drops = np.full(n, 0.01)
+        self.assertIsNone(fit_recovery_multiplier(self.session_hours[:n], self.stimulus[:n], drops, 48.0))
+
+    def test_fit_rejects_drops_unrelated_to_fatigue(self):
+        drops = np.zeros(len(self.session_hours))
+        self.assertIsNone(fit_recovery_multiplier(self.session_hours, self.stimulus, drops, 48.0))
+
+    def test_fit_user_recovery_multipliers_from_set_rows(self):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        exercise_id = uuid.uuid4()
+        rows = []
+        for i in range(12):
+            workout_id = uuid.uuid4()
+            completed_at = start + timedelta(days=2 * i)
+            # Performance dips on the day after every heavy session.
+            weight = 100.0 - (5.0 if i % 2 else 0.0)
+            rows.append((workout_id, exercise_id, 'Chest', weight, 5, 2, 120, completed_at))
+
+        multipliers = fit_user_recovery_multipliers(rows)
+        self.assertIn('Chest', multipliers)
+        self.assertGreaterEqual(multipliers['Chest'], 0.5)
+        self.assertLessEqual(multipliers['Chest'], 2.0)
+        self.assertEqual(fit_user_recovery_multipliers([]), {})
+
+    def test_fatigue_history_window_covers_slowest_recovery(self):
+        slowest_tau_hours = max(DEFAULT_RECOVERY_TAU_MAP.values()) * MULTIPLIER_GRID.max()
+        residual = np.exp(-FATIGUE_HISTORY_DAYS * 24 / slowest_tau_hours)
+        self.assertLess(residual, 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
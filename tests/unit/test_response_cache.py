@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import patch
+
+from flask import Flask, g, jsonify
+
+import etags  # Imported by response_cache under this name
+from engine import response_cache
+
+from fake_redis import FakeRedis
+
+
+class TestCachedResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.calls = 0
+        self.status = 200
+
+        @self.app.before_request
+        def authenticate():
+            g.current_user_id = "u1"
+
+        @self.app.route('/v1/user/u1/volume-summary')
+        @response_cache.cached_response("training")
+        def volume_summary():
+            self.calls += 1
+            return jsonify(calls=self.calls), self.status
+
+        self.redis = FakeRedis()
+        for module in (etags, response_cache):
+            patcher = patch.object(module, "get_redis", lambda: self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get(self, query=""):
+        with self.app.test_request_context('/v1/user/u1/volume-summary' + query):
+            return self.app.full_dispatch_request()
+
+    def _cache_keys(self):
+        return [key for key in self.redis.values if key.startswith(response_cache.RESPONSE_CACHE_PREFIX)]
+
+    def test_hit_until_data_version_bump(self):
+        self.assertEqual(self._get().get_json(), {"calls": 1})
+        self.assertEqual(self._get().get_json(), {"calls": 1})
+        self.assertEqual(self._get("?week=2024-01-01").get_json(), {"calls": 2})
+
+        etags.bump_data_version("u1", "training")
+        self.assertEqual(self._get().get_json(), {"calls": 3})
+        self.assertFalse(any(key.endswith(":lock") for key in self._cache_keys()))
+
+    def test_error_responses_are_not_cached(self):
+        self.status = 500
+        self._get()
+        self.status = 200
+        self.assertEqual(self._get().status_code, 200)
+        self.assertEqual(self.calls, 2)
+
+    def test_waiter_serves_leaders_result(self):
+        self._get()  # Creates the version counter
+        key = self._cache_keys()[0]
+        stored = self.redis.values.pop(key)
+        self.redis.values[key + ":lock"] = b"other-worker"
+
+        def leader_finishes(seconds):
+            self.redis.values[key] = stored
+
+        with patch.object(response_cache.time, "sleep", side_effect=leader_finishes):
+            response = self._get()
+        self.assertEqual(response.get_json(), {"calls": 1})
+        self.assertEqual(self.calls, 1)
+
+    def test_waiter_computes_when_leader_gives_up(self):
+        self._get()
+        key = self._cache_keys()[0]
+        self.redis.values.pop(key)
+        self.redis.values[key + ":lock"] = b"other-worker"
+
+        def leader_fails(seconds):
+            self.redis.values.pop(key + ":lock", None)
+
+        with patch.object(response_cache.time, "sleep", side_effect=leader_fails):
+            self.assertEqual(self._get().get_json(), {"calls": 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
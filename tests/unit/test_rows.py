@@ -0,0 +1,55 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from engine import rows
+from engine.learning_models import calculate_current_fatigue
+
+
+class TestRowTypes(unittest.TestCase):
+
+    def test_numeric_is_cast_to_float(self):
+        self.assertEqual(rows.DECIMAL_AS_FLOAT("82.50", None), 82.5)
+        self.assertIsInstance(rows.DECIMAL_AS_FLOAT("100", None), float)
+        self.assertIsNone(rows.DECIMAL_AS_FLOAT(None, None))
+        self.assertEqual(rows.DECIMAL_ARRAY_AS_FLOAT("{1.25,NULL,20}", None), [1.25, None, 20.0])
+
+    def test_register_row_types_is_per_connection(self):
+        conn = object()
+        with patch.object(rows.psycopg2.extensions, "register_type") as register_type:
+            rows.register_row_types(conn)
+        register_type.assert_any_call(rows.DECIMAL_AS_FLOAT, conn)
+        register_type.assert_any_call(rows.DECIMAL_ARRAY_AS_FLOAT, conn)
+
+
+class TestFetchRecords(unittest.TestCase):
+
+    def test_rows_become_records_from_a_tuple_cursor(self):
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.fetchall.return_value = [("chest", 500.0), ("back", None)]
+
+        records = rows.fetch_records(conn, rows.MuscleVolume, "SELECT ...", ("u1",))
+
+        conn.cursor.assert_called_once_with()
+        cur.execute.assert_called_once_with("SELECT ...", ("u1",))
+        self.assertEqual(records[0].muscle_group, "chest")
+        self.assertEqual(records[0].volume, 500.0)
+        self.assertIsNone(records[1].volume)
+
+    def test_fatigue_accepts_session_records(self):
+        now = datetime.now()
+        history = [
+            rows.SessionLoad(now - timedelta(hours=24), 300.0),
+            rows.SessionLoad(now - timedelta(hours=48), 250.0),
+        ]
+        as_dicts = [record._asdict() for record in history]
+        self.assertAlmostEqual(
+            calculate_current_fatigue("chest", history),
+            calculate_current_fatigue("chest", as_dicts),
+        )
+        self.assertGreater(calculate_current_fatigue("chest", history), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
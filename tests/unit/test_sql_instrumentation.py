@@ -0,0 +1,87 @@
+import unittest
+
+from flask import Flask, g
+
+from engine import sql_instrumentation
+from engine.sql_instrumentation import (
+    fingerprint,
+    RequestSqlStats,
+    finish_request,
+    get_sql_stats,
+    reset_sql_stats,
+    _instrumented_factory,
+)
+
+
+class _BaseCursor:
+    def execute(self, query, vars=None):
+        return "executed"
+
+    def executemany(self, query, vars_list):
+        return None
+
+
+class TestSqlInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        reset_sql_stats()
+        self.app = Flask(__name__)
+
+        @self.app.route('/items/<int:item_id>')
+        def item(item_id):
+            return "ok"
+
+    def test_fingerprint_normalises_literals_and_whitespace(self):
+        a = fingerprint("SELECT * FROM sets  WHERE id = 42 AND note = 'x';")
+        b = fingerprint("select * FROM sets WHERE id = 7\n AND note = 'it''s';")
+        self.assertEqual(a.lower(), b.lower())
+        self.assertEqual(fingerprint("SELECT 1 FROM t WHERE id IN (%s, %s, %s)"),
+                         fingerprint("SELECT 1 FROM t WHERE id IN (%s, %s)"))
+
+    def test_n_plus_one_suspects(self):
+        stats = RequestSqlStats()
+        for _ in range(6):
+            stats.add("SELECT name FROM exercises WHERE id = %s", 0.5)
+        stats.add("SELECT * FROM users WHERE id = %s", 1.0)
+        self.assertEqual(stats.query_count, 7)
+        self.assertEqual(list(stats.n_plus_one_suspects(threshold=5).values()), [6])
+
+    def test_instrumented_cursor_records_inside_request_only(self):
+        cursor_cls = _instrumented_factory(_BaseCursor)
+        self.assertIs(cursor_cls, _instrumented_factory(_BaseCursor))
+
+        cursor_cls().execute("SELECT 1")  # No request context: ignored
+
+        with self.app.test_request_context('/items/1'):
+            cursor = cursor_cls()
+            self.assertEqual(cursor.execute("SELECT * FROM t WHERE id = %s", (1,)), "executed")
+            cursor.executemany("INSERT INTO t VALUES (%s)", [(1,), (2,)])
+            self.assertEqual(g._sql_stats.query_count, 2)
+
+    def test_finish_request_aggregates_and_sets_server_timing(self):
+        cursor_cls = _instrumented_factory(_BaseCursor)
+        for _ in range(2):
+            with self.app.test_request_context('/items/1'):
+                for _ in range(sql_instrumentation.SQL_N_PLUS_ONE_THRESHOLD):
+                    cursor_cls().execute("SELECT name FROM exercises WHERE id = %s", ("x",))
+                response = finish_request(self.app.make_response("ok"))
+                self.assertIn("db;dur=", response.headers["Server-Timing"])
+
+        stats = get_sql_stats()
+        self.assertEqual(len(stats["endpoints"]), 1)
+        endpoint = stats["endpoints"][0]
+        self.assertEqual(endpoint["endpoint"], "item")
+        self.assertEqual(endpoint["requests"], 2)
+        self.assertEqual(endpoint["avg_queries"], sql_instrumentation.SQL_N_PLUS_ONE_THRESHOLD)
+        self.assertEqual(endpoint["n_plus_one_requests"], 2)
+        self.assertEqual(endpoint["top_statements"][0]["executions"], 2 * sql_instrumentation.SQL_N_PLUS_ONE_THRESHOLD)
+
+    def test_finish_request_without_queries_is_a_no_op(self):
+        with self.app.test_request_context('/items/1'):
+            response = finish_request(self.app.make_response("ok"))
+        self.assertNotIn("Server-Timing", response.headers)
+        self.assertEqual(get_sql_stats()["endpoints"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
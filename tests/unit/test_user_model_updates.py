@@ -0,0 +1,159 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+
+from engine import user_model_updates
+
+RUN_STARTED_AT = datetime(2024, 3, 1, 2, 0, tzinfo=timezone.utc)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((query, params))
+        self.rows = self.conn.results.pop(0) if self.conn.results else []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConn:
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestShardHashBounds(unittest.TestCase):
+
+    def test_shards_tile_the_hashtext_range(self):
+        bounds = [user_model_updates.shard_hash_bounds(i, 7) for i in range(7)]
+        self.assertEqual(bounds[0][0], -(2 ** 31))
+        self.assertEqual(bounds[-1][1], 2 ** 31)
+        for (_, high), (low, _) in zip(bounds, bounds[1:]):
+            self.assertEqual(high, low)
+        sizes = [high - low for low, high in bounds]
+        self.assertLessEqual(max(sizes) - min(sizes), 1)
+
+    def test_single_shard_covers_everything(self):
+        self.assertEqual(user_model_updates.shard_hash_bounds(0, 1), (-(2 ** 31), 2 ** 31))
+
+
+class TestRecalibrateRirBias(unittest.TestCase):
+
+    SETS = [
+        {'actual_weight': 100.0, 'actual_reps': 5, 'actual_rir': 2, 'prior_e1rm': 120.0},
+        {'actual_weight': 90.0, 'actual_reps': 9, 'actual_rir': 1, 'prior_e1rm': 121.0},
+    ]
+
+    def _run(self):
+        conn = FakeConn(results=[[{'rir_bias_lr': 0.1}], [dict(row) for row in self.SETS]])
+        user_model_updates.recalibrate_rir_bias(conn.cursor(), "u1", RUN_STARTED_AT)
+        return conn.executed[-1][1]
+
+    def test_replay_rebuilds_from_default_bias(self):
+        first_set = self.SETS[0]
+        with patch.object(user_model_updates, "update_user_rir_bias", return_value=(1.6, 0.3)) as update:
+            self._run()
+
+        self.assertEqual(update.call_args_list[0].args[0], user_model_updates.DEFAULT_USER_RIR_BIAS)
+        self.assertEqual(update.call_args_list[0].args[4], 0.0)
+        self.assertEqual(update.call_args_list[0].args[2], first_set['actual_reps'])
+
+    def test_rerun_on_unchanged_sets_keeps_bias(self):
+        first = self._run()
+        self.assertNotEqual(first[0], user_model_updates.DEFAULT_USER_RIR_BIAS)
+        self.assertEqual(self._run(), first)
+
+    def test_no_sets_leaves_bias_untouched(self):
+        conn = FakeConn(results=[[{'rir_bias_lr': 0.1}], []])
+        user_model_updates.recalibrate_rir_bias(conn.cursor(), "u1", RUN_STARTED_AT)
+        self.assertFalse(any(query.startswith("UPDATE") for query, _ in conn.executed))
+
+
+class TestProcessUserBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = FakeConn()
+        self.batch_step = MagicMock()
+
+        def step(cur, user_id, run_started_at):
+            if user_id == "bad":
+                raise psycopg2.Error("boom")
+
+        patches = [
+            patch.object(user_model_updates, "_worker_conn", self.conn),
+            patch.object(user_model_updates, "NIGHTLY_STEPS", (("step", step),)),
+            patch.object(user_model_updates, "NIGHTLY_BATCH_STEPS", (("batch", self.batch_step),)),
+            patch.object(user_model_updates, "bump_profile_versions"),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _watermark_updates(self):
+        return [params for query, params in self.conn.executed if "last_processed_at" in query]
+
+    def test_failed_user_is_rolled_back_and_excluded(self):
+        result = user_model_updates.process_user_batch(["u1", "bad", "u2"], RUN_STARTED_AT)
+
+        self.assertEqual(result, {"processed": 2, "failed": ["bad"]})
+        self.assertEqual(self.conn.rollbacks, 1)
+        self.batch_step.assert_called_once_with(self.conn, ["u1", "u2"], RUN_STARTED_AT)
+        self.assertEqual(self._watermark_updates(), [(RUN_STARTED_AT, ["u1", "u2"])])
+        user_model_updates.bump_profile_versions.assert_called_once_with(["u1", "u2"])
+
+    def test_all_failed_skips_batch_steps(self):
+        result = user_model_updates.process_user_batch(["bad"], RUN_STARTED_AT)
+        self.assertEqual(result, {"processed": 0, "failed": ["bad"]})
+        self.batch_step.assert_not_called()
+        self.assertEqual(self._watermark_updates(), [])
+
+    def test_failed_batch_step_keeps_watermark(self):
+        self.batch_step.side_effect = psycopg2.Error("calibration failed")
+        result = user_model_updates.process_user_batch(["u1", "u2"], RUN_STARTED_AT)
+
+        self.assertEqual(result, {"processed": 0, "failed": ["u1", "u2"]})
+        self.assertEqual(self._watermark_updates(), [])
+        self.assertEqual(self.conn.rollbacks, 1)
+
+
+class TestSelectUsersToProcess(unittest.TestCase):
+
+    def test_selects_on_server_insert_time(self):
+        conn = FakeConn()
+        user_model_updates.select_users_to_process(conn.cursor(), -10, 10, False, RUN_STARTED_AT)
+        query, params = conn.executed[0]
+
+        self.assertIn("ws.created_at > COALESCE(u.last_processed_at, '-infinity')", query)
+        self.assertIn("ws.created_at <= %s", query)
+        self.assertNotIn("ws.completed_at", query)
+        self.assertEqual(params, (-10, 10, False, RUN_STARTED_AT))
+
+
+if __name__ == '__main__':
+    unittest.main()
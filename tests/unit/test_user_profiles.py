@@ -0,0 +1,76 @@
+import unittest
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from engine import user_profiles
+from engine.user_profiles import bump_profile_version, clear_local_profiles, load_user_profile
+
+from fake_redis import FakeRedis
+
+
+class TestUserProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.row = {
+            "id": "u1", "password_hash": "secret", "goal_slider": Decimal("0.50"),
+            "rir_bias": Decimal("1.5"), "recovery_multipliers": {"chest": 1.1}, "sex": "female",
+        }
+        self.cur = MagicMock()
+        self.cur.fetchone.side_effect = lambda: dict(self.row)
+
+        self.redis = FakeRedis()
+        self.clock = [1000.0]
+        for target, value in (
+            ("get_redis", lambda: self.redis),
+            ("time", MagicMock(monotonic=lambda: self.clock[0])),
+        ):
+            patcher = patch.object(user_profiles, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        clear_local_profiles()
+        self.addCleanup(clear_local_profiles)
+
+    def test_profile_is_normalized_and_served_locally(self):
+        profile = load_user_profile(self.cur, "u1")
+        self.assertEqual(profile["rir_bias"], 1.5)
+        self.assertIsInstance(profile["goal_slider"], float)
+        self.assertNotIn("password_hash", profile)
+
+        self.assertIs(load_user_profile(self.cur, "u1"), profile)
+        self.assertEqual(self.cur.execute.call_count, 1)
+
+    def test_other_worker_is_served_from_redis_until_bump(self):
+        load_user_profile(self.cur, "u1")
+        clear_local_profiles()  # Another worker: empty local tier, shared Redis
+        self.assertEqual(load_user_profile(self.cur, "u1")["rir_bias"], 1.5)
+        self.assertEqual(self.cur.execute.call_count, 1)
+
+        self.row["rir_bias"] = Decimal("0.5")
+        self.redis.incr(user_profiles._version_key("u1"))
+        self.assertEqual(load_user_profile(self.cur, "u1")["rir_bias"], 1.5)  # Local copy still trusted
+
+        self.clock[0] += user_profiles.USER_PROFILE_LOCAL_TTL_SECONDS
+        self.assertEqual(load_user_profile(self.cur, "u1")["rir_bias"], 0.5)
+        self.assertEqual(self.cur.execute.call_count, 2)
+
+    def test_bump_drops_local_copy_immediately(self):
+        load_user_profile(self.cur, "u1")
+        self.row["goal_slider"] = Decimal("0.90")
+        bump_profile_version("u1")
+        self.assertEqual(load_user_profile(self.cur, "u1")["goal_slider"], 0.9)
+
+    def test_without_redis_local_ttl_bounds_staleness(self):
+        self.redis.get = MagicMock(side_effect=ConnectionError("redis down"))
+        load_user_profile(self.cur, "u1")
+        self.clock[0] += user_profiles.USER_PROFILE_LOCAL_TTL_SECONDS
+        load_user_profile(self.cur, "u1")
+        self.assertEqual(self.cur.execute.call_count, 2)
+
+    def test_missing_user(self):
+        self.cur.fetchone.side_effect = None
+        self.cur.fetchone.return_value = None
+        self.assertIsNone(load_user_profile(self.cur, "nobody"))
+
+
+if __name__ == '__main__':
+    unittest.main()